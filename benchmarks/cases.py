@@ -0,0 +1,373 @@
+"""
+Benchmark cases for the predicate logic library.
+
+Each case is a setup function that receives a data size and returns a
+zero-argument callable performing the timed work. Setup cost (building
+domains, knowledge bases, predicate chains) is kept out of the timing.
+"""
+
+from array import array
+from functools import reduce
+from itertools import count
+from random import Random
+from tempfile import TemporaryDirectory
+from typing import Callable, Dict, List, NamedTuple, Sequence
+
+from predicate_logic import (
+    IndexedDomain,
+    PredicateLogic,
+    PredicateSet,
+    Var,
+    approx_count_where,
+    compose_predicates,
+    exists,
+    field,
+    filter_table,
+    find_all,
+    forall,
+    greater_than,
+    is_even,
+    is_positive,
+    is_transitive,
+    less_than,
+    logical_and,
+    logical_not,
+    logical_or,
+    parse_rule,
+    range_predicate,
+    type_predicate,
+)
+from predicate_logic.rules import FactTable, materialize
+
+Workload = Callable[[], object]
+
+
+class BenchmarkCase(NamedTuple):
+    """A named, parametrized benchmark"""
+
+    name: str
+    setup: Callable[[int], Workload]
+    quick_sizes: Sequence[int]
+    full_sizes: Sequence[int]
+
+
+def _forall_setup(size: int) -> Workload:
+    domain = list(range(1, size + 1))
+    return lambda: forall(is_positive, domain)
+
+
+def _exists_setup(size: int) -> Workload:
+    # No element matches, so the whole domain is scanned
+    domain = list(range(size))
+    no_match = greater_than(size)
+    return lambda: exists(no_match, domain)
+
+
+def _find_all_setup(size: int) -> Workload:
+    domain = list(range(size))
+    return lambda: find_all(is_even, domain)
+
+
+def _approx_count_setup(size: int) -> Workload:
+    # The sample size depends on the error bound, not on the domain size
+    domain = range(size)
+    return lambda: approx_count_where(is_even, domain, error=0.01, seed=0)
+
+
+def _indexed_find_all_setup(size: int) -> Workload:
+    domain = IndexedDomain(range(size))
+    # 100 distinct narrow ranges, as a dashboard refreshing its filters would
+    starts = [i * size // 100 for i in range(100)]
+    filters = [range_predicate(start, start + 10) for start in starts]
+    find_all(filters[0], domain)
+
+    def run() -> int:
+        return sum(len(find_all(pred, domain)) for pred in filters)
+
+    return run
+
+
+def _and_chain_setup(depth: int) -> Workload:
+    chain = reduce(logical_and, [greater_than(-i - 1) for i in range(depth)])
+    domain = list(range(1_000))
+    return lambda: find_all(chain, domain)
+
+
+def _compose_width_setup(width: int) -> Workload:
+    composed = compose_predicates(*[greater_than(-i - 1) for i in range(width)])
+    domain = list(range(1_000))
+    return lambda: find_all(composed, domain)
+
+
+def _filter_table_setup(size: int) -> Workload:
+    table = {
+        "price": array("d", (float(i % 1000) for i in range(size))),
+        "qty": array("q", (i % 7 for i in range(size))),
+    }
+    pred = logical_and(field("price", greater_than(900)), field("qty", less_than(3)))
+    return lambda: filter_table(pred, table)
+
+
+def _predicate_set_setup(size: int) -> Workload:
+    # Subscription filters drawn from a small pool of shared atoms
+    atoms = [field("price", greater_than(t)) for t in range(0, 1000, 100)]
+    atoms += [field("sku", type_predicate(str)), field("qty", range_predicate(1, 9))]
+    filters = PredicateSet(
+        logical_or(
+            logical_and(atoms[i % 12], logical_not(atoms[(i * 7 + 3) % 12])),
+            logical_and(atoms[(i * 5 + 1) % 12], atoms[(i * 11 + 2) % 12]),
+        )
+        for i in range(size)
+    )
+    records = [
+        {"price": (i * 37) % 1000, "sku": "ab" if i % 3 else 7, "qty": i % 12}
+        for i in range(100)
+    ]
+
+    def run() -> int:
+        return sum(len(filters.match(record)) for record in records)
+
+    return run
+
+
+def _is_transitive_setup(size: int) -> Workload:
+    domain = list(range(size))
+    return lambda: is_transitive(lambda a, b: a <= b, domain)
+
+
+def _triangles_setup(size: int) -> Workload:
+    # Random edges plus a hub linked both ways to many vertices, where
+    # pairwise joins would build every two-step path through the hub
+    rng = Random(0)
+    edges = {(rng.randrange(size // 4), rng.randrange(size // 4)) for _ in range(size)}
+    for v in range(1, size // 20):
+        edges.update([(0, v), (v, 0)])
+    rule = parse_rule("triangle(X, Y, Z) :- e(X, Y), e(Y, Z), e(Z, X)")
+    base = {"e": FactTable(edges)}
+    return lambda: len(materialize([rule], base)["triangle"])
+
+
+def _kb_recovery_setup(size: int) -> Workload:
+    # Restart of a persistent knowledge base: snapshot plus log tail replay
+    directory = TemporaryDirectory()
+    kb = PredicateLogic.open(directory.name, compact_after=size // 2 or None)
+    for i in range(size):
+        kb.add_fact(("edge", (f"n{i}", f"n{i + 1}")))
+    assert kb.log is not None
+    kb.log.close()
+
+    def run() -> int:
+        recovered = PredicateLogic.open(directory.name)
+        assert recovered.log is not None
+        recovered.log.close()
+        # Keeps the directory alive as long as the workload
+        return len(recovered.facts) + len(directory.name)
+
+    return run
+
+
+def _kb_facts_setup(size: int) -> Workload:
+    kb = PredicateLogic()
+    for i in range(size):
+        kb.add_fact(("edge", (f"n{i}", f"n{i + 1}")))
+    hits = [(f"n{i}", f"n{i + 1}") for i in range(0, size, max(1, size // 100))]
+    misses = [(f"n{i + 1}", f"n{i}") for i in range(0, size, max(1, size // 100))]
+    queries = hits + misses
+
+    def run() -> int:
+        return sum(1 for args in queries if kb.query("edge", *args))
+
+    return run
+
+
+def _kb_rules_setup(size: int) -> Workload:
+    kb = PredicateLogic()
+    for i in range(size):
+        kb.add_rule(lambda x, i=i: x == f"v{i}", ("derived", (f"v{i}",)))
+    queries = [f"v{i}" for i in range(0, size, max(1, size // 50))] + ["missing"]
+
+    def run() -> int:
+        return sum(1 for arg in queries if kb.query("derived", arg))
+
+    return run
+
+
+def _kb_goal_query_setup(size: int) -> Workload:
+    # A genealogy tree with three children per person; the queries ask about
+    # a few people only, so magic sets avoid materializing every ancestor
+    kb = PredicateLogic()
+    kb.load(
+        """
+        ancestor(X, Y) :- parent(X, Y).
+        ancestor(X, Z) :- parent(X, Y), ancestor(Y, Z).
+        """
+    )
+    for i in range(1, size):
+        kb.add_fact(("parent", (f"p{(i - 1) // 3}", f"p{i}")))
+    descendants = (f"p{size // 10}", Var("D"))
+    lineage = ("p0", f"p{size - 1}")
+    counter = count()
+
+    def run() -> int:
+        # A change in between, so that every run starts from a cold cache
+        kb.add_fact(("visited", (next(counter),)))
+        return len(kb.solve("ancestor", *descendants)) + kb.query(
+            "ancestor", *lineage
+        )
+
+    return run
+
+
+def _kb_incremental_setup(size: int) -> Workload:
+    # A stream of new facts, each followed by a query on a derived predicate
+    kb = PredicateLogic()
+    kb.load("grandparent(X, Z) :- parent(X, Y), parent(Y, Z).")
+    for i in range(size):
+        kb.add_fact(("parent", (f"p{i}", f"p{i + 1}")))
+    kb.set_rule_hook(lambda activation: None)
+    counter = count()
+
+    def run() -> int:
+        hits = 0
+        for _ in range(10):
+            i = next(counter)
+            kb.add_fact(("parent", (f"p{size + i}", f"q{i}")))
+            hits += kb.query("grandparent", f"p{size + i - 1}", f"q{i}")
+        return hits
+
+    return run
+
+
+def _kb_delete_setup(size: int) -> Workload:
+    # Facts removed and added back, each followed by a query on a derived
+    # predicate, with rules and fact filters maintained throughout
+    kb = PredicateLogic()
+    kb.load("grandparent(X, Z) :- parent(X, Y), parent(Y, Z).")
+    for i in range(size):
+        kb.add_fact(("parent", (f"p{i}", f"p{i + 1}")))
+    kb.set_rule_hook(lambda activation: None)
+    kb.set_fact_filter(0.01)
+    counter = count()
+
+    def run() -> int:
+        hits = 0
+        for _ in range(10):
+            i = next(counter) % (size - 1)
+            fact = ("parent", (f"p{i + 1}", f"p{i + 2}"))
+            kb.remove_fact(fact)
+            hits += kb.query("grandparent", f"p{i}", f"p{i + 2}")
+            kb.add_fact(fact)
+        return hits
+
+    return run
+
+
+CASES: List[BenchmarkCase] = [
+    BenchmarkCase(
+        "quantifiers.forall",
+        _forall_setup,
+        (10**3, 10**4, 10**5),
+        (10**3, 10**4, 10**5, 10**6, 10**7),
+    ),
+    BenchmarkCase(
+        "quantifiers.exists",
+        _exists_setup,
+        (10**3, 10**4, 10**5),
+        (10**3, 10**4, 10**5, 10**6, 10**7),
+    ),
+    BenchmarkCase(
+        "quantifiers.find_all",
+        _find_all_setup,
+        (10**3, 10**4, 10**5),
+        (10**3, 10**4, 10**5, 10**6, 10**7),
+    ),
+    BenchmarkCase(
+        "approximate.count_where",
+        _approx_count_setup,
+        (10**3, 10**5, 10**7),
+        (10**3, 10**5, 10**7, 10**9),
+    ),
+    BenchmarkCase(
+        "indexing.find_all_range",
+        _indexed_find_all_setup,
+        (10**3, 10**4, 10**5),
+        (10**3, 10**4, 10**5, 10**6, 10**7),
+    ),
+    BenchmarkCase(
+        "operators.logical_and_depth",
+        _and_chain_setup,
+        (4, 16, 64),
+        (4, 16, 64, 256),
+    ),
+    BenchmarkCase(
+        "predicates.compose_width",
+        _compose_width_setup,
+        (4, 16, 64),
+        (4, 16, 64, 256, 1024),
+    ),
+    BenchmarkCase(
+        "columnar.filter_table",
+        _filter_table_setup,
+        (10**3, 10**4, 10**5),
+        (10**3, 10**4, 10**5, 10**6, 10**7),
+    ),
+    BenchmarkCase(
+        "predicate_set.match",
+        _predicate_set_setup,
+        (10, 100, 1_000),
+        (10, 100, 1_000, 10_000),
+    ),
+    BenchmarkCase(
+        "relations.is_transitive",
+        _is_transitive_setup,
+        (10, 20, 40),
+        (10, 20, 40, 80, 160),
+    ),
+    BenchmarkCase(
+        "rules.triangles",
+        _triangles_setup,
+        (10**3, 10**4),
+        (10**3, 10**4, 10**5, 10**6),
+    ),
+    BenchmarkCase(
+        "knowledge_base.recovery",
+        _kb_recovery_setup,
+        (10**3, 10**4),
+        (10**3, 10**4, 10**5, 10**6),
+    ),
+    BenchmarkCase(
+        "knowledge_base.query_facts",
+        _kb_facts_setup,
+        (10**3, 10**4),
+        (10**3, 10**4, 10**5, 10**6),
+    ),
+    BenchmarkCase(
+        "knowledge_base.query_rules",
+        _kb_rules_setup,
+        (10, 100, 1_000),
+        (10, 100, 1_000, 10_000),
+    ),
+    BenchmarkCase(
+        "knowledge_base.goal_query",
+        _kb_goal_query_setup,
+        (10**3, 10**4, 10**5),
+        (10**3, 10**4, 10**5, 10**6),
+    ),
+    BenchmarkCase(
+        "knowledge_base.incremental_rules",
+        _kb_incremental_setup,
+        (10**2, 10**3, 10**4),
+        (10**2, 10**3, 10**4, 10**5),
+    ),
+    BenchmarkCase(
+        "knowledge_base.delete_facts",
+        _kb_delete_setup,
+        (10**2, 10**3, 10**4),
+        (10**2, 10**3, 10**4, 10**5),
+    ),
+]
+
+
+def cases_by_name() -> Dict[str, BenchmarkCase]:
+    """Return the registered cases keyed by name"""
+    return {case.name: case for case in CASES}
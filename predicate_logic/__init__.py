@@ -3,50 +3,175 @@ Predicate Logic Library
 
 A Python library for working with predicate logic, logical operators,
 quantifiers, and relations using functional programming approaches.
+
+Submodules are imported lazily (PEP 562): ``import predicate_logic`` is
+nearly free, and each name is loaded from its submodule the first time it
+is accessed. Optional backends such as NumPy are only imported by the
+submodules that use them.
 """
 
-from .knowledge_base import PredicateLogic
-from .logical_operators import (
-    logical_and,
-    logical_iff,
-    logical_implies,
-    logical_not,
-    logical_or,
-    logical_xor,
-)
-from .patterns import (
-    length_predicate,
-    pattern_predicate,
-    range_predicate,
-    type_predicate,
-)
-from .predicates import (
-    compose_predicates,
-    equals,
-    greater_than,
-    is_even,
-    is_positive,
-    less_than,
-)
-from .quantifiers import (
-    count_where,
-    exists,
-    exists_unique,
-    find_all,
-    find_first,
-    forall,
-)
-from .relations import (
-    bind_variable,
-    cartesian_predicate,
-    grandparent_of,
-    is_equivalence_relation,
-    is_reflexive,
-    is_symmetric,
-    is_transitive,
-    loves,
-    parent_of,
-)
+from __future__ import annotations
+
+import importlib
+
+# Importing typing alone would triple the cost of importing this package;
+# type checkers treat any constant named TYPE_CHECKING as true.
+TYPE_CHECKING = False
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, List
+
+    from .approximate import (
+        Estimate,
+        approx_count_where,
+        approx_exists,
+        approx_forall,
+    )
+    from .bdd import BDDManager, from_bdd, to_bdd
+    from .bloom import BloomFilter
+    from .columnar import field, filter_table, register_vectorized
+    from .formulas import (
+        evaluate_formula,
+        formula_predicate,
+        parse_formula,
+        parse_program,
+        parse_rule,
+    )
+    from .indexing import IndexedDomain
+    from .instrumentation import Profiler
+    from .knowledge_base import PredicateLogic
+    from .logical_operators import (
+        logical_and,
+        logical_iff,
+        logical_implies,
+        logical_not,
+        logical_or,
+        logical_xor,
+    )
+    from .patterns import (
+        length_predicate,
+        pattern_predicate,
+        range_predicate,
+        type_predicate,
+    )
+    from .predicate_set import PredicateSet
+    from .predicates import (
+        compose_predicates,
+        equals,
+        greater_than,
+        is_even,
+        is_positive,
+        less_than,
+    )
+    from .quantifiers import (
+        count_where,
+        exists,
+        exists_unique,
+        find_all,
+        find_first,
+        forall,
+    )
+    from .relations import (
+        bind_variable,
+        cartesian_predicate,
+        grandparent_of,
+        is_equivalence_relation,
+        is_reflexive,
+        is_symmetric,
+        is_transitive,
+        loves,
+        parent_of,
+    )
+    from .rete import ReteNetwork
+    from .rules import Aggregate, Atom, Rule, Var
+    from .satisfiability import (
+        are_equivalent,
+        dedupe_equivalent,
+        find_model,
+        is_satisfiable,
+        is_tautology,
+    )
+    from .serialization import (
+        from_bytes,
+        from_json,
+        register_function,
+        structural_hash,
+        to_bytes,
+        to_json,
+    )
+    from .wal import WriteAheadLog
+
+# Public name -> submodule that defines it
+_LAZY_IMPORTS: Dict[str, str] = {
+    "Estimate": "approximate",
+    "approx_count_where": "approximate",
+    "approx_exists": "approximate",
+    "approx_forall": "approximate",
+    "BDDManager": "bdd",
+    "from_bdd": "bdd",
+    "to_bdd": "bdd",
+    "BloomFilter": "bloom",
+    "field": "columnar",
+    "filter_table": "columnar",
+    "register_vectorized": "columnar",
+    "evaluate_formula": "formulas",
+    "formula_predicate": "formulas",
+    "parse_formula": "formulas",
+    "parse_program": "formulas",
+    "parse_rule": "formulas",
+    "IndexedDomain": "indexing",
+    "Profiler": "instrumentation",
+    "PredicateLogic": "knowledge_base",
+    "logical_and": "logical_operators",
+    "logical_iff": "logical_operators",
+    "logical_implies": "logical_operators",
+    "logical_not": "logical_operators",
+    "logical_or": "logical_operators",
+    "logical_xor": "logical_operators",
+    "length_predicate": "patterns",
+    "pattern_predicate": "patterns",
+    "range_predicate": "patterns",
+    "type_predicate": "patterns",
+    "PredicateSet": "predicate_set",
+    "compose_predicates": "predicates",
+    "equals": "predicates",
+    "greater_than": "predicates",
+    "is_even": "predicates",
+    "is_positive": "predicates",
+    "less_than": "predicates",
+    "count_where": "quantifiers",
+    "exists": "quantifiers",
+    "exists_unique": "quantifiers",
+    "find_all": "quantifiers",
+    "find_first": "quantifiers",
+    "forall": "quantifiers",
+    "bind_variable": "relations",
+    "cartesian_predicate": "relations",
+    "grandparent_of": "relations",
+    "is_equivalence_relation": "relations",
+    "is_reflexive": "relations",
+    "is_symmetric": "relations",
+    "is_transitive": "relations",
+    "loves": "relations",
+    "parent_of": "relations",
+    "ReteNetwork": "rete",
+    "Atom": "rules",
+    "Aggregate": "rules",
+    "Rule": "rules",
+    "Var": "rules",
+    "are_equivalent": "satisfiability",
+    "dedupe_equivalent": "satisfiability",
+    "find_model": "satisfiability",
+    "is_satisfiable": "satisfiability",
+    "is_tautology": "satisfiability",
+    "from_bytes": "serialization",
+    "from_json": "serialization",
+    "register_function": "serialization",
+    "structural_hash": "serialization",
+    "to_bytes": "serialization",
+    "to_json": "serialization",
+    "WriteAheadLog": "wal",
+}
 
 __version__ = "1.0.0"
 __author__ = "Your Name"
@@ -73,6 +198,11 @@ __all__ = [
     "count_where",
     "find_all",
     "find_first",
+    "IndexedDomain",
+    "approx_count_where",
+    "approx_forall",
+    "approx_exists",
+    "Estimate",
     # Relations
     "loves",
     "parent_of",
@@ -85,9 +215,70 @@ __all__ = [
     "bind_variable",
     # Knowledge base
     "PredicateLogic",
+    "WriteAheadLog",
+    "BloomFilter",
+    # Formulas and rules
+    "parse_formula",
+    "evaluate_formula",
+    "formula_predicate",
+    "parse_rule",
+    "parse_program",
+    "Var",
+    "Atom",
+    "Aggregate",
+    "Rule",
+    "ReteNetwork",
+    # Satisfiability
+    "is_satisfiable",
+    "is_tautology",
+    "are_equivalent",
+    "find_model",
+    "dedupe_equivalent",
+    # Decision diagrams
+    "to_bdd",
+    "from_bdd",
+    "BDDManager",
+    # Shared evaluation
+    "PredicateSet",
+    # Columnar filtering
+    "field",
+    "filter_table",
+    "register_vectorized",
+    # Instrumentation
+    "Profiler",
+    # Serialization
+    "to_json",
+    "from_json",
+    "to_bytes",
+    "from_bytes",
+    "structural_hash",
+    "register_function",
     # Pattern matching
     "pattern_predicate",
     "type_predicate",
     "range_predicate",
     "length_predicate",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    """Import public names and submodules on first access"""
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is not None:
+        value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    else:
+        try:
+            value = importlib.import_module(f".{name}", __name__)
+        except ModuleNotFoundError as e:
+            if e.name != f"{__name__}.{name}":
+                raise
+            raise AttributeError(
+                f"module {__name__!r} has no attribute {name!r}"
+            ) from None
+    # Cache it so later lookups bypass this function
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,9 @@
+"""
+Allow running the command-line tool with ``python -m predicate_logic``.
+"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,345 @@
+"""
+Approximate quantifiers by random sampling.
+
+Counting the elements of a very large domain that satisfy a predicate
+takes one predicate call per element. When a dashboard only needs the
+fraction to within a percent or so, a uniform random sample of a few
+thousand elements gives it with a stated confidence, whatever the size of
+the domain.
+
+approx_count_where() draws elements until a Wilson score interval around
+the observed fraction is narrow enough, checking at doubling sample sizes,
+and never draws more than the Hoeffding bound guarantees is sufficient.
+approx_forall() and approx_exists() look for a counterexample or a witness
+in a sample large enough to find one with the requested probability
+whenever at least a tolerance fraction of the domain has one.
+
+Sampled answers hold with a stated probability, not always. With ε the
+error (or tolerance) and δ = 1 - confidence, an estimate's interval misses
+the true fraction, and a quantifier misses a counterexample or witness held
+by at least an ε fraction of the domain, with probability at most δ over
+the random sample. approx_count_where splits δ between its Wilson checks
+and the Hoeffding bound (a union bound), so that this holds whichever one
+stops sampling. Only answers computed without sampling, and witnesses or
+counterexamples actually found, are certain.
+
+Sequences are sampled by position; other iterables are read once into a
+reservoir sample. An IndexedDomain answers indexable predicates exactly,
+and narrows others to the positions its indexes leave as candidates, so
+that only those are sampled. Domains no larger than the sample needed are
+evaluated exactly, stopping at the first witness or counterexample.
+"""
+
+from collections.abc import Sequence
+from itertools import islice
+from math import ceil, floor, log, log1p, sqrt
+from random import Random
+from statistics import NormalDist
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional, Tuple
+from typing import Sequence as SequenceType
+from typing import TypeVar
+
+from .expressions import compiled
+from .indexing import IndexedDomain
+
+T = TypeVar("T")
+
+# Type alias for a predicate function
+Predicate = Callable[[T], bool]
+
+# Sample size of the first check of the confidence interval
+_FIRST_CHECK = 64
+
+
+class Estimate(NamedTuple):
+    """Fraction of a domain satisfying a predicate, with a confidence interval"""
+
+    fraction: float
+    low: float
+    high: float
+    #: Predicate calls made; the whole domain (or candidates) if exact
+    samples: int
+    #: Number of elements in the domain
+    population: int
+    confidence: float
+    #: True if the fraction was computed without sampling
+    exact: bool
+
+    @property
+    def count(self) -> int:
+        """Estimated number of elements satisfying the predicate"""
+        return round(self.fraction * self.population)
+
+    @property
+    def count_interval(self) -> Tuple[int, int]:
+        """Bounds on the number of elements satisfying the predicate"""
+        if self.exact:
+            return self.count, self.count
+        return floor(self.low * self.population), ceil(self.high * self.population)
+
+    def __str__(self) -> str:
+        if self.exact:
+            return f"{self.count} of {self.population} (exact)"
+        low, high = self.count_interval
+        return (
+            f"~{self.count} of {self.population} "
+            f"({low}-{high} at {self.confidence:.0%} confidence, "
+            f"{self.samples} samples)"
+        )
+
+
+class _Candidates(Sequence):
+    """The elements of a domain at the given positions"""
+
+    def __init__(self, items: SequenceType[Any], positions: List[int]) -> None:
+        self.items = items
+        self.positions = positions
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __getitem__(self, index: Any) -> Any:
+        return self.items[self.positions[index]]
+
+
+def approx_count_where(
+    predicate: Predicate[T],
+    domain: Iterable[T],
+    error: float = 0.01,
+    confidence: float = 0.95,
+    seed: Optional[int] = None,
+) -> Estimate:
+    """Fraction and number of elements in domain that satisfy the predicate
+
+    The returned interval is at most 2ε wide, with ε = error, and contains
+    the true fraction with probability at least 1 - δ, with δ = 1 -
+    confidence: over the random sample, it misses with probability up to δ.
+    The δ is split between every check of the Wilson interval and the
+    closing Hoeffding bound, so this holds whichever one stops sampling.
+    An Estimate with exact set was computed without sampling and is
+    certain. seed makes the sample reproducible.
+    """
+    delta = _check("error", error, confidence)
+    rng = Random(seed)
+    items, size, matches = _population(predicate, domain)
+    if items is None:
+        return _exact(matches, size, 0, confidence)
+    test = compiled(predicate)
+    limit = _hoeffding_samples(error, delta / 2)
+    if not isinstance(items, Sequence):
+        sample, size = _reservoir(items, limit, rng)
+        if size <= limit:
+            hits = sum(1 for x in sample if test(x))
+            return _exact(hits, size, size, confidence)
+        rng.shuffle(sample)
+        draws: Iterable[T] = sample
+        scale = 1.0
+    elif len(items) <= limit:
+        hits = sum(1 for x in items if test(x))
+        return _exact(hits, size, len(items), confidence)
+    else:
+        # Only candidates are sampled: the estimate is scaled by their
+        # share of the domain, and so is the error it can afford
+        scale = len(items) / size
+        limit = _hoeffding_samples(min(error / scale, 0.5), delta / 2)
+        draws = _draws(items, limit, rng)
+
+    hits = samples = checks = 0
+    check = _FIRST_CHECK
+    for x in draws:
+        samples += 1
+        if test(x):
+            hits += 1
+        if samples == check:
+            # Every check spends part of delta / 2, so that the interval
+            # holds whichever check stops sampling (a union bound)
+            checks += 1
+            low, high = _wilson(hits, samples, delta / 2 ** (checks + 1))
+            if (high - low) * scale <= 2 * error:
+                break
+            check *= 2
+    else:
+        # Hoeffding's inequality, with the other half of delta
+        fraction = hits / samples
+        half = sqrt(log(4 / delta) / (2 * samples))
+        low, high = max(fraction - half, 0.0), min(fraction + half, 1.0)
+    return Estimate(
+        hits / samples * scale,
+        low * scale,
+        high * scale,
+        samples,
+        size,
+        confidence,
+        False,
+    )
+
+
+def approx_forall(
+    predicate: Predicate[T],
+    domain: Iterable[T],
+    tolerance: float = 0.01,
+    confidence: float = 0.95,
+    seed: Optional[int] = None,
+) -> bool:
+    """Approximate ∀x ∈ domain, P(x), checked on a random sample
+
+    False is only returned for a counterexample, and is certain; True is
+    probabilistic. With ε = tolerance and δ = 1 - confidence, if at least an
+    ε fraction of domain does not satisfy the predicate, True is returned
+    with probability at most δ. Rarer counterexamples may go unnoticed.
+    """
+    delta = _check("tolerance", tolerance, confidence)
+    rng = Random(seed)
+    if isinstance(domain, IndexedDomain):
+        found = domain.candidates(predicate)
+        if found is not None:
+            positions, exact = found
+            if len(positions) < len(domain):
+                # Some element is not even a candidate
+                return False
+            if exact:
+                return True
+    limit = _detection_samples(tolerance, delta)
+    if isinstance(domain, Sequence):
+        items: SequenceType[T] = domain
+    else:
+        items = _reservoir(domain, limit, rng)[0]
+    test = compiled(predicate)
+    if len(items) <= limit:
+        return all(test(x) for x in items)
+    return all(test(x) for x in _draws(items, limit, rng))
+
+
+def approx_exists(
+    predicate: Predicate[T],
+    domain: Iterable[T],
+    tolerance: float = 0.01,
+    confidence: float = 0.95,
+    seed: Optional[int] = None,
+) -> bool:
+    """Approximate ∃x ∈ domain, P(x), checked on a random sample
+
+    True is only returned for a witness, and sampling stops at the first one;
+    it is certain, while False is probabilistic. With ε = tolerance and
+    δ = 1 - confidence, if at least an ε fraction of domain satisfies the
+    predicate, False is returned with probability at most δ. Rarer witnesses
+    may go unnoticed.
+    """
+    delta = _check("tolerance", tolerance, confidence)
+    rng = Random(seed)
+    found, size, matches = _population(predicate, domain)
+    if found is None:
+        return matches > 0
+    limit = _detection_samples(tolerance, delta)
+    if not isinstance(found, Sequence):
+        found = _reservoir(found, limit, rng)[0]
+    items: SequenceType[T] = found
+    test = compiled(predicate)
+    if len(items) <= limit:
+        return any(test(x) for x in items)
+    # Witnesses make up at least tolerance * size / len(items) of the
+    # candidates, so fewer samples find one
+    share = min(tolerance * size / len(items), 1.0)
+    draws = _draws(items, _detection_samples(share, delta), rng)
+    return any(test(x) for x in draws)
+
+
+def _check(name: str, bound: float, confidence: float) -> float:
+    """Validate the parameters and return the failure probability"""
+    if not 0 < bound < 1:
+        raise ValueError(f"{name} must be between 0 and 1, got {bound}")
+    if not 0 < confidence < 1:
+        raise ValueError(f"confidence must be between 0 and 1, got {confidence}")
+    return 1 - confidence
+
+
+def _population(
+    predicate: Predicate[T], domain: Iterable[T]
+) -> Tuple[Optional[Iterable[T]], int, int]:
+    """The elements to sample, the size of the domain and the match count
+
+    The match count is only known (and the elements are None) when the
+    indexes of an IndexedDomain answer the predicate exactly. The size of an
+    iterable that is not a sequence is only known once it has been read.
+    """
+    if isinstance(domain, IndexedDomain):
+        found = domain.candidates(predicate)
+        if found is None:
+            return domain, len(domain), 0
+        positions, exact = found
+        if exact:
+            return None, len(domain), len(positions)
+        return _Candidates(domain, sorted(positions)), len(domain), 0
+    if isinstance(domain, Sequence):
+        return domain, len(domain), 0
+    return domain, 0, 0
+
+
+def _exact(hits: int, size: int, samples: int, confidence: float) -> Estimate:
+    fraction = hits / size if size else 0.0
+    return Estimate(fraction, fraction, fraction, samples, size, confidence, True)
+
+
+def _draws(items: SequenceType[T], limit: int, rng: Random) -> Iterable[T]:
+    """Up to limit elements drawn uniformly, with replacement"""
+    size = len(items)
+    randbelow = rng.randrange
+    return (items[randbelow(size)] for _ in range(limit))
+
+
+def _reservoir(
+    domain: Iterable[T], limit: int, rng: Random
+) -> Tuple[List[T], int]:
+    """A uniform sample of up to limit elements and the number of elements
+
+    Reads domain once, drawing a random number per element kept rather than
+    per element read (Li's Algorithm L).
+    """
+    iterator = iter(domain)
+    sample = list(islice(iterator, limit))
+    seen = len(sample)
+    if seen < limit:
+        return sample, seen
+    weight = _unit(rng) ** (1 / limit)
+    while True:
+        skip = floor(log(_unit(rng)) / log1p(-weight))
+        for _ in islice(iterator, skip):
+            seen += 1
+        item = next(iterator, _END)
+        if item is _END:
+            return sample, seen
+        seen += 1
+        sample[rng.randrange(limit)] = item
+        weight *= _unit(rng) ** (1 / limit)
+
+
+_END: Any = object()
+
+
+def _unit(rng: Random) -> float:
+    """A random float in (0, 1)"""
+    return 1.0 - rng.random()
+
+
+def _hoeffding_samples(error: float, delta: float) -> int:
+    """Samples after which the observed fraction is within error of the true
+    one with probability 1 - delta, whatever it is"""
+    return ceil(log(2 / delta) / (2 * error * error))
+
+
+def _detection_samples(share: float, delta: float) -> int:
+    """Samples that miss a share of the population with probability delta"""
+    if share >= 1:
+        return 1
+    return max(ceil(log(delta) / log1p(-share)), 1)
+
+
+def _wilson(hits: int, samples: int, delta: float) -> Tuple[float, float]:
+    """Wilson score interval of a binomial proportion at confidence 1 - delta"""
+    z = NormalDist().inv_cdf(1 - delta / 2)
+    fraction = hits / samples
+    z2 = z * z / samples
+    center = (fraction + z2 / 2) / (1 + z2)
+    half = z * sqrt(fraction * (1 - fraction) / samples + z2 / (4 * samples))
+    half /= 1 + z2
+    return max(center - half, 0.0), min(center + half, 1.0)
@@ -0,0 +1,304 @@
+"""
+Binary decision diagrams for compound predicates.
+
+to_bdd() turns a predicate built with the logical combinators into a
+reduced ordered BDD whose variables are its atomic predicates. Nodes live
+in a BDDManager: a unique table guarantees that each (atom, low, high)
+triple exists once, so equal functions are the same node and checking
+equivalence is a comparison of two integers, and a computed table caches
+the results of earlier apply() calls.
+
+Evaluating a BDD follows a single path from the root, testing each atom
+at most once, instead of re-evaluating shared sub-predicates the way
+nested logical_iff / logical_xor closures do. from_bdd() converts back to
+an ordinary combinator expression.
+
+As with the SAT checks, atoms are treated as independent variables;
+atoms that are structurally equal (under the same field() calls) are one
+variable.
+"""
+
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from .columnar import Field
+from .expressions import structural_key
+from .logical_operators import (
+    Biconditional,
+    Conjunction,
+    Disjunction,
+    ExclusiveOr,
+    Implication,
+    Negation,
+    logical_and,
+    logical_implies,
+    logical_not,
+    logical_or,
+)
+from .predicates import AllOf, compose_predicates
+
+# Type alias for a predicate function
+Predicate = Callable[[Any], bool]
+
+FALSE = 0
+TRUE = 1
+
+# Results of each operation on the terminal nodes
+_OPERATIONS: Dict[str, Callable[[bool, bool], bool]] = {
+    "and": lambda a, b: a and b,
+    "or": lambda a, b: a or b,
+    "xor": lambda a, b: a != b,
+    "iff": lambda a, b: a == b,
+    "implies": lambda a, b: (not a) or b,
+}
+
+
+class BDDManager:
+    """Shared node store for BDDs over one set of atoms
+
+    Node 0 is false and node 1 is true; every other node tests the atom
+    with index var[node] and continues to high[node] if it holds and to
+    low[node] otherwise. Atoms are ordered by first use.
+    """
+
+    def __init__(self, atoms: Iterable[Predicate] = ()) -> None:
+        self.atoms: List[Predicate] = []
+        self._atom_index: Dict[Hashable, int] = {}
+        self._var: List[int] = [-1, -1]
+        self._low: List[int] = [FALSE, TRUE]
+        self._high: List[int] = [FALSE, TRUE]
+        self._unique: Dict[Tuple[int, int, int], int] = {}
+        self._computed: Dict[Tuple[str, int, int], int] = {}
+        self.cache_lookups = 0
+        self.cache_hits = 0
+        for atom in atoms:
+            self.variable(atom)
+
+    def __len__(self) -> int:
+        """Number of nodes, including the two terminals"""
+        return len(self._var)
+
+    def variable(self, atom: Predicate) -> int:
+        """Index of the variable standing for atom, created on first use"""
+        key = structural_key(atom)
+        index = self._atom_index.get(key)
+        if index is None:
+            index = self._atom_index[key] = len(self.atoms)
+            self.atoms.append(atom)
+        return index
+
+    def _level(self, node: int) -> int:
+        """Position of a node's variable in the order; terminals come last"""
+        return self._var[node] if node > TRUE else len(self.atoms)
+
+    def node(self, var: int, low: int, high: int) -> int:
+        """The unique node testing var, reduced when both branches agree"""
+        if low == high:
+            return low
+        key = (var, low, high)
+        node = self._unique.get(key)
+        if node is None:
+            node = self._unique[key] = len(self._var)
+            self._var.append(var)
+            self._low.append(low)
+            self._high.append(high)
+        return node
+
+    def atom(self, predicate: Predicate) -> int:
+        """The node for a single atom"""
+        return self.node(self.variable(predicate), FALSE, TRUE)
+
+    def negate(self, u: int) -> int:
+        """The node for not u"""
+        return self.apply("xor", u, TRUE)
+
+    def apply(self, op: str, u: int, v: int) -> int:
+        """The node for u op v, where op is and, or, xor, iff or implies"""
+        if u <= TRUE and v <= TRUE:
+            return TRUE if _OPERATIONS[op](bool(u), bool(v)) else FALSE
+        if op == "and" and (u == FALSE or v == FALSE):
+            return FALSE
+        if op == "or" and (u == TRUE or v == TRUE):
+            return TRUE
+        if op in ("and", "or") and u == v:
+            return u
+        if op != "implies" and u > v:
+            # The other operations are commutative: share one cache entry
+            u, v = v, u
+        key = (op, u, v)
+        self.cache_lookups += 1
+        result = self._computed.get(key)
+        if result is not None:
+            self.cache_hits += 1
+            return result
+        level = min(self._level(u), self._level(v))
+        u_low, u_high = self._branches(u, level)
+        v_low, v_high = self._branches(v, level)
+        result = self.node(
+            level, self.apply(op, u_low, v_low), self.apply(op, u_high, v_high)
+        )
+        self._computed[key] = result
+        return result
+
+    def _branches(self, node: int, level: int) -> Tuple[int, int]:
+        if self._level(node) == level:
+            return self._low[node], self._high[node]
+        return node, node
+
+    def branches(self, node: int) -> Tuple[Predicate, int, int]:
+        """The atom a non-terminal node tests, and its low and high nodes"""
+        return self.atoms[self._var[node]], self._low[node], self._high[node]
+
+    def evaluate(self, node: int, value: Any) -> bool:
+        """Follow the path that value selects from node to a terminal"""
+        atoms, var, low, high = self.atoms, self._var, self._low, self._high
+        while node > TRUE:
+            node = high[node] if atoms[var[node]](value) else low[node]
+        return node == TRUE
+
+    def size(self, node: int) -> int:
+        """Number of nodes reachable from node, terminals included"""
+        seen = set()
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current not in seen:
+                seen.add(current)
+                if current > TRUE:
+                    stack.extend((self._low[current], self._high[current]))
+        return len(seen)
+
+
+class BDD:
+    """A predicate in canonical BDD form; call it like any predicate"""
+
+    __slots__ = ("manager", "node")
+
+    def __init__(self, manager: BDDManager, node: int) -> None:
+        self.manager = manager
+        self.node = node
+
+    def __call__(self, value: Any) -> bool:
+        return self.manager.evaluate(self.node, value)
+
+    def equivalent(self, other: "BDD") -> bool:
+        """True if both BDDs compute the same function (constant time)"""
+        if other.manager is not self.manager:
+            raise ValueError("BDDs from different managers cannot be compared")
+        return other.node == self.node
+
+    def is_tautology(self) -> bool:
+        """True if the predicate holds for every assignment of its atoms"""
+        return self.node == TRUE
+
+    def is_satisfiable(self) -> bool:
+        """True if some assignment of its atoms makes the predicate hold"""
+        return self.node != FALSE
+
+    def apply(self, op: str, other: "BDD") -> "BDD":
+        """Combine with another BDD of the same manager"""
+        if other.manager is not self.manager:
+            raise ValueError("BDDs from different managers cannot be combined")
+        return BDD(self.manager, self.manager.apply(op, self.node, other.node))
+
+    def size(self) -> int:
+        """Number of nodes in the diagram, terminals included"""
+        return self.manager.size(self.node)
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, BDD)
+            and other.manager is self.manager
+            and other.node == self.node
+        )
+
+    def __hash__(self) -> int:
+        return hash((id(self.manager), self.node))
+
+    def __repr__(self) -> str:
+        return f"BDD(node={self.node}, size={self.size()})"
+
+
+def to_bdd(predicate: Predicate, manager: Optional[BDDManager] = None) -> BDD:
+    """Canonical BDD of a combinator expression
+
+    Pass the same manager to compare or combine several predicates; its
+    unique and computed tables are shared between them.
+    """
+    manager = manager or BDDManager()
+    memo: Dict[Hashable, int] = {}
+    return BDD(manager, _build(manager, predicate, (), memo))
+
+
+def _build(
+    manager: BDDManager,
+    predicate: Predicate,
+    scope: Tuple[str, ...],
+    memo: Dict[Hashable, int],
+) -> int:
+    """BDD node for predicate, found under the field() names in scope"""
+    key = (scope, structural_key(predicate))
+    node = memo.get(key)
+    if node is not None:
+        return node
+
+    def build(child: Predicate) -> int:
+        return _build(manager, child, scope, memo)
+
+    if isinstance(predicate, Field):
+        name, inner = predicate.args
+        node = _build(manager, inner, scope + (name,), memo)
+    elif isinstance(predicate, Negation):
+        node = manager.negate(build(predicate.args[0]))
+    elif isinstance(predicate, (Conjunction, AllOf)):
+        node = TRUE
+        for child in predicate.args:
+            node = manager.apply("and", node, build(child))
+    elif isinstance(predicate, Disjunction):
+        node = manager.apply("or", *map(build, predicate.args))
+    elif isinstance(predicate, Implication):
+        node = manager.apply("implies", *map(build, predicate.args))
+    elif isinstance(predicate, Biconditional):
+        node = manager.apply("iff", *map(build, predicate.args))
+    elif isinstance(predicate, ExclusiveOr):
+        node = manager.apply("xor", *map(build, predicate.args))
+    else:
+        for name in reversed(scope):
+            predicate = Field(name, predicate)
+        node = manager.atom(predicate)
+    memo[key] = node
+    return node
+
+
+def from_bdd(bdd: BDD) -> Predicate:
+    """An equivalent combinator expression, sharing repeated sub-diagrams"""
+    manager = bdd.manager
+    built: Dict[int, Predicate] = {
+        TRUE: compose_predicates(),
+        FALSE: logical_not(compose_predicates()),
+    }
+
+    def convert(node: int) -> Predicate:
+        if node in built:
+            return built[node]
+        atom, low, high = manager.branches(node)
+        if (low, high) == (FALSE, TRUE):
+            result = atom
+        elif (low, high) == (TRUE, FALSE):
+            result = logical_not(atom)
+        elif high == TRUE:
+            result = logical_or(atom, convert(low))
+        elif low == FALSE:
+            result = logical_and(atom, convert(high))
+        elif low == TRUE:
+            result = logical_implies(atom, convert(high))
+        elif high == FALSE:
+            result = logical_and(logical_not(atom), convert(low))
+        else:
+            result = logical_or(
+                logical_and(atom, convert(high)),
+                logical_and(logical_not(atom), convert(low)),
+            )
+        built[node] = result
+        return result
+
+    return convert(bdd.node)
@@ -0,0 +1,95 @@
+"""
+Bloom filters for rejecting absent facts without a lookup.
+
+A BloomFilter answers "definitely not present" or "possibly present" for a
+set of hashable items in a fixed number of bits. It never reports an added
+item as absent, and reports an item that was never added as possibly
+present with a probability (the false-positive rate) fixed by its size:
+about 9.6 bits per item for 1%, 14.4 for 0.1%.
+
+PredicateLogic.set_fact_filter() keeps one filter per predicate over the
+argument tuples of its facts, so that a query for a fact that is not there
+is answered from the filter alone, before any fact index, rule or remote
+lookup. Items cannot be removed from a Bloom filter: removed facts stay
+possibly present until the filter is rebuilt.
+"""
+
+from math import ceil, exp, log
+from typing import Hashable, Iterable
+
+# Mixed into every item's hash, so that small ints (which hash to
+# themselves) spread over the whole bit array
+_SALT = 0x9E3779B97F4A7C15
+
+_MASK = (1 << 32) - 1
+
+
+class BloomFilter:
+    """A set membership filter with false positives but no false negatives"""
+
+    __slots__ = ("capacity", "error_rate", "size", "hashes", "count", "_bits")
+
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float = 0.01,
+        items: Iterable[Hashable] = (),
+    ) -> None:
+        if not 0 < error_rate < 1:
+            raise ValueError(f"error_rate must be between 0 and 1, got {error_rate}")
+        capacity = max(capacity, 1)
+        #: Items the filter holds at error_rate; it fills up beyond that
+        self.capacity = capacity
+        self.error_rate = error_rate
+        #: Number of bits and of bits set per item
+        self.size = max(ceil(-capacity * log(error_rate) / log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * log(2)), 1)
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+        for item in items:
+            self.add(item)
+
+    def add(self, item: Hashable) -> None:
+        # Double hashing: the k positions h1 + i * h2 behave like k
+        # independent hashes (Kirsch and Mitzenmacher)
+        h = hash((item, _SALT))
+        position, step = h & _MASK, (h >> 32) & _MASK | 1
+        bits, size = self._bits, self.size
+        for _ in range(self.hashes):
+            position %= size
+            bits[position >> 3] |= 1 << (position & 7)
+            position += step
+        self.count += 1
+
+    def __contains__(self, item: object) -> bool:
+        """False if item was definitely never added"""
+        h = hash((item, _SALT))
+        position, step = h & _MASK, (h >> 32) & _MASK | 1
+        bits, size = self._bits, self.size
+        for _ in range(self.hashes):
+            position %= size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+            position += step
+        return True
+
+    def __len__(self) -> int:
+        """Number of items added (counting repeats)"""
+        return self.count
+
+    @property
+    def full(self) -> bool:
+        """True once more items were added than the filter was sized for"""
+        return self.count > self.capacity
+
+    @property
+    def expected_false_positive_rate(self) -> float:
+        """False-positive rate predicted for the items added so far"""
+        return (1 - exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+    def __repr__(self) -> str:
+        return (
+            f"BloomFilter({self.count} of {self.capacity} items, "
+            f"{self.size} bits, {self.hashes} hashes)"
+        )
+
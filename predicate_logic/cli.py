@@ -0,0 +1,243 @@
+"""
+Command-line filter tool.
+
+Streams newline-delimited records from files or stdin through a predicate
+written with the library's combinators:
+
+    predicate-logic filter 'field("price", greater_than(100))' orders.ndjson
+    predicate-logic count 'logical_and(greater_than(0), is_even)' --format number
+    predicate-logic exists 'length_predicate(3)' --format text words.txt
+
+Regular files are memory-mapped, other inputs are read through large
+buffers. Lines are parsed and tested in batches, optionally spread over
+several processes (--jobs), and `exists` stops reading at the first match.
+"""
+
+import argparse
+import json
+import mmap
+import sys
+from itertools import islice
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+)
+
+from .expressions import compiled
+from .serialization import from_bytes, parse_expression, to_bytes
+
+READ_BUFFER_SIZE = 1 << 20
+
+
+def _parse_number(line: bytes) -> Any:
+    text = line.strip()
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def _parse_text(line: bytes) -> Any:
+    return line.rstrip(b"\r\n").decode("utf-8")
+
+
+RECORD_PARSERS: Dict[str, Callable[[bytes], Any]] = {
+    "json": json.loads,
+    "text": _parse_text,
+    "number": _parse_number,
+}
+
+
+class BatchMatcher:
+    """Parses a batch of raw lines and tests each record against a predicate"""
+
+    def __init__(
+        self, predicate: Callable[[Any], bool], fmt: str, skip_invalid: bool
+    ) -> None:
+        self.test = compiled(predicate)
+        self.parse = RECORD_PARSERS[fmt]
+        self.skip_invalid = skip_invalid
+
+    def matches(self, batch: Sequence[bytes]) -> Iterator[bytes]:
+        """The lines of batch whose records satisfy the predicate"""
+        test, parse = self.test, self.parse
+        for line in batch:
+            if not line.strip():
+                continue
+            try:
+                if test(parse(line)):
+                    yield line
+            except (ValueError, TypeError, KeyError, IndexError) as e:
+                if not self.skip_invalid:
+                    raise ValueError(f"cannot test record {line[:80]!r}: {e}") from e
+
+    def filter(self, batch: Sequence[bytes]) -> List[bytes]:
+        """Matching lines of the batch"""
+        return list(self.matches(batch))
+
+    def count(self, batch: Sequence[bytes]) -> int:
+        """Number of matching lines in the batch"""
+        return sum(1 for _ in self.matches(batch))
+
+    def exists(self, batch: Sequence[bytes]) -> bool:
+        """Whether any line of the batch matches"""
+        return next(self.matches(batch), None) is not None
+
+
+# The matcher of a worker process, installed by _init_worker
+_worker: Optional[BatchMatcher] = None
+
+
+def _init_worker(predicate_bytes: bytes, fmt: str, skip_invalid: bool) -> None:
+    global _worker
+    _worker = BatchMatcher(from_bytes(predicate_bytes), fmt, skip_invalid)
+
+
+def _run_in_worker(task: Any) -> Any:
+    command, batch = task
+    assert _worker is not None
+    return getattr(_worker, command)(batch)
+
+
+def read_lines(path: str, stdin: Optional[IO[bytes]] = None) -> Iterator[bytes]:
+    """Lines of path, memory-mapped when possible; "-" reads stdin"""
+    if path == "-":
+        stream = stdin if stdin is not None else sys.stdin.buffer
+        yield from stream
+        return
+    with open(path, "rb", buffering=READ_BUFFER_SIZE) as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files and pipes cannot be mapped
+            yield from f
+            return
+        with mapped:
+            yield from iter(mapped.readline, b"")
+
+
+def batches(lines: Iterable[bytes], size: int) -> Iterator[List[bytes]]:
+    """Split a stream of lines into lists of at most size lines"""
+    iterator = iter(lines)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def run(
+    command: str,
+    predicate: Callable[[Any], bool],
+    lines: Iterable[bytes],
+    out: IO[bytes],
+    fmt: str = "json",
+    batch_size: int = 10_000,
+    jobs: int = 1,
+    skip_invalid: bool = False,
+) -> int:
+    """Run filter/count/exists over lines and return the exit status"""
+    chunks = batches(lines, batch_size)
+    if jobs > 1:
+        from multiprocessing import Pool
+
+        with Pool(
+            jobs,
+            initializer=_init_worker,
+            initargs=(to_bytes(predicate), fmt, skip_invalid),
+        ) as pool:
+            tasks = ((command, batch) for batch in chunks)
+            results = pool.imap(_run_in_worker, tasks)
+            return _collect(command, results, out)
+    matcher = BatchMatcher(predicate, fmt, skip_invalid)
+    return _collect(command, map(getattr(matcher, command), chunks), out)
+
+
+def _collect(command: str, results: Iterable[Any], out: IO[bytes]) -> int:
+    if command == "exists":
+        found = any(results)
+        out.write(b"true\n" if found else b"false\n")
+        return 0 if found else 1
+    if command == "count":
+        out.write(f"{sum(results)}\n".encode())
+        return 0
+    for matches in results:
+        for line in matches:
+            out.write(line if line.endswith(b"\n") else line + b"\n")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Argument parser for the predicate-logic command"""
+    parser = argparse.ArgumentParser(
+        prog="predicate-logic",
+        description="Stream newline-delimited records through a predicate.",
+    )
+    parser.add_argument("command", choices=["filter", "count", "exists"])
+    parser.add_argument(
+        "expression",
+        help='predicate, e.g. \'field("price", greater_than(100))\'',
+    )
+    parser.add_argument(
+        "files", nargs="*", default=["-"], help="input files ('-' for stdin)"
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(RECORD_PARSERS),
+        default="json",
+        help="how each line is parsed (default: json)",
+    )
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="worker processes (default: 1)"
+    )
+    parser.add_argument(
+        "--skip-invalid",
+        action="store_true",
+        help="treat unparsable records and failing tests as non-matches",
+    )
+    return parser
+
+
+def main(
+    argv: Optional[Sequence[str]] = None,
+    stdin: Optional[IO[bytes]] = None,
+    stdout: Optional[IO[bytes]] = None,
+) -> int:
+    """Entry point of the predicate-logic command"""
+    parser = build_parser()
+    args = parser.parse_intermixed_args(argv)
+    out = stdout if stdout is not None else sys.stdout.buffer
+    try:
+        predicate = parse_expression(args.expression)
+    except ValueError as e:
+        parser.error(str(e))
+
+    lines = (line for path in args.files for line in read_lines(path, stdin))
+    try:
+        status = run(
+            args.command,
+            predicate,
+            lines,
+            out,
+            fmt=args.format,
+            batch_size=args.batch_size,
+            jobs=args.jobs,
+            skip_invalid=args.skip_invalid,
+        )
+    except (ValueError, OSError) as e:
+        print(f"predicate-logic: {e}", file=sys.stderr)
+        return 2
+    out.flush()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,397 @@
+"""
+Columnar filtering over record batches.
+
+A record batch is a mapping from column name to a column: a NumPy array,
+any object exporting the buffer protocol (array.array, memoryview, Arrow
+buffers) or a plain sequence. Predicates refer to columns with field(), and
+filter_table() evaluates the whole expression column by column instead of
+building a Python object per row.
+
+With NumPy installed, every atom becomes a vectorized boolean mask; plain
+functions are called row by row unless registered with
+register_vectorized(). Without it, columns are read through memoryviews
+and conjunctions narrow a selection vector, so later atoms only look at
+rows that are still candidates.
+"""
+
+import operator
+from array import array
+from functools import partial
+from itertools import compress
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Union,
+)
+
+from .expressions import Expression, compiled
+from .logical_operators import (
+    Biconditional,
+    Conjunction,
+    Disjunction,
+    ExclusiveOr,
+    Implication,
+    Negation,
+)
+from .patterns import HasLength, InRange, IsInstance
+from .predicates import AllOf, Equals, GreaterThan, LessThan, is_even, is_positive
+
+# Type aliases
+Table = Mapping[str, Any]
+Rows = Sequence[int]
+
+_numpy: Any = None
+_numpy_checked = False
+
+# Plain functions that may be called on a whole NumPy column
+_VECTORIZED: Set[Callable[..., Any]] = set()
+
+# Python type of the items produced by each struct format code
+_FORMAT_TYPES: Dict[str, type] = {
+    **{code: int for code in "bBhHiIlLqQnN"},
+    **{code: float for code in "efd"},
+    "?": bool,
+}
+
+# Python type of the items of each NumPy dtype kind
+_KIND_TYPES: Dict[str, type] = {
+    "b": bool,
+    "i": int,
+    "u": int,
+    "f": float,
+    "c": complex,
+    "U": str,
+    "S": bytes,
+}
+
+
+def _load_numpy() -> Any:
+    """Import NumPy on first use; None if it is not installed"""
+    global _numpy, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy = numpy
+        _numpy_checked = True
+    return _numpy
+
+
+def register_vectorized(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Let filter_table call a plain function once on a whole NumPy column
+
+    func must map an array to the boolean array of its results on each
+    item, as is_even (x % 2 == 0) does. Other plain functions are called
+    once per row.
+    """
+    _VECTORIZED.add(func)
+    return func
+
+
+for _func in (is_even, is_positive):
+    register_vectorized(_func)
+
+
+def _is_vectorized(func: Any) -> bool:
+    try:
+        return func in _VECTORIZED
+    except TypeError:
+        # Unhashable callables cannot have been registered
+        return False
+
+
+class Field(Expression):
+    """Apply a predicate to one named column or record field"""
+
+    __slots__ = ()
+    op = "field"
+    child_slice = slice(1, 2)
+
+    def compile(self) -> Callable[[Any], bool]:
+        name = self.args[0]
+        pred = compiled(self.args[1])
+        return lambda record: pred(record[name])
+
+
+def field(name: str, predicate: Callable[[Any], bool]) -> Callable[[Any], bool]:
+    """Predicate over a record (or table row) that tests record[name]"""
+    return Field(name, predicate)
+
+
+class TableView:
+    """Rows of a table selected by an index array, without copying columns"""
+
+    def __init__(self, table: Table, indices: Sequence[int]) -> None:
+        self.table = table
+        self.indices = indices
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    @property
+    def columns(self) -> List[str]:
+        """Names of the underlying columns"""
+        return list(self.table)
+
+    def column(self, name: str) -> Any:
+        """Selected values of one column
+
+        A contiguous selection of a NumPy column is returned as a view;
+        other selections are gathered on request.
+        """
+        np = _load_numpy()
+        col = self.table[name]
+        if np is not None and isinstance(col, np.ndarray):
+            idx = self.indices
+            if len(idx) and idx[-1] - idx[0] + 1 == len(idx):
+                return col[idx[0] : idx[-1] + 1]
+            return col[idx]
+        values = _as_column(col)
+        return [values[i] for i in self.indices]
+
+    def __getitem__(self, position: int) -> Dict[str, Any]:
+        row = self.indices[position]
+        return {name: col[row] for name, col in self.table.items()}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for position in range(len(self)):
+            yield self[position]
+
+
+def filter_table(
+    predicate: Callable[[Any], bool], table: Table, view: bool = False
+) -> Union[Sequence[int], TableView]:
+    """Indices of the rows of a columnar table that satisfy predicate
+
+    The predicate is built from field() and the library's combinators. The
+    result is a NumPy int64 array when NumPy is available and an
+    array('q') otherwise, or a TableView over the table if view is true.
+    """
+    n_rows = _row_count(table)
+    np = _load_numpy()
+    indices: Sequence[int]
+    if np is not None:
+        mask = _NumpyEvaluator(np, table, n_rows).mask(predicate, None)
+        indices = np.flatnonzero(mask)
+    else:
+        rows = _SelectionEvaluator(table).select(predicate, None, range(n_rows))
+        indices = array("q", rows)
+    return TableView(table, indices) if view else indices
+
+
+def _row_count(table: Table) -> int:
+    if not table:
+        raise ValueError("table has no columns")
+    lengths = {name: len(_as_column(col)) for name, col in table.items()}
+    if len(set(lengths.values())) > 1:
+        raise ValueError(f"columns have different lengths: {lengths}")
+    return next(iter(lengths.values()))
+
+
+def _as_column(col: Any) -> Any:
+    """Index-addressable view of a column, zero-copy for buffer objects"""
+    if isinstance(col, (list, tuple, range)):
+        return col
+    try:
+        view = memoryview(col)
+    except TypeError:
+        return col
+    if view.ndim != 1:
+        raise ValueError(f"columns must be one-dimensional, got {view.ndim} dims")
+    return view
+
+
+def _column_type(col: Any) -> Optional[type]:
+    """The single Python type of every item of a typed column, if known"""
+    if isinstance(col, memoryview):
+        return _FORMAT_TYPES.get(col.format.lstrip("@=<>!"))
+    dtype = getattr(col, "dtype", None)
+    if dtype is not None:
+        return _KIND_TYPES.get(dtype.kind)
+    return None
+
+
+def _missing_field(predicate: Any) -> TypeError:
+    return TypeError(
+        f"{predicate!r} does not name a column; wrap it in field(name, ...)"
+    )
+
+
+class _SelectionEvaluator:
+    """Pure-Python evaluation that narrows a selection vector of row numbers"""
+
+    def __init__(self, table: Table) -> None:
+        self.table = table
+
+    def select(self, pred: Any, col: Any, rows: Rows) -> List[int]:
+        """The subset of rows (kept in order) for which pred holds"""
+        if isinstance(pred, Field):
+            return self.select(pred.args[1], _as_column(self.table[pred.args[0]]), rows)
+        if isinstance(pred, (Conjunction, AllOf)):
+            selected: Rows = rows
+            for child in pred.args:
+                selected = self.select(child, col, selected)
+            return list(selected)
+        if isinstance(pred, Disjunction):
+            first = self.select(pred.args[0], col, rows)
+            rest = self.select(pred.args[1], col, _minus(rows, first))
+            return sorted(first + rest)
+        if isinstance(pred, Negation):
+            return _minus(rows, self.select(pred.args[0], col, rows))
+        if isinstance(pred, Implication):
+            antecedent = self.select(pred.args[0], col, rows)
+            held = self.select(pred.args[1], col, antecedent)
+            return sorted(_minus(rows, antecedent) + held)
+        if isinstance(pred, (Biconditional, ExclusiveOr)):
+            first = set(self.select(pred.args[0], col, rows))
+            second = set(self.select(pred.args[1], col, rows))
+            differ = isinstance(pred, ExclusiveOr)
+            return [i for i in rows if ((i in first) != (i in second)) == differ]
+        if col is None:
+            raise _missing_field(pred)
+        return self._atom(pred, col, rows)
+
+    def _atom(self, pred: Any, col: Any, rows: Rows) -> List[int]:
+        test: Callable[[Any], Any]
+        if isinstance(pred, GreaterThan):
+            test = partial(operator.lt, pred.args[0])
+        elif isinstance(pred, LessThan):
+            test = partial(operator.gt, pred.args[0])
+        elif isinstance(pred, Equals):
+            test = partial(operator.eq, pred.args[0])
+        elif isinstance(pred, IsInstance):
+            item_type = _column_type(col)
+            if item_type is not None:
+                matches = issubclass(item_type, pred.args[0])
+                return list(rows) if matches else []
+            test = compiled(pred)
+        elif isinstance(pred, (InRange, HasLength)):
+            test = compiled(pred)
+        elif isinstance(pred, Expression) or callable(pred):
+            test = compiled(pred)
+        else:
+            raise TypeError(f"cannot evaluate {pred!r} over a column")
+
+        if isinstance(rows, range) and rows == range(len(col)):
+            return list(compress(rows, map(test, col)))
+        return [i for i in rows if test(col[i])]
+
+
+def _minus(rows: Rows, removed: Rows) -> List[int]:
+    """rows without removed, keeping order; removed must be a subset"""
+    if not removed:
+        return list(rows)
+    gone = set(removed)
+    return [i for i in rows if i not in gone]
+
+
+class _NumpyEvaluator:
+    """Vectorized evaluation producing one boolean mask per node"""
+
+    def __init__(self, np: Any, table: Table, n_rows: int) -> None:
+        self.np = np
+        self.table = table
+        self.n_rows = n_rows
+        self.columns: Dict[str, Any] = {}
+
+    def column(self, name: str) -> Any:
+        """The named column as an ndarray, zero-copy for buffer objects"""
+        if name not in self.columns:
+            self.columns[name] = self._to_array(self.table[name])
+        return self.columns[name]
+
+    def _to_array(self, col: Any) -> Any:
+        np = self.np
+        if isinstance(col, np.ndarray):
+            return col
+        view = _as_column(col)
+        if not isinstance(view, memoryview):
+            return np.asarray(view)
+        # np.asarray(b"...") would be a single bytes scalar, not a column
+        try:
+            return np.frombuffer(view, dtype=view.format)
+        except (TypeError, ValueError):
+            # Strided views, and formats NumPy has no dtype for
+            return np.asarray(list(col))
+
+    def mask(self, pred: Any, name: Optional[str]) -> Any:
+        """Boolean mask of the rows for which pred holds on column name"""
+        np = self.np
+        if isinstance(pred, Field):
+            return self.mask(pred.args[1], pred.args[0])
+        if isinstance(pred, (Conjunction, AllOf)):
+            result = np.ones(self.n_rows, dtype=bool)
+            for child in pred.args:
+                result &= self.mask(child, name)
+            return result
+        if isinstance(pred, Disjunction):
+            return self.mask(pred.args[0], name) | self.mask(pred.args[1], name)
+        if isinstance(pred, Negation):
+            return ~self.mask(pred.args[0], name)
+        if isinstance(pred, Implication):
+            return ~self.mask(pred.args[0], name) | self.mask(pred.args[1], name)
+        if isinstance(pred, Biconditional):
+            return self.mask(pred.args[0], name) == self.mask(pred.args[1], name)
+        if isinstance(pred, ExclusiveOr):
+            return self.mask(pred.args[0], name) ^ self.mask(pred.args[1], name)
+        if name is None:
+            raise _missing_field(pred)
+        if isinstance(pred, IsInstance):
+            return self._type_mask(pred, name)
+        return self._atom(pred, self.column(name))
+
+    def _type_mask(self, pred: IsInstance, name: str) -> Any:
+        """IsInstance over the items the table's column yields
+
+        A typed column is answered by one check of its item type: the items
+        of an int64 array are np.int64, those of an array('q') are int.
+        Only object columns and sequences are checked row by row.
+        """
+        col = self.table[name]
+        if isinstance(col, self.np.ndarray):
+            item_type = None if col.dtype.kind == "O" else col.dtype.type
+        else:
+            col = _as_column(col)
+            item_type = _column_type(col)
+        if item_type is None:
+            return self._row_wise(pred, col)
+        if issubclass(item_type, pred.args[0]):
+            return self.np.ones(self.n_rows, dtype=bool)
+        return self.np.zeros(self.n_rows, dtype=bool)
+
+    def _row_wise(self, pred: Any, col: Any) -> Any:
+        test = compiled(pred)
+        return self.np.fromiter(
+            (bool(test(v)) for v in col), dtype=bool, count=self.n_rows
+        )
+
+    def _atom(self, pred: Any, col: Any) -> Any:
+        np = self.np
+        if isinstance(pred, GreaterThan):
+            return np.asarray(col > pred.args[0], dtype=bool)
+        if isinstance(pred, LessThan):
+            return np.asarray(col < pred.args[0], dtype=bool)
+        if isinstance(pred, Equals):
+            return np.asarray(col == pred.args[0], dtype=bool)
+        if isinstance(pred, InRange):
+            low, high = pred.args
+            return np.asarray((col >= low) & (col <= high), dtype=bool)
+        if isinstance(pred, HasLength) and col.dtype.kind in "US":
+            return np.char.str_len(col) == pred.args[0]
+        if isinstance(pred, HasLength) and col.dtype.kind not in "OV":
+            return np.zeros(self.n_rows, dtype=bool)
+        if not isinstance(pred, Expression) and _is_vectorized(pred):
+            try:
+                return np.asarray(pred(col), dtype=bool)
+            except (TypeError, ValueError):
+                # No array form for this dtype, such as is_even on strings
+                pass
+        return self._row_wise(pred, col)
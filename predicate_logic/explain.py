@@ -0,0 +1,105 @@
+"""
+Query plans for the knowledge base.
+
+PredicateLogic.explain() answers a query while recording each step it
+took, in the spirit of SQL's EXPLAIN ANALYZE: which index was consulted,
+how many rows were expected and produced, and how long the step took.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class PlanStep:
+    """One operation in a query plan"""
+
+    def __init__(
+        self,
+        operation: str,
+        index: Optional[str] = None,
+        detail: str = "",
+        estimated_rows: Optional[int] = None,
+    ) -> None:
+        self.operation = operation
+        self.index = index
+        self.detail = detail
+        self.estimated_rows = estimated_rows
+        self.actual_rows: Optional[int] = None
+        self.elapsed: Optional[float] = None
+        self.children: List["PlanStep"] = []
+
+    @property
+    def executed(self) -> bool:
+        """False if the query was answered before reaching this step"""
+        return self.elapsed is not None
+
+    def add(self, step: "PlanStep") -> "PlanStep":
+        """Attach a child step and return it"""
+        self.children.append(step)
+        return step
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Export the step and its children as plain data"""
+        return {
+            "operation": self.operation,
+            "index": self.index,
+            "detail": self.detail,
+            "estimated_rows": self.estimated_rows,
+            "actual_rows": self.actual_rows,
+            "elapsed": self.elapsed,
+            "children": [child.as_dict() for child in self.children],
+        }
+
+    def render(self, indent: int = 0) -> List[str]:
+        """Render the step and its children as indented lines"""
+        line = f"{'  ' * indent}-> {self.operation}"
+        if self.index is not None:
+            line += f" using {self.index}"
+        if self.detail:
+            line += f" [{self.detail}]"
+        line += f"  (rows est={_fmt(self.estimated_rows)}"
+        if self.executed:
+            assert self.elapsed is not None
+            line += f" actual={_fmt(self.actual_rows)} time={self.elapsed * 1e3:.3f}ms)"
+        else:
+            line += ") (never executed)"
+        lines = [line]
+        for child in self.children:
+            lines.extend(child.render(indent + 1))
+        return lines
+
+
+class QueryPlan:
+    """The annotated plan and outcome of one knowledge base query"""
+
+    def __init__(self, predicate: str, args: Tuple[Any, ...]) -> None:
+        self.predicate = predicate
+        self.args = args
+        self.steps: List[PlanStep] = []
+        self.result = False
+        self.elapsed = 0.0
+
+    def add(self, step: PlanStep) -> PlanStep:
+        """Append a top-level step and return it"""
+        self.steps.append(step)
+        return step
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Export the plan as plain data"""
+        return {
+            "query": [self.predicate, list(self.args)],
+            "result": self.result,
+            "elapsed": self.elapsed,
+            "steps": [step.as_dict() for step in self.steps],
+        }
+
+    def __str__(self) -> str:
+        args = ", ".join(repr(arg) for arg in self.args)
+        lines = [f"QUERY {self.predicate}({args})"]
+        for step in self.steps:
+            lines.extend(step.render(1))
+        lines.append(f"Result: {self.result}  Total time: {self.elapsed * 1e3:.3f}ms")
+        return "\n".join(lines)
+
+
+def _fmt(rows: Optional[int]) -> str:
+    return "?" if rows is None else str(rows)
@@ -0,0 +1,135 @@
+"""
+Structured predicate expressions.
+
+Combinators return Expression objects instead of anonymous closures. An
+expression is called exactly like the closure it replaces, but keeps its
+operator name and arguments so the structure of a compound predicate can be
+inspected, rebuilt, compared, pickled and serialized.
+
+Evaluation still runs through plain closures: every expression compiles
+itself once, on construction, into the closure the combinator used to
+return, built from its children's compiled closures. An expression is a
+functools.partial over that closure, so a call is forwarded to it in C
+without running any Python code of its own.
+"""
+
+from abc import ABCMeta, abstractmethod
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple, Type
+
+
+def _uncompiled(*args: Any) -> Any:
+    raise TypeError("expression called before it was compiled")
+
+
+class Expression(partial, metaclass=ABCMeta):
+    """Base class for callable predicate expressions
+
+    The partial's func is the compiled closure; args (which shadows the
+    partial's own, always empty, bound arguments) holds the operands.
+    """
+
+    __slots__ = ("args", "_key")
+
+    #: Name of the combinator that built this expression
+    op: str = ""
+    #: Which entries of ``args`` hold sub-predicates
+    child_slice: slice = slice(0, 0)
+
+    #: Every concrete expression class, keyed by op
+    registry: Dict[str, Type["Expression"]] = {}
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if cls.op:
+            Expression.registry[cls.op] = cls
+
+    def __new__(cls, *args: Any) -> "Expression":
+        if cls.__abstractmethods__:
+            # partial.__new__ skips the check object.__new__ makes
+            abstract = ", ".join(sorted(cls.__abstractmethods__))
+            raise TypeError(
+                f"Can't instantiate abstract class {cls.__name__} "
+                f"with abstract methods {abstract}"
+            )
+        self = super().__new__(cls, _uncompiled)
+        self.args = args
+        self._key = None
+        # The function of a partial can only be replaced through its state
+        self.__setstate__((self.compile(), (), {}, None))
+        return self
+
+    def __get__(self, obj: Any, objtype: Any = None) -> "Expression":
+        # Stored on a class, an expression is not bound as a method
+        return self
+
+    @abstractmethod
+    def compile(self) -> Callable[..., Any]:
+        """Build the plain closure that evaluates this expression"""
+
+    @property
+    def children(self) -> Tuple[Callable[..., Any], ...]:
+        """The sub-predicates this expression combines"""
+        return self.args[self.child_slice]
+
+    def with_children(self, children: Sequence[Callable[..., Any]]) -> "Expression":
+        """Return a copy of this expression with its sub-predicates replaced"""
+        args = list(self.args)
+        args[self.child_slice] = children
+        return type(self)(*args)
+
+    def key(self) -> Hashable:
+        """Hashable structural identity: equal keys mean identical behaviour"""
+        if self._key is None:
+            self._key = (self.op, tuple(structural_key(arg) for arg in self.args))
+        return self._key
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Expression):
+            return NotImplemented
+        return self is other or self.key() == other.key()
+
+    def __hash__(self) -> int:
+        return hash(self.key())
+
+    def __reduce__(self) -> Tuple[Any, Tuple[Any, ...]]:
+        return (type(self), self.args)
+
+    def __repr__(self) -> str:
+        return f"{self.op}({', '.join(describe(arg) for arg in self.args)})"
+
+
+def compiled(predicate: Callable[..., Any]) -> Callable[..., Any]:
+    """The fastest callable equivalent to predicate"""
+    if isinstance(predicate, Expression):
+        return predicate.func
+    return predicate
+
+
+def structural_key(obj: Any) -> Hashable:
+    """Hashable key for an expression argument, distinguishing 1 from 1.0"""
+    if isinstance(obj, Expression):
+        return obj.key()
+    if isinstance(obj, (list, tuple)):
+        return (type(obj).__name__, tuple(structural_key(item) for item in obj))
+    if callable(obj):
+        # Plain functions, types and other callables compare by identity
+        return ("callable", obj)
+    if isinstance(obj, (dict, set, frozenset)):
+        items = obj.items() if isinstance(obj, dict) else obj
+        return (type(obj).__name__, frozenset(map(repr, items)))
+    return (type(obj).__name__, obj)
+
+
+def describe(obj: Any) -> str:
+    """Short human-readable name for a predicate or literal argument"""
+    if isinstance(obj, Expression):
+        return repr(obj)
+    if isinstance(obj, type):
+        return obj.__name__
+    if isinstance(obj, tuple):
+        inner = ", ".join(describe(item) for item in obj)
+        return f"({inner},)" if len(obj) == 1 else f"({inner})"
+    if callable(obj):
+        return getattr(obj, "__name__", repr(obj))
+    return repr(obj)
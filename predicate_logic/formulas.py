@@ -0,0 +1,494 @@
+"""
+Text syntax for first-order formulas and Horn rules.
+
+Formulas are written the way they are on paper and compile onto the
+library's combinators and quantifiers:
+
+    forall x in D: even(x) -> positive(x)
+    exists! p in people: ~married(p) & loves(p, "Bob")
+
+Horn rules and facts use Prolog syntax, with capitalized names as
+variables, and are loaded into a PredicateLogic knowledge base. Rule
+bodies may negate atoms, and rule heads may aggregate:
+
+    parent(john, mary).
+    grandparent(X, Z) :- parent(X, Y), parent(Y, Z).
+    childless(X) :- person(X), not parent(X, _).
+    children(X, count(Y)) :- parent(X, Y).
+
+Parsing is cached by source text, without a size bound, so a formula or
+rule that is evaluated over and over is only tokenized and parsed once, even
+in rule bases of many thousands of rules. The parse functions' cache_clear()
+frees the cache.
+"""
+
+import ast
+import re
+from functools import lru_cache
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from . import logical_operators, quantifiers
+from .rules import Aggregate, Atom, Rule, Var
+
+# Type alias for a predicate function
+Predicate = Callable[[Any], bool]
+
+
+class Quantified(NamedTuple):
+    """forall/exists/exists! var in domain: body"""
+
+    quantifier: str
+    var: str
+    domain: str
+    body: "Formula"
+
+
+class Connective(NamedTuple):
+    """A binary connective, named after its combinator (logical_and, ...)"""
+
+    op: str
+    left: "Formula"
+    right: "Formula"
+
+
+class Not(NamedTuple):
+    """~operand"""
+
+    operand: "Formula"
+
+
+class Truth(NamedTuple):
+    """The constant true or false"""
+
+    value: bool
+
+
+Formula = Union[Quantified, Connective, Not, Truth, Atom]
+
+# Program clauses: a ground fact or a rule
+Clause = Union[Atom, Rule]
+
+_QUANTIFIERS: Dict[str, Callable[[Predicate, Iterable[Any]], bool]] = {
+    "forall": quantifiers.forall,
+    "exists": quantifiers.exists,
+    "exists!": quantifiers.exists_unique,
+}
+
+_TOKEN = re.compile(
+    r"""
+    (?P<space>\s+|[%\#][^\n]*)
+    |(?P<number>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)
+    |(?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+    |(?P<name>[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<op>:-|<->|->|∃!|[∀∃¬∧∨⊕→↔(),:.&|~^!])
+    """,
+    re.VERBOSE,
+)
+
+# Spellings of each operator token
+_ALIASES = {
+    "forall": "forall",
+    "exists": "exists",
+    "∀": "forall",
+    "∃": "exists",
+    "∃!": "exists!",
+    "¬": "~",
+    "!": "~",
+    "not": "~",
+    "∧": "&",
+    "and": "&",
+    "∨": "|",
+    "or": "|",
+    "⊕": "^",
+    "xor": "^",
+    "→": "->",
+    "↔": "<->",
+}
+
+# Binary connectives from loosest to tightest binding
+_LEVELS: List[Tuple[str, str]] = [
+    ("<->", "logical_iff"),
+    ("->", "logical_implies"),
+    ("|", "logical_or"),
+    ("^", "logical_xor"),
+    ("&", "logical_and"),
+]
+
+
+class _Token(NamedTuple):
+    kind: str
+    text: str
+    position: int
+
+
+def _tokenize(source: str) -> List[_Token]:
+    tokens = []
+    position = 0
+    while position < len(source):
+        match = _TOKEN.match(source, position)
+        if match is None:
+            raise ValueError(
+                f"unexpected character {source[position]!r} at column "
+                f"{position + 1} in {source!r}"
+            )
+        kind = match.lastgroup
+        assert kind is not None
+        text = match.group()
+        if kind == "name" and text in _ALIASES:
+            kind, text = "op", _ALIASES[text]
+        elif kind == "op":
+            text = _ALIASES.get(text, text)
+        if kind != "space":
+            tokens.append(_Token(kind, text, position))
+        position = match.end()
+    tokens.append(_Token("end", "", len(source)))
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser over a token list"""
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.tokens = _tokenize(source)
+        self.index = 0
+        self.scopes: List[str] = []
+        self.anonymous = 0
+
+    def peek(self) -> _Token:
+        return self.tokens[self.index]
+
+    def advance(self) -> _Token:
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def accept(self, text: str) -> bool:
+        token = self.peek()
+        if token.kind in ("op", "name") and token.text == text:
+            self.index += 1
+            return True
+        return False
+
+    def expect(self, text: str) -> None:
+        if not self.accept(text):
+            self.fail(f"expected {text!r}")
+
+    def fail(self, message: str) -> Any:
+        token = self.peek()
+        found = "end of input" if token.kind == "end" else repr(token.text)
+        raise ValueError(
+            f"{message}, found {found} at column {token.position + 1} "
+            f"in {self.source!r}"
+        )
+
+    def at_end(self) -> bool:
+        return self.peek().kind == "end"
+
+    # Formulas ------------------------------------------------------------
+
+    def formula(self) -> Formula:
+        token = self.peek()
+        if token.kind == "op" and token.text in _QUANTIFIERS:
+            return self.quantified()
+        return self.binary(0)
+
+    def quantified(self) -> Formula:
+        quantifier = self.advance().text
+        if quantifier == "exists" and self.accept("~"):
+            # exists!x is tokenized as exists followed by a negation mark
+            quantifier = "exists!"
+        var = self.name("variable")
+        self.expect("in")
+        domain = self.name("domain")
+        self.expect(":")
+        self.scopes.append(var)
+        body = self.formula()
+        self.scopes.pop()
+        return Quantified(quantifier, var, domain, body)
+
+    def binary(self, level: int) -> Formula:
+        if level == len(_LEVELS):
+            return self.unary()
+        symbol, op = _LEVELS[level]
+        left = self.binary(level + 1)
+        if symbol == "->":
+            # Implication associates to the right
+            if self.accept(symbol):
+                return Connective(op, left, self.operand(level))
+            return left
+        while self.accept(symbol):
+            left = Connective(op, left, self.operand(level + 1))
+        return left
+
+    def operand(self, level: int) -> Formula:
+        """A right-hand operand, which may be a quantifier running to the end"""
+        token = self.peek()
+        if token.kind == "op" and token.text in _QUANTIFIERS:
+            return self.quantified()
+        return self.binary(level)
+
+    def unary(self) -> Formula:
+        if self.accept("~"):
+            return Not(self.unary())
+        if self.accept("("):
+            inner = self.formula()
+            self.expect(")")
+            return inner
+        token = self.peek()
+        if token.kind == "op" and token.text in _QUANTIFIERS:
+            return self.quantified()
+        if token.kind == "name" and token.text in ("true", "false"):
+            self.advance()
+            return Truth(token.text == "true")
+        return self.atom(rule=False)
+
+    # Atoms and clauses ---------------------------------------------------
+
+    def name(self, what: str) -> str:
+        token = self.peek()
+        if token.kind != "name":
+            self.fail(f"expected a {what} name")
+        self.advance()
+        return token.text
+
+    def atom(self, rule: bool, head: bool = False) -> Atom:
+        predicate = self.name("predicate")
+        args: List[Any] = []
+        self.expect("(")
+        if not self.accept(")"):
+            args.append(self.term(rule, head))
+            while self.accept(","):
+                args.append(self.term(rule, head))
+            self.expect(")")
+        return Atom(predicate, tuple(args))
+
+    def term(self, rule: bool, head: bool = False) -> Any:
+        token = self.advance()
+        if token.kind == "number":
+            return ast.literal_eval(token.text)
+        if token.kind == "string":
+            return ast.literal_eval(token.text)
+        if token.kind != "name":
+            self.index -= 1
+            return self.fail("expected a term")
+        text = token.text
+        if head and self.accept("("):
+            # An aggregate such as count(X)
+            var = self.term(rule)
+            if not isinstance(var, Var) or var.name.startswith("_"):
+                self.index -= 1
+                self.fail(f"expected the variable {text} aggregates")
+            self.expect(")")
+            return Aggregate(text, var)
+        if rule:
+            if text == "_":
+                self.anonymous += 1
+                return Var(f"_{self.anonymous}")
+            if text[0].isupper() or text[0] == "_":
+                return Var(text)
+            return text
+        if text in self.scopes:
+            return Var(text)
+        if text[0].isupper() or text[0] == "_":
+            self.index -= 1
+            return self.fail(f"variable {text!r} is not bound by a quantifier")
+        return text
+
+    def literal(self) -> Atom:
+        """A rule body atom, possibly negated with not (or ~)"""
+        if self.accept("~"):
+            return self.atom(rule=True)._replace(negated=True)
+        return self.atom(rule=True)
+
+    def clause(self) -> Clause:
+        head = self.atom(rule=True, head=True)
+        if not self.accept(":-"):
+            if not head.is_ground():
+                self.fail(f"fact {head} must not contain variables")
+            self.expect(".")
+            return head
+        body = [self.literal()]
+        while self.accept(","):
+            body.append(self.literal())
+        self.expect(".")
+        try:
+            return Rule(head, tuple(body)).validate()
+        except ValueError as e:
+            raise ValueError(f"{e} in {self.source!r}") from None
+
+
+@lru_cache(maxsize=None)
+def parse_formula(source: str, free: Tuple[str, ...] = ()) -> Formula:
+    """Parse a first-order formula such as forall x in D: even(x) -> positive(x)
+
+    Names in free may be used as variables without a quantifier.
+    """
+    parser = _Parser(source)
+    parser.scopes.extend(free)
+    formula = parser.formula()
+    if not parser.at_end():
+        parser.fail("unexpected input after formula")
+    return formula
+
+
+@lru_cache(maxsize=None)
+def parse_rule(source: str) -> Rule:
+    """Parse one Horn rule; the closing period is optional"""
+    text = source.rstrip()
+    clause = _parse_clauses(text if text.endswith(".") else text + ".")
+    if len(clause) != 1 or not isinstance(clause[0], Rule):
+        raise ValueError(f"expected a single rule in {source!r}")
+    return clause[0]
+
+
+@lru_cache(maxsize=None)
+def parse_program(source: str) -> Tuple[Clause, ...]:
+    """Parse facts and rules, each terminated by a period"""
+    return _parse_clauses(source)
+
+
+def _parse_clauses(source: str) -> Tuple[Clause, ...]:
+    parser = _Parser(source)
+    clauses = []
+    while not parser.at_end():
+        clauses.append(parser.clause())
+    return tuple(clauses)
+
+
+# Compilation -----------------------------------------------------------
+
+_MISSING = object()
+
+
+class _Compiler:
+    """Turns a formula into combinator predicates over its quantified variable
+
+    Atoms on the quantified variable alone are the environment's predicates
+    themselves, so the compiled body is a plain logical_and / logical_or /
+    ... expression that the quantifiers (and IndexedDomain) can inspect.
+    Values of enclosing variables are read from a shared frame that each
+    nested quantifier fills in before it runs.
+    """
+
+    def __init__(self, env: Mapping[str, Any], knowledge_base: Any) -> None:
+        self.env = env
+        self.knowledge_base = knowledge_base
+        self.frame: Dict[str, Any] = {}
+
+    def lookup(self, name: str, what: str) -> Any:
+        if name in self.env:
+            return self.env[name]
+        if what == "predicate" and self.knowledge_base is not None:
+            kb = self.knowledge_base
+            return lambda *args: kb.query(name, *args)
+        raise ValueError(f"unknown {what} {name!r} in formula")
+
+    def predicate(self, node: Formula, var: Optional[str]) -> Predicate:
+        """A predicate of the value of var that evaluates node"""
+        if isinstance(node, Truth):
+            value = node.value
+            return lambda _: value
+        if isinstance(node, Not):
+            return logical_operators.logical_not(self.predicate(node.operand, var))
+        if isinstance(node, Connective):
+            combine = getattr(logical_operators, node.op)
+            left = self.predicate(node.left, var)
+            return combine(left, self.predicate(node.right, var))
+        if isinstance(node, Quantified):
+            return self.quantified(node, var)
+        return self.atom(node, var)
+
+    def atom(self, node: Atom, var: Optional[str]) -> Predicate:
+        fn = self.lookup(node.predicate, "predicate")
+        if var is not None and node.args == (Var(var),):
+            return fn
+        args = node.args
+        frame = self.frame
+
+        def leaf(value: Any) -> bool:
+            values = [
+                (value if arg.name == var else frame[arg.name])
+                if isinstance(arg, Var)
+                else arg
+                for arg in args
+            ]
+            return bool(fn(*values))
+
+        leaf.__name__ = node.predicate
+        return leaf
+
+    def quantified(self, node: Quantified, var: Optional[str]) -> Predicate:
+        quantifier = _QUANTIFIERS[node.quantifier]
+        body = self.predicate(node.body, node.var)
+        domain = self.lookup(node.domain, "domain")
+        frame = self.frame
+
+        def nested(value: Any) -> bool:
+            if var is None:
+                return quantifier(body, domain)
+            previous = frame.get(var, _MISSING)
+            frame[var] = value
+            try:
+                return quantifier(body, domain)
+            finally:
+                if previous is _MISSING:
+                    del frame[var]
+                else:
+                    frame[var] = previous
+
+        nested.__name__ = f"{node.quantifier}_{node.var}_in_{node.domain}"
+        return nested
+
+
+def _as_formula(formula: Union[str, Formula], free: Tuple[str, ...] = ()) -> Formula:
+    return parse_formula(formula, free) if isinstance(formula, str) else formula
+
+
+def compile_formula(
+    formula: Union[str, Formula],
+    env: Mapping[str, Any],
+    knowledge_base: Any = None,
+) -> Callable[[], bool]:
+    """Compile a closed formula into a function of no arguments
+
+    Predicate and domain names are looked up in env; with a knowledge base
+    given, predicates missing from env are answered by its query().
+    """
+    predicate = _Compiler(env, knowledge_base).predicate(_as_formula(formula), None)
+    return lambda: bool(predicate(None))
+
+
+def formula_predicate(
+    formula: Union[str, Formula],
+    var: str,
+    env: Mapping[str, Any],
+    knowledge_base: Any = None,
+) -> Predicate:
+    """Compile a formula with one free variable into a predicate over it
+
+    formula_predicate("even(x) & positive(x)", "x", env) is
+    logical_and(env["even"], env["positive"]).
+    """
+    node = _as_formula(formula, (var,))
+    return _Compiler(env, knowledge_base).predicate(node, var)
+
+
+def evaluate_formula(
+    formula: Union[str, Formula],
+    env: Mapping[str, Any],
+    knowledge_base: Any = None,
+) -> bool:
+    """Evaluate a closed formula against the names in env"""
+    return compile_formula(formula, env, knowledge_base)()
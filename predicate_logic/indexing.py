@@ -0,0 +1,346 @@
+"""
+Indexed domains for repeated range and equality filters.
+
+An IndexedDomain is a list that the quantifiers recognize. When a
+quantifier receives a predicate built from greater_than, less_than,
+range_predicate or equals (directly, or on a record field via field(), or
+combined with logical_and / logical_or), the domain answers it from a
+sorted array with bisect or from a hash index instead of scanning every
+element. Indexes are built on demand and dropped whenever the domain is
+modified through the list interface (records changed in place require an
+explicit invalidate()). Any other predicate falls back to the usual linear
+scan.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    MutableSequence,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+    overload,
+)
+
+from .columnar import Field
+from .expressions import compiled
+from .logical_operators import Conjunction, Disjunction
+from .patterns import InRange
+from .predicates import AllOf, Equals, GreaterThan, LessThan
+
+T = TypeVar("T")
+
+# Type alias for a predicate function
+Predicate = Callable[[T], bool]
+
+# None indexes the elements themselves; a string or int indexes record[key]
+IndexKey = Optional[Hashable]
+
+
+class _SortedIndex:
+    """Key values in ascending order, with the position each came from"""
+
+    __slots__ = ("values", "positions")
+
+    def __init__(self, keys: List[Any]) -> None:
+        if any(key != key for key in keys):
+            raise TypeError("NaN keys cannot be ordered")
+        self.positions = sorted(range(len(keys)), key=keys.__getitem__)
+        self.values = [keys[i] for i in self.positions]
+
+    def between(
+        self,
+        low: Any = None,
+        high: Any = None,
+        strict: Tuple[bool, bool] = (False, False),
+    ) -> List[int]:
+        """Positions of keys within the bounds (None means unbounded)"""
+        values = self.values
+        start = 0
+        if low is not None:
+            start = (bisect_right if strict[0] else bisect_left)(values, low)
+        stop = len(values)
+        if high is not None:
+            stop = (bisect_left if strict[1] else bisect_right)(values, high)
+        return self.positions[start:stop]
+
+
+class _HashIndex:
+    """Key value to the ascending positions holding it"""
+
+    __slots__ = ("buckets",)
+
+    def __init__(self, keys: List[Any]) -> None:
+        self.buckets: Dict[Any, List[int]] = {}
+        for position, key in enumerate(keys):
+            # A dict finds NaN by identity, but NaN equals nothing, itself
+            # included, so such keys are left out of every bucket
+            if key == key:
+                self.buckets.setdefault(key, []).append(position)
+
+    def equal(self, value: Any) -> List[int]:
+        return self.buckets.get(value, [])
+
+
+class IndexStats:
+    """How often a key was filtered on, and how it was answered"""
+
+    def __init__(self) -> None:
+        self.lookups = 0
+        self.index_hits = 0
+        self.scans = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"IndexStats(lookups={self.lookups}, index_hits={self.index_hits}, "
+            f"scans={self.scans})"
+        )
+
+
+class IndexedDomain(MutableSequence[T]):
+    """A list whose range and equality filters are answered from indexes"""
+
+    def __init__(self, items: Iterable[T] = (), build_after: int = 1) -> None:
+        self._items: List[T] = list(items)
+        self.build_after = build_after
+        self._sorted: Dict[IndexKey, Optional[_SortedIndex]] = {}
+        self._hashed: Dict[IndexKey, Optional[_HashIndex]] = {}
+        self.stats: Dict[IndexKey, IndexStats] = {}
+
+    # Sequence protocol ---------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @overload
+    def __getitem__(self, index: int) -> T: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[T]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[T, List[T]]:
+        return self._items[index]
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        self._items[index] = value
+        self.invalidate()
+
+    def __delitem__(self, index: Union[int, slice]) -> None:
+        del self._items[index]
+        self.invalidate()
+
+    def insert(self, index: int, value: T) -> None:
+        self._items.insert(index, value)
+        self.invalidate()
+
+    def extend(self, values: Iterable[T]) -> None:
+        self._items.extend(values)
+        self.invalidate()
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._items)
+
+    def __repr__(self) -> str:
+        return f"IndexedDomain({self._items!r})"
+
+    def invalidate(self) -> None:
+        """Drop every index; they are rebuilt on the next filter that needs one"""
+        self._sorted.clear()
+        self._hashed.clear()
+
+    # Index management ----------------------------------------------------
+
+    def _keys(self, key: IndexKey) -> List[Any]:
+        if key is None:
+            return self._items
+        records: List[Any] = self._items
+        return [record[key] for record in records]
+
+    def _wants_index(self, key: IndexKey) -> bool:
+        """Build only once a key has been filtered on build_after times"""
+        return self.stats[key].lookups >= self.build_after
+
+    def _sorted_index(self, key: IndexKey) -> Optional[_SortedIndex]:
+        if key not in self._sorted:
+            if not self._wants_index(key):
+                return None
+            try:
+                self._sorted[key] = _SortedIndex(self._keys(key))
+            except (TypeError, KeyError, IndexError):
+                self._sorted[key] = None
+        return self._sorted[key]
+
+    def _hash_index(self, key: IndexKey) -> Optional[_HashIndex]:
+        if key not in self._hashed:
+            if not self._wants_index(key):
+                return None
+            try:
+                self._hashed[key] = _HashIndex(self._keys(key))
+            except (TypeError, ValueError, KeyError, IndexError):
+                self._hashed[key] = None
+        return self._hashed[key]
+
+    def advice(self) -> Dict[IndexKey, str]:
+        """Which keys are filtered on and whether an index serves them"""
+        advice = {}
+        for key, stats in self.stats.items():
+            built = [
+                kind
+                for kind, indexes in (("sorted", self._sorted), ("hash", self._hashed))
+                if indexes.get(key) is not None
+            ]
+            if built:
+                advice[key] = f"indexed ({', '.join(built)}); {stats!r}"
+            elif key in self._sorted or key in self._hashed:
+                advice[key] = f"not indexable, scanned; {stats!r}"
+            else:
+                advice[key] = f"index after {self.build_after} lookups; {stats!r}"
+        return advice
+
+    # Lookups -------------------------------------------------------------
+
+    def _lookup(
+        self, predicate: Any, key: IndexKey = None
+    ) -> Optional[Tuple[List[int], bool]]:
+        """Candidate positions for predicate and whether they are exact
+
+        Returns None when no index can answer the predicate.
+        """
+        if isinstance(predicate, Field):
+            if key is not None:
+                return None
+            return self._lookup(predicate.args[1], predicate.args[0])
+
+        if isinstance(predicate, (GreaterThan, LessThan, InRange, Equals)):
+            stats = self.stats.setdefault(key, IndexStats())
+            stats.lookups += 1
+            positions = self._atom_lookup(key, predicate)
+            if positions is None:
+                stats.scans += 1
+                return None
+            stats.index_hits += 1
+            return positions, True
+
+        if isinstance(predicate, (Conjunction, AllOf)):
+            found = [self._lookup(child, key) for child in predicate.args]
+            usable = [match for match in found if match is not None]
+            if not usable:
+                return None
+            positions, exact = min(usable, key=lambda match: len(match[0]))
+            return positions, exact and len(found) == 1
+
+        if isinstance(predicate, Disjunction):
+            first, second = (self._lookup(child, key) for child in predicate.args)
+            if first is None or second is None:
+                return None
+            union: Set[int] = set(first[0])
+            union.update(second[0])
+            return list(union), first[1] and second[1]
+
+        return None
+
+    def _atom_lookup(self, key: IndexKey, atom: Any) -> Optional[List[int]]:
+        try:
+            if isinstance(atom, Equals):
+                hashed = self._hash_index(key)
+                if hashed is not None:
+                    return hashed.equal(atom.args[0])
+                index = self._sorted_index(key)
+                if index is None:
+                    return None
+                return index.between(atom.args[0], atom.args[0])
+            index = self._sorted_index(key)
+            if index is None:
+                return None
+            if isinstance(atom, GreaterThan):
+                return index.between(low=atom.args[0], strict=(True, False))
+            if isinstance(atom, LessThan):
+                return index.between(high=atom.args[0], strict=(False, True))
+            return index.between(*atom.args)
+        except TypeError:
+            # The bound is not comparable with the indexed keys
+            return None
+
+    def candidates(self, predicate: Predicate[T]) -> Optional[Tuple[List[int], bool]]:
+        """Positions that may satisfy predicate, and whether they all do
+
+        Elements at other positions do not satisfy it. Returns None when no
+        index can answer the predicate. The positions are in no set order.
+        """
+        return self._lookup(predicate)
+
+    def _matching_positions(self, predicate: Predicate[T]) -> Optional[List[int]]:
+        """Exact matching positions in ascending order, or None to scan"""
+        found = self._lookup(predicate)
+        if found is None:
+            return None
+        positions, exact = found
+        if exact:
+            return sorted(positions)
+        test = compiled(predicate)
+        items = self._items
+        return sorted(i for i in positions if test(items[i]))
+
+    # Quantifiers ---------------------------------------------------------
+
+    def forall(self, predicate: Predicate[T]) -> bool:
+        """∀x ∈ domain, P(x)"""
+        found = self._lookup(predicate)
+        if found is not None and found[1]:
+            return len(found[0]) == len(self._items)
+        test = compiled(predicate)
+        return all(test(x) for x in self._items)
+
+    def exists(self, predicate: Predicate[T]) -> bool:
+        """∃x ∈ domain, P(x)"""
+        positions = self._matching_positions(predicate)
+        if positions is None:
+            test = compiled(predicate)
+            return any(test(x) for x in self._items)
+        return bool(positions)
+
+    def count_where(self, predicate: Predicate[T]) -> int:
+        """Number of elements satisfying the predicate"""
+        positions = self._matching_positions(predicate)
+        if positions is None:
+            test = compiled(predicate)
+            return sum(1 for x in self._items if test(x))
+        return len(positions)
+
+    def exists_unique(self, predicate: Predicate[T]) -> bool:
+        """∃!x ∈ domain, P(x)"""
+        return self.count_where(predicate) == 1
+
+    def find_all(self, predicate: Predicate[T]) -> List[T]:
+        """Matching elements, in domain order"""
+        positions = self._matching_positions(predicate)
+        if positions is None:
+            test = compiled(predicate)
+            return [x for x in self._items if test(x)]
+        items = self._items
+        return [items[i] for i in positions]
+
+    def find_first(self, predicate: Predicate[T]) -> Optional[T]:
+        """First matching element in domain order, or None"""
+        found = self._lookup(predicate)
+        items = self._items
+        test = compiled(predicate)
+        if found is None:
+            for x in items:
+                if test(x):
+                    return x
+            return None
+        positions, exact = found
+        if exact:
+            first = min(positions, default=None)
+        else:
+            first = min((i for i in positions if test(items[i])), default=None)
+        return None if first is None else items[first]
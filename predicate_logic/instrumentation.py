@@ -0,0 +1,214 @@
+"""
+Opt-in instrumentation for predicates and knowledge base queries.
+
+A Profiler wraps a compound predicate in probes that record, for every
+node of the expression tree, how often it was called, how often it
+returned true, how long it took and how often it was skipped by a
+short-circuiting parent. Uninstrumented predicates are left untouched, so
+profiling costs nothing until it is switched on.
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional
+from weakref import WeakKeyDictionary
+
+from .expressions import Expression, describe
+from .knowledge_base import PredicateLogic, QueryTrace
+
+# Type aliases for the callback hooks
+CallHook = Callable[["NodeStats", Any, float], None]
+QueryHook = Callable[[QueryTrace], None]
+
+
+class NodeStats:
+    """Counters for one node of an instrumented predicate"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls = 0
+        self.true_count = 0
+        self.total_time = 0.0
+        self.children: List["NodeStats"] = []
+        self.parent: Optional["NodeStats"] = None
+
+    @property
+    def selectivity(self) -> float:
+        """Fraction of calls that returned true"""
+        return self.true_count / self.calls if self.calls else 0.0
+
+    @property
+    def skips(self) -> int:
+        """Times the parent was evaluated but short-circuited past this node"""
+        if self.parent is None:
+            return 0
+        return max(0, self.parent.calls - self.calls)
+
+    @property
+    def self_time(self) -> float:
+        """Time spent in this node excluding its children"""
+        return max(0.0, self.total_time - sum(c.total_time for c in self.children))
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Export the subtree rooted here as plain data"""
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "true_count": self.true_count,
+            "selectivity": self.selectivity,
+            "skips": self.skips,
+            "total_time": self.total_time,
+            "self_time": self.self_time,
+            "children": [child.as_dict() for child in self.children],
+        }
+
+
+class QueryStats:
+    """Aggregated knowledge base query counters for one predicate name"""
+
+    def __init__(self, predicate: str) -> None:
+        self.predicate = predicate
+        self.queries = 0
+        self.true_count = 0
+        self.fact_hits = 0
+        self.rules_tried = 0
+        self.max_depth = 0
+        self.total_time = 0.0
+
+    def record(self, trace: QueryTrace) -> None:
+        """Fold one query trace into the counters"""
+        self.queries += 1
+        self.true_count += trace.result
+        self.fact_hits += trace.fact_hit
+        self.rules_tried += trace.rules_tried
+        self.max_depth = max(self.max_depth, trace.depth)
+        self.total_time += trace.elapsed
+
+
+class _Probe:
+    """Callable wrapper that records calls into a NodeStats"""
+
+    __slots__ = ("inner", "stats", "hook")
+
+    def __init__(
+        self, inner: Callable[..., Any], stats: NodeStats, hook: Optional[CallHook]
+    ) -> None:
+        self.inner = inner
+        self.stats = stats
+        self.hook = hook
+
+    def __call__(self, *args: Any) -> Any:
+        start = time.perf_counter()
+        result = self.inner(*args)
+        elapsed = time.perf_counter() - start
+        stats = self.stats
+        stats.calls += 1
+        if result:
+            stats.true_count += 1
+        stats.total_time += elapsed
+        if self.hook is not None:
+            self.hook(stats, result, elapsed)
+        return result
+
+    def __repr__(self) -> str:
+        return f"<probe {self.stats.name}>"
+
+
+class Profiler:
+    """Collects per-node predicate statistics and knowledge base query stats"""
+
+    def __init__(
+        self,
+        on_call: Optional[CallHook] = None,
+        on_query: Optional[QueryHook] = None,
+    ) -> None:
+        self.on_call = on_call
+        self.on_query = on_query
+        self.roots: List[NodeStats] = []
+        self.queries: Dict[str, QueryStats] = {}
+        # The query hook each watched knowledge base had before
+        self._previous_hooks: "WeakKeyDictionary[PredicateLogic, Optional[QueryHook]]"
+        self._previous_hooks = WeakKeyDictionary()
+
+    def instrument(
+        self, predicate: Callable[..., Any], name: Optional[str] = None
+    ) -> Callable[..., Any]:
+        """Return an instrumented copy of predicate; the original is unchanged"""
+        probe = self._build(predicate, None)
+        if name is not None:
+            probe.stats.name = name
+        self.roots.append(probe.stats)
+        return probe
+
+    def _build(
+        self, predicate: Callable[..., Any], parent: Optional[NodeStats]
+    ) -> _Probe:
+        stats = NodeStats(describe(predicate))
+        stats.parent = parent
+        inner = predicate
+        if isinstance(predicate, Expression) and predicate.children:
+            probes = [self._build(child, stats) for child in predicate.children]
+            stats.children = [p.stats for p in probes]
+            inner = predicate.with_children(probes)
+        return _Probe(inner, stats, self.on_call)
+
+    def watch(self, kb: PredicateLogic) -> None:
+        """Start recording every query made against kb"""
+        previous = kb.set_query_hook(self._record_query)
+        if previous != self._record_query:
+            self._previous_hooks[kb] = previous
+
+    def unwatch(self, kb: PredicateLogic) -> None:
+        """Stop recording queries made against kb
+
+        The hook kb had before watch() is restored, unless another hook
+        has replaced the profiler's since; that one is left in place.
+        """
+        previous = self._previous_hooks.pop(kb, None)
+        current = kb.set_query_hook(previous)
+        if current != self._record_query:
+            kb.set_query_hook(current)
+
+    def _record_query(self, trace: QueryTrace) -> None:
+        stats = self.queries.get(trace.predicate)
+        if stats is None:
+            stats = self.queries[trace.predicate] = QueryStats(trace.predicate)
+        stats.record(trace)
+        if self.on_query is not None:
+            self.on_query(trace)
+
+    def reset(self) -> None:
+        """Forget all recorded predicates and queries"""
+        self.roots.clear()
+        self.queries.clear()
+
+    def report(self) -> str:
+        """Render the recorded statistics as an indented tree"""
+        lines: List[str] = []
+        for root in self.roots:
+            self._render(root, 0, lines)
+        if self.queries:
+            if lines:
+                lines.append("")
+            lines.append("knowledge base queries:")
+            for stats in self.queries.values():
+                lines.append(
+                    f"  {stats.predicate}: queries={stats.queries} "
+                    f"true={stats.true_count} fact_hits={stats.fact_hits} "
+                    f"rules_tried={stats.rules_tried} max_depth={stats.max_depth} "
+                    f"time={stats.total_time * 1e3:.3f}ms"
+                )
+        return "\n".join(lines)
+
+    def _render(self, stats: NodeStats, indent: int, lines: List[str]) -> None:
+        lines.append(
+            f"{'  ' * indent}{_short(stats.name)}: calls={stats.calls} "
+            f"true={stats.selectivity:.1%} skips={stats.skips} "
+            f"time={stats.total_time * 1e3:.3f}ms self={stats.self_time * 1e3:.3f}ms"
+        )
+        for child in stats.children:
+            self._render(child, indent + 1, lines)
+
+
+def _short(name: str, limit: int = 60) -> str:
+    """Truncate long expression names for the tree report"""
+    return name if len(name) <= limit else name[: limit - 3] + "..."
@@ -2,53 +2,834 @@
 Knowledge base for predicate logic.
 
 This module provides a class-based approach for managing facts and rules
-in a simple knowledge base system.
+in a simple knowledge base system. Besides rules that conclude a single
+ground fact, it accepts Horn rules with variables, whose consequences are
+materialized bottom-up the first time they are queried, or maintained
+incrementally by a Rete network while a rule hook is installed. Queries
+with bound arguments are answered goal-directed, by magic-sets rewriting,
+until the full fixpoint is needed. Rules using negation or aggregates are
+evaluated stratum by stratum instead.
+
+Queries for absent facts can be rejected by per-predicate Bloom filters
+(set_fact_filter) before any lookup. PredicateLogic.open() keeps a
+knowledge base in a directory: every change is appended to a write-ahead
+log, which is periodically compacted into a snapshot, and the state is
+recovered from both on the next open().
 """
 
-from typing import Callable, List, Set, Tuple
+from __future__ import annotations
+
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from .explain import PlanStep, QueryPlan
+from .expressions import describe
+from .magic import adorned_name, adornment, evaluate_goal
+from .rete import ActivationHook, ReteNetwork
+from .rules import (
+    LEAPFROG_TRIEJOIN,
+    Aggregate,
+    Atom,
+    FactTable,
+    Rule,
+    RuleStats,
+    Var,
+    join_strategy,
+    materialize,
+    plan_body,
+    stratify,
+    variable_order,
+)
+
+# The rule parser, persistence and filters load their modules (json, zlib,
+# threading, ast) on first use, so that knowledge bases that do not use them
+# do not pay for them
+if TYPE_CHECKING:
+    from .bloom import BloomFilter
+    from .wal import Record, WriteAheadLog
+
+# A ground fact: (predicate name, argument tuple)
+Fact = Tuple[str, Tuple[str, ...]]
+
+# Facts per record of a log snapshot
+_SNAPSHOT_BATCH = 1024
+
+# Smallest capacity of a fact filter, so that growing predicates are not
+# rebuilt over and over
+_FILTER_CAPACITY = 1024
+
+# A filter is rebuilt once more than this share of the entries it holds are
+# for facts removed since it was built
+_FILTER_STALE_SHARE = 0.25
+
+
+class QueryTrace(NamedTuple):
+    """What a single query did, as reported to a query hook"""
+
+    predicate: str
+    args: Tuple[str, ...]
+    result: bool
+    fact_hit: bool
+    rules_tried: int
+    depth: int
+    elapsed: float
+
+
+QueryHook = Callable[[QueryTrace], None]
+
+
+class FilterStats:
+    """How often fact filters were consulted, and how well they did"""
+
+    def __init__(self) -> None:
+        self.checks = 0
+        #: Queries answered by the filter alone: the fact is absent
+        self.rejected = 0
+        #: Queries the filter let through for a fact that was absent
+        self.false_positives = 0
+
+    @property
+    def false_positive_rate(self) -> float:
+        """Measured share of absent facts that the filters let through"""
+        negatives = self.rejected + self.false_positives
+        return self.false_positives / negatives if negatives else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"FilterStats(checks={self.checks}, rejected={self.rejected}, "
+            f"false_positives={self.false_positives}, "
+            f"false_positive_rate={self.false_positive_rate:.4f})"
+        )
 
 
 class PredicateLogic:
     """Class-based approach for more complex predicate logic"""
 
     def __init__(self) -> None:
-        self.facts: Set[Tuple[str, Tuple[str, ...]]] = set()
-        self.rules: List[Tuple[Callable, Tuple[str, Tuple[str, ...]]]] = []
+        self.facts: Set[Fact] = set()
+        self.rules: List[Tuple[Callable, Fact]] = []
+        self.horn_rules: List[Rule] = []
+        self._facts_by_predicate: Dict[str, FactTable] = {}
+        self._rules_by_conclusion: Dict[Fact, List[Callable]] = {}
+        self._derived_predicates: Set[str] = set()
+        self._derived: Optional[Dict[str, FactTable]] = None
+        # Goal-directed answers by (predicate, adornment, bound arguments)
+        self._goals: Dict[Tuple[Any, ...], Tuple[FactTable, List[RuleStats]]] = {}
+        self._rule_stats: List[RuleStats] = []
+        self._query_hook: Optional[QueryHook] = None
+        self._rete: Optional[ReteNetwork] = None
+        # False once a Horn rule uses negation or an aggregate
+        self._positive = True
+        #: Where changes are persisted, if opened with open()
+        self.log: Optional[WriteAheadLog] = None
+        self._fact_filters: Optional[Dict[str, BloomFilter]] = None
+        self._filter_error_rate = 0.01
+        # Facts removed since the filter of each predicate was built
+        self._stale_filters: Dict[str, int] = {}
+        #: How the fact filters did, see set_fact_filter()
+        self.filter_stats = FilterStats()
+
+    @classmethod
+    def open(cls, directory: str, **options: Any) -> "PredicateLogic":
+        """A knowledge base persisted in directory by a write-ahead log
+
+        The state saved in directory, if any, is recovered first. options are
+        passed on to WriteAheadLog; changes are durable once written out by
+        the log's group commit, at most batch_interval seconds after they
+        were made, or by log.sync() or close(). Fact arguments, rule
+        conditions and Horn rule constants must be serializable (see
+        serialization.to_data).
+        """
+        from .wal import WriteAheadLog
 
-    def add_fact(self, fact: Tuple[str, Tuple[str, ...]]) -> None:
+        kb = cls()
+        log = WriteAheadLog(directory, **options)
+        for record in log.recover():
+            kb._replay(record)
+        log.snapshot = kb._snapshot
+        kb.log = log
+        return kb
+
+    def close(self) -> None:
+        """Write out pending changes and close the log, if opened with open()"""
+        if self.log is not None:
+            self.log.close()
+
+    def __enter__(self) -> "PredicateLogic":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def add_fact(self, fact: Fact) -> None:
         """Add a ground fact"""
+        record = self._fact_record("fact", fact)
         self.facts.add(fact)
+        predicate, args = fact
+        table = self._facts_by_predicate.get(predicate)
+        if table is None:
+            table = self._facts_by_predicate[predicate] = FactTable()
+        table.add(args)
+        self._invalidate()
+        if self._rete is not None:
+            self._rete.insert(predicate, args)
+        if self._fact_filters is not None:
+            self._filter_add(predicate, args)
+        self._write(record)
 
-    def add_rule(
-        self, condition: Callable, conclusion: Tuple[str, Tuple[str, ...]]
-    ) -> None:
+    def remove_fact(self, fact: Fact) -> None:
+        """Remove a ground fact, if it is known"""
+        if fact not in self.facts:
+            return
+        record = self._fact_record("remove", fact)
+        self.facts.discard(fact)
+        predicate, args = fact
+        self._facts_by_predicate[predicate].discard(args)
+        self._invalidate()
+        if self._fact_filters is not None:
+            self._filter_remove(predicate)
+        if self._rete is not None:
+            # Unless a rule still concludes it, as a base fact of the network
+            conditions = self._rules_by_conclusion.get(fact, ())
+            if not any(condition(*args) for condition in conditions):
+                self._rete.retract(predicate, args)
+        self._write(record)
+
+    def add_rule(self, condition: Callable, conclusion: Fact) -> None:
         """Add a rule: if condition then conclusion"""
+        record: Optional[Record] = None
+        if self.log is not None:
+            from .serialization import to_data
+
+            predicate, args = conclusion
+            record = ("rule", to_data(condition), predicate, _encode_args(args))
         self.rules.append((condition, conclusion))
+        self._rules_by_conclusion.setdefault(conclusion, []).append(condition)
+        self._invalidate()
+        if self._rete is not None and condition(*conclusion[1]):
+            self._rete.insert(*conclusion)
+        if self._fact_filters is not None:
+            self._filter_add(*conclusion)
+        self._write(record)
+
+    def add_horn_rule(self, rule: Union[Rule, str]) -> None:
+        """Add a rule with variables, e.g. "ancestor(X, Y) :- parent(X, Y)".
+
+        Rules may negate body atoms and aggregate in their head, as long as
+        no predicate depends on itself through negation or an aggregate;
+        ValueError is raised otherwise.
+        """
+        if isinstance(rule, str):
+            from .formulas import parse_rule
+
+            rule = parse_rule(rule)
+        rule.validate()
+        if not rule.is_positive():
+            stratify(self.horn_rules + [rule])
+        record = None if self.log is None else _rule_record(rule)
+        if self._rete is not None:
+            self._rete.add_rule(rule)
+        self.horn_rules.append(rule)
+        self._positive = self._positive and rule.is_positive()
+        self._derived_predicates.add(rule.head.predicate)
+        self._invalidate()
+        self._write(record)
+
+    def load(self, program: str) -> None:
+        """Add the facts and Horn rules of a program written in rule syntax"""
+        from .formulas import parse_program
+
+        for clause in parse_program(program):
+            if isinstance(clause, Rule):
+                self.add_horn_rule(clause)
+            else:
+                self.add_fact((clause.predicate, clause.args))
+
+    def set_query_hook(self, hook: Optional[QueryHook]) -> Optional[QueryHook]:
+        """Report every query to hook as a QueryTrace (None to disable)
+
+        Returns the hook it replaces.
+        """
+        previous, self._query_hook = self._query_hook, hook
+        return previous
+
+    def set_rule_hook(self, hook: Optional[ActivationHook]) -> None:
+        """Report every Horn rule firing to hook as an Activation (None to disable)
+
+        While a hook is installed, rule consequences are maintained by a Rete
+        network: each add_fact is matched against the partial rule matches it
+        extends and fires the rules it completes right away, instead of
+        invalidating the fixpoint cached for query(), and each remove_fact
+        retracts only the matches and derived facts that depended on it.
+        Rules with negation or aggregates cannot be maintained this way and
+        raise ValueError.
+        """
+        if hook is None:
+            self._rete = None
+            return
+        if self._rete is not None:
+            self._rete.on_fire = hook
+            return
+        # Facts and rules added so far are matched before hook is installed
+        network = ReteNetwork(self.horn_rules)
+        for predicate, table in self._base_tables().items():
+            for args in table:
+                network.insert(predicate, args)
+        network.on_fire = hook
+        self._rete = network
+        self._rule_stats = []
+
+    def set_fact_filter(self, error_rate: Optional[float] = 0.01) -> None:
+        """Reject queries for absent facts with per-predicate Bloom filters
+
+        Each predicate gets a filter over its facts and the conclusions of
+        its rules, sized for error_rate false positives. A query for a fact
+        of a predicate that no Horn rule derives is answered False from the
+        filter alone when it rules the fact out; filter_stats measures the
+        actual false-positive rate. Filters grow with add_fact and add_rule,
+        and are rebuilt here, when they fill up, and when more than a quarter
+        of their entries are for facts removed by remove_fact, or the log
+        is compacted. None removes the filters.
+        """
+        if error_rate is None:
+            self._fact_filters = None
+            return
+        if not 0 < error_rate < 1:
+            raise ValueError(f"error_rate must be between 0 and 1, got {error_rate}")
+        self._filter_error_rate = error_rate
+        self._fact_filters = {}
+        self._stale_filters.clear()
+        predicates = set(self._facts_by_predicate)
+        predicates.update(predicate for predicate, _ in self._rules_by_conclusion)
+        self._build_filters(predicates)
+
+    def _build_filters(self, predicates: Iterable[str]) -> None:
+        """Replace the filters of predicates by freshly built ones"""
+        from .bloom import BloomFilter
+
+        assert self._fact_filters is not None
+        conclusions: Dict[str, List[Tuple[Any, ...]]] = {}
+        for predicate, args in self._rules_by_conclusion:
+            conclusions.setdefault(predicate, []).append(args)
+        for predicate in predicates:
+            rows = self._facts_by_predicate.get(predicate, FactTable())
+            extra = conclusions.get(predicate, [])
+            capacity = max(2 * (len(rows) + len(extra)), _FILTER_CAPACITY)
+            fact_filter = BloomFilter(capacity, self._filter_error_rate, rows)
+            for args in extra:
+                fact_filter.add(args)
+            self._fact_filters[predicate] = fact_filter
+            self._stale_filters.pop(predicate, None)
+
+    def _filter_add(self, predicate: str, args: Tuple[Any, ...]) -> None:
+        assert self._fact_filters is not None
+        fact_filter = self._fact_filters.get(predicate)
+        if fact_filter is None or fact_filter.full:
+            self._build_filters([predicate])
+        else:
+            fact_filter.add(args)
+
+    def _filter_remove(self, predicate: str) -> None:
+        """Count a removed fact, rebuilding the filter once too many are"""
+        assert self._fact_filters is not None
+        removed = self._stale_filters.get(predicate, 0) + 1
+        fact_filter = self._fact_filters.get(predicate)
+        stale = fact_filter is not None and (
+            removed > fact_filter.count * _FILTER_STALE_SHARE
+        )
+        if stale:
+            self._build_filters([predicate])
+        else:
+            self._stale_filters[predicate] = removed
+
+    def _filter_check(self, predicate: str, args: Tuple[Any, ...]) -> Optional[bool]:
+        """Whether the filter of predicate may hold args, counted in filter_stats
+
+        False rules the fact out; None means a pattern with variables,
+        which a filter cannot check.
+        """
+        assert self._fact_filters is not None
+        stats = self.filter_stats
+        stats.checks += 1
+        fact_filter = self._fact_filters.get(predicate)
+        if fact_filter is not None and args in fact_filter:
+            return True
+        if any(isinstance(arg, Var) for arg in args):
+            return None
+        stats.rejected += 1
+        return False
 
     def query(self, predicate: str, *args: str) -> bool:
         """Query if a predicate holds"""
+        if self._query_hook is not None:
+            return self._traced_query(self._query_hook, predicate, args)
+
         fact = (predicate, args)
+        filtered = False
+        filters = self._fact_filters
+        if filters is not None and predicate not in self._derived_predicates:
+            # A filter miss rules out both facts and rule conclusions; this
+            # is _filter_check, inlined on the untraced path
+            stats = self.filter_stats
+            stats.checks += 1
+            fact_filter = filters.get(predicate)
+            if fact_filter is not None and args in fact_filter:
+                filtered = True
+            else:
+                for arg in args:
+                    if isinstance(arg, Var):
+                        break
+                else:
+                    stats.rejected += 1
+                    return False
 
         # Check direct facts
         if fact in self.facts:
             return True
 
-        # Check rules
-        for condition, conclusion in self.rules:
-            if conclusion == fact and condition(*args):
+        # Check the rules that conclude exactly this fact
+        for condition in self._rules_by_conclusion.get(fact, ()):
+            if condition(*args):
                 return True
 
+        # Consequences of Horn rules, and patterns with variables
+        if predicate in self._derived_predicates:
+            if args in self._goal(predicate, args):
+                return True
+        if any(isinstance(arg, Var) for arg in args):
+            return bool(self.solve(predicate, *args))
+
+        if filtered:
+            self.filter_stats.false_positives += 1
         return False
 
-    def get_all_facts(self) -> Set[Tuple[str, Tuple[str, ...]]]:
+    def solve(self, predicate: str, *pattern: Any) -> Set[Tuple[Any, ...]]:
+        """Argument tuples of every known or derivable fact matching pattern
+
+        The pattern mixes constants and Vars: solve("parent", "john", Var("X")).
+        """
+        if predicate in self._derived_predicates:
+            table: Optional[FactTable] = self._goal(predicate, pattern)
+        else:
+            table = self._materialized().get(predicate)
+        if table is None:
+            return set()
+        return set(table.match(pattern))
+
+    def _invalidate(self) -> None:
+        """Forget rule consequences computed before a change"""
+        self._derived = None
+        self._goals.clear()
+
+    def _goal_directed(self, pattern: Sequence[Any]) -> bool:
+        """True if a query with pattern is answered by magic-sets evaluation"""
+        return (
+            self._rete is None
+            and self._positive
+            and self._derived is None
+            and any(not isinstance(arg, Var) for arg in pattern)
+        )
+
+    def _goal(self, predicate: str, pattern: Sequence[Any]) -> FactTable:
+        """Facts of a derived predicate, at least all of those matching pattern"""
+        if not self._goal_directed(pattern):
+            return self._materialized()[predicate]
+        bound = tuple(arg for arg in pattern if not isinstance(arg, Var))
+        key = (predicate, adornment(pattern), bound)
+        goal = self._goals.get(key)
+        if goal is None:
+            stats: List[RuleStats] = []
+            table = evaluate_goal(
+                self.horn_rules, self._base_tables(), predicate, pattern, stats
+            )
+            goal = self._goals[key] = (table, stats)
+        self._rule_stats = goal[1]
+        return goal[0]
+
+    def _materialized(self) -> Dict[str, FactTable]:
+        """Every fact that holds, by predicate, computed once per change"""
+        if self._rete is not None:
+            return self._rete.tables
+        if self._derived is None:
+            self._rule_stats = []
+            self._derived = materialize(
+                self.horn_rules, self._base_tables(), self._rule_stats
+            )
+        return self._derived
+
+    def _base_tables(self) -> Dict[str, FactTable]:
+        """Facts by predicate, before applying Horn rules"""
+        # Conclusions of rules whose condition holds count as base facts
+        base = dict(self._facts_by_predicate)
+        copied: Set[str] = set()
+        for (predicate, args), conditions in self._rules_by_conclusion.items():
+            if any(condition(*args) for condition in conditions):
+                if predicate not in copied:
+                    base[predicate] = FactTable(base.get(predicate, ()))
+                    copied.add(predicate)
+                base[predicate].add(args)
+        return base
+
+    def _traced_query(
+        self, hook: QueryHook, predicate: str, args: Tuple[str, ...]
+    ) -> bool:
+        """query() with bookkeeping, used only while a hook is installed"""
+        start = time.perf_counter()
+        fact = (predicate, args)
+        found: Optional[bool] = None
+        if self._fact_filters is not None and predicate not in self._derived_predicates:
+            found = self._filter_check(predicate, args)
+        rejected = found is False
+        fact_hit = not rejected and fact in self.facts
+        result = fact_hit
+        rules_tried = 0
+
+        if not fact_hit and not rejected:
+            for condition in self._rules_by_conclusion.get(fact, ()):
+                rules_tried += 1
+                if condition(*args):
+                    result = True
+                    break
+        depth = 1 if rules_tried else 0
+
+        if not result and predicate in self._derived_predicates:
+            # Horn rule consequences, from the fixpoint or a magic-sets goal
+            result = args in self._goal(predicate, args)
+            heads = _deriving(self._rule_stats, predicate, args)
+            rules_tried += len(heads)
+            # The fixpoint round in which this predicate last grew
+            depth = max([depth] + [s.last_round for s in heads])
+        if not result and any(isinstance(arg, Var) for arg in args):
+            result = bool(self.solve(predicate, *args))
+        if found and not result:
+            self.filter_stats.false_positives += 1
+        hook(
+            QueryTrace(
+                predicate,
+                args,
+                result,
+                fact_hit,
+                rules_tried,
+                depth,
+                time.perf_counter() - start,
+            )
+        )
+        return result
+
+    def explain(self, predicate: str, *args: str) -> QueryPlan:
+        """Answer a query and report the plan it followed, step by step"""
+        plan = QueryPlan(predicate, args)
+        start = time.perf_counter()
+        fact = (predicate, args)
+
+        filters = self._fact_filters
+        if filters is not None and predicate not in self._derived_predicates:
+            fact_filter = filters.get(predicate)
+            rate = self.filter_stats.false_positive_rate
+            check = plan.add(
+                PlanStep(
+                    "Bloom filter",
+                    index="per-predicate Bloom filter",
+                    detail=f"{fact_filter!r}; measured false positives {rate:.2%}",
+                    estimated_rows=1,
+                )
+            )
+            step_start = time.perf_counter()
+            maybe = fact_filter is not None and args in fact_filter
+            check.actual_rows = int(maybe)
+            check.elapsed = time.perf_counter() - step_start
+            if not maybe and not any(isinstance(arg, Var) for arg in args):
+                plan.result = False
+                plan.elapsed = time.perf_counter() - start
+                return plan
+
+        known = self._facts_by_predicate.get(predicate, ())
+        lookup = plan.add(
+            PlanStep(
+                "Fact lookup",
+                index="fact hash index",
+                detail=f"{len(known)} {predicate} facts",
+                estimated_rows=1 if known else 0,
+            )
+        )
+        step_start = time.perf_counter()
+        plan.result = fact in self.facts
+        lookup.actual_rows = int(plan.result)
+        lookup.elapsed = time.perf_counter() - step_start
+
+        candidates = self._rules_by_conclusion.get(fact, [])
+        scan = plan.add(
+            PlanStep(
+                "Rule scan",
+                index="rule conclusion index",
+                detail=f"{len(candidates)} of {len(self.rules)} rules conclude it",
+                estimated_rows=len(candidates),
+            )
+        )
+        steps = [
+            scan.add(PlanStep("Rule condition", detail=describe(c), estimated_rows=1))
+            for c in candidates
+        ]
+        if not plan.result:
+            scan_start = time.perf_counter()
+            tried = 0
+            for condition, step in zip(candidates, steps):
+                step_start = time.perf_counter()
+                holds = bool(condition(*args))
+                step.actual_rows = int(holds)
+                step.elapsed = time.perf_counter() - step_start
+                tried += 1
+                if holds:
+                    plan.result = True
+                    break
+            scan.actual_rows = tried
+            scan.elapsed = time.perf_counter() - scan_start
+
+        if predicate in self._derived_predicates:
+            self._explain_derivation(plan, predicate, args)
+        if any(isinstance(arg, Var) for arg in args):
+            self._explain_pattern(plan, predicate, args)
+
+        plan.elapsed = time.perf_counter() - start
+        return plan
+
+    def _explain_derivation(
+        self, plan: QueryPlan, predicate: str, args: Tuple[Any, ...]
+    ) -> None:
+        """Plan steps for answering a query from Horn rule consequences"""
+        rules = [r for r in self.horn_rules if r.head.predicate == predicate]
+        if self._rete is not None:
+            index = "Rete network"
+            state = "maintained incrementally"
+        elif self._goal_directed(args):
+            index = "magic-sets rewriting, semi-naive evaluation"
+            state = f"rewritten for binding pattern {adornment(args)}"
+        else:
+            index = "semi-naive bottom-up evaluation"
+            cached = self._derived is not None
+            state = "fixpoint cached" if cached else "fixpoint computed"
+        derive = plan.add(
+            PlanStep(
+                "Rule derivation",
+                index=index,
+                detail=f"{len(rules)} rules derive {predicate}; {state}",
+            )
+        )
+        if plan.result:
+            sizes = {name: len(t) for name, t in self._facts_by_predicate.items()}
+            for rule in rules:
+                body = rule.split_body()[0]
+                order = plan_body(body, sizes)
+                derive.add(_join_step(rule, order, join_strategy(body)))
+            return
+        step_start = time.perf_counter()
+        table = self._goal(predicate, args)
+        plan.result = args in table
+        derive.actual_rows = len(table)
+        derive.elapsed = time.perf_counter() - step_start
+        for stats in _deriving(self._rule_stats, predicate, args):
+            step = derive.add(
+                _join_step(stats.rule, stats.join_order, stats.strategy)
+            )
+            step.actual_rows = stats.derived
+            step.elapsed = stats.elapsed
+
+    def _explain_pattern(
+        self, plan: QueryPlan, predicate: str, args: Tuple[Any, ...]
+    ) -> None:
+        """Plan step for a query whose arguments include variables"""
+        bound = [i for i, arg in enumerate(args) if not isinstance(arg, Var)]
+        match = plan.add(
+            PlanStep(
+                "Pattern match",
+                index=f"hash index on arguments {bound}" if bound else "full scan",
+                detail=f"{predicate} facts, known and derived",
+            )
+        )
+        if plan.result:
+            return
+        step_start = time.perf_counter()
+        rows = self.solve(predicate, *args)
+        plan.result = bool(rows)
+        match.actual_rows = len(rows)
+        match.elapsed = time.perf_counter() - step_start
+
+    def get_all_facts(self) -> Set[Fact]:
         """Return all facts in the knowledge base"""
         return self.facts.copy()
 
-    def get_all_rules(self) -> List[Tuple[Callable, Tuple[str, Tuple[str, ...]]]]:
+    def get_all_rules(self) -> List[Tuple[Callable, Fact]]:
         """Return all rules in the knowledge base"""
         return self.rules.copy()
 
+    def get_horn_rules(self) -> List[Rule]:
+        """Return all Horn rules in the knowledge base"""
+        return self.horn_rules.copy()
+
     def clear(self) -> None:
         """Clear all facts and rules"""
         self.facts.clear()
         self.rules.clear()
+        self.horn_rules.clear()
+        self._facts_by_predicate.clear()
+        self._rules_by_conclusion.clear()
+        self._derived_predicates.clear()
+        self._invalidate()
+        self._rule_stats = []
+        self._positive = True
+        if self._rete is not None:
+            self._rete = ReteNetwork(on_fire=self._rete.on_fire)
+        if self._fact_filters is not None:
+            self._fact_filters.clear()
+            self._stale_filters.clear()
+        self._write(("clear",))
+
+    # Persistence -----------------------------------------------------------
+
+    def _fact_record(self, operation: str, fact: Fact) -> Optional[Record]:
+        """The log record of a fact change, if changes are logged
+
+        Built before the change is made, so that a fact that cannot be
+        serialized raises TypeError without changing anything.
+        """
+        if self.log is None:
+            return None
+        predicate, args = fact
+        return (operation, predicate, _encode_args(args))
+
+    def _write(self, record: Optional[Record]) -> None:
+        if record is not None and self.log is not None:
+            self.log.append(record)
+
+    def _replay(self, record: Record) -> None:
+        """Redo a logged change"""
+        operation = record[0]
+        if operation == "fact":
+            self.add_fact((record[1], _decode_args(record[2])))
+        elif operation == "facts":
+            for args in record[2]:
+                self.add_fact((record[1], _decode_args(args)))
+        elif operation == "remove":
+            self.remove_fact((record[1], _decode_args(record[2])))
+        elif operation == "rule":
+            conclusion = (record[2], _decode_args(record[3]))
+            from .serialization import from_data
+
+            self.add_rule(from_data(record[1]), conclusion)
+        elif operation == "horn" and isinstance(record[1], str):
+            # Rule text, as logged before rules were logged as data
+            self.add_horn_rule(record[1])
+        elif operation == "horn":
+            self.add_horn_rule(_decode_rule(record[1], record[2]))
+        elif operation == "clear":
+            self.clear()
+        else:
+            raise ValueError(f"unknown log record {record!r}")
+
+    def _snapshot(self) -> Iterator[Record]:
+        """Records for a log snapshot; compaction also rebuilds stale filters"""
+        if self._fact_filters is not None and self._stale_filters:
+            self._build_filters(list(self._stale_filters))
+        return self._records()
+
+    def _records(self) -> Iterator[Record]:
+        """Records rebuilding the knowledge base, for a log snapshot"""
+        from .serialization import to_data
+
+        for condition, (predicate, args) in self.rules:
+            yield ("rule", to_data(condition), predicate, _encode_args(args))
+        for rule in self.horn_rules:
+            yield _rule_record(rule)
+        # Facts go in batches: one record per line is costly to decode
+        for predicate, table in self._facts_by_predicate.items():
+            rows = [_encode_args(args) for args in table]
+            for start in range(0, len(rows), _SNAPSHOT_BATCH):
+                yield ("facts", predicate, rows[start : start + _SNAPSHOT_BATCH])
+
+
+def _encode_args(args: Tuple[Any, ...]) -> List[Any]:
+    from .serialization import to_data
+
+    return [to_data(arg) for arg in args]
+
+
+def _decode_args(data: List[Any]) -> Tuple[Any, ...]:
+    from .serialization import from_data
+
+    return tuple(from_data(arg) for arg in data)
+
+
+def _rule_record(rule: Rule) -> Record:
+    """The log record of a Horn rule: its atoms, with arguments as data
+
+    Raises TypeError if a constant of the rule cannot be serialized.
+    """
+    return ("horn", _encode_atom(rule.head), [_encode_atom(a) for a in rule.body])
+
+
+def _decode_rule(head: List[Any], body: List[List[Any]]) -> Rule:
+    return Rule(_decode_atom(head), tuple(_decode_atom(atom) for atom in body))
+
+
+def _encode_atom(atom: Atom) -> List[Any]:
+    return [atom.predicate, [_encode_term(arg) for arg in atom.args], atom.negated]
+
+
+def _decode_atom(data: List[Any]) -> Atom:
+    predicate, args, negated = data
+    return Atom(predicate, tuple(_decode_term(arg) for arg in args), negated)
+
+
+def _encode_term(term: Any) -> Any:
+    from .serialization import to_data
+
+    # to_data never produces these keys: it rejects dict arguments
+    if isinstance(term, Var):
+        return {"var": term.name}
+    if isinstance(term, Aggregate):
+        return {"aggregate": term.function, "var": term.var.name}
+    return to_data(term)
+
+
+def _decode_term(data: Any) -> Any:
+    from .serialization import from_data
+
+    if isinstance(data, dict) and "var" in data:
+        var = Var(data["var"])
+        return Aggregate(data["aggregate"], var) if "aggregate" in data else var
+    return from_data(data)
+
+
+def _deriving(
+    stats: List[RuleStats], predicate: str, args: Sequence[Any]
+) -> List[RuleStats]:
+    """Stats of the rules deriving predicate, as adorned for args if rewritten"""
+    names = (predicate, adorned_name(predicate, adornment(args)))
+    return [s for s in stats if s.rule.head.predicate in names]
+
+
+def _join_step(rule: Rule, order: List[int], strategy: str) -> PlanStep:
+    """A plan step describing one rule body and the order it is joined in"""
+    # Negated atoms are not joined but checked against each match
+    body = rule.split_body()[0]
+    if strategy == LEAPFROG_TRIEJOIN:
+        variables = ", ".join(var.name for var in variable_order(body))
+        detail = f"{rule} variable order: {variables}"
+        return PlanStep(strategy, index="sorted fact tries", detail=detail)
+    joined = " ⋈ ".join(str(body[i]) for i in order)
+    detail = f"{rule} join order: {joined}"
+    return PlanStep(strategy, index="fact argument indexes", detail=detail)
@@ -5,7 +5,9 @@ This module implements logical operators as higher-order functions
 that can be used to combine predicates.
 """
 
-from typing import Callable, TypeVar
+from typing import Any, Callable, TypeVar
+
+from .expressions import Expression, compiled
 
 # Type variable for the input type to predicates
 T = TypeVar("T")
@@ -14,31 +16,103 @@ T = TypeVar("T")
 Predicate = Callable[[T], bool]
 
 
+class Conjunction(Expression):
+    """P ∧ Q as an inspectable expression"""
+
+    __slots__ = ()
+    op = "logical_and"
+    child_slice = slice(None)
+
+    def compile(self) -> Callable[[Any], bool]:
+        pred1, pred2 = map(compiled, self.args)
+        return lambda x: pred1(x) and pred2(x)
+
+
+class Disjunction(Expression):
+    """P ∨ Q as an inspectable expression"""
+
+    __slots__ = ()
+    op = "logical_or"
+    child_slice = slice(None)
+
+    def compile(self) -> Callable[[Any], bool]:
+        pred1, pred2 = map(compiled, self.args)
+        return lambda x: pred1(x) or pred2(x)
+
+
+class Negation(Expression):
+    """¬P as an inspectable expression"""
+
+    __slots__ = ()
+    op = "logical_not"
+    child_slice = slice(None)
+
+    def compile(self) -> Callable[[Any], bool]:
+        pred = compiled(self.args[0])
+        return lambda x: not pred(x)
+
+
+class Implication(Expression):
+    """P → Q as an inspectable expression"""
+
+    __slots__ = ()
+    op = "logical_implies"
+    child_slice = slice(None)
+
+    def compile(self) -> Callable[[Any], bool]:
+        pred1, pred2 = map(compiled, self.args)
+        return lambda x: (not pred1(x)) or pred2(x)
+
+
+class Biconditional(Expression):
+    """P ↔ Q as an inspectable expression"""
+
+    __slots__ = ()
+    op = "logical_iff"
+    child_slice = slice(None)
+
+    def compile(self) -> Callable[[Any], bool]:
+        pred1, pred2 = map(compiled, self.args)
+        return lambda x: pred1(x) == pred2(x)
+
+
+class ExclusiveOr(Expression):
+    """P ⊕ Q as an inspectable expression"""
+
+    __slots__ = ()
+    op = "logical_xor"
+    child_slice = slice(None)
+
+    def compile(self) -> Callable[[Any], bool]:
+        pred1, pred2 = map(compiled, self.args)
+        return lambda x: pred1(x) != pred2(x)
+
+
 def logical_and(pred1: Predicate[T], pred2: Predicate[T]) -> Predicate[T]:
     """Conjunction: P ∧ Q"""
-    return lambda x: pred1(x) and pred2(x)
+    return Conjunction(pred1, pred2)
 
 
 def logical_or(pred1: Predicate[T], pred2: Predicate[T]) -> Predicate[T]:
     """Disjunction: P ∨ Q"""
-    return lambda x: pred1(x) or pred2(x)
+    return Disjunction(pred1, pred2)
 
 
 def logical_not(pred: Predicate[T]) -> Predicate[T]:
     """Negation: ¬P"""
-    return lambda x: not pred(x)
+    return Negation(pred)
 
 
 def logical_implies(pred1: Predicate[T], pred2: Predicate[T]) -> Predicate[T]:
     """Implication: P → Q (equivalent to ¬P ∨ Q)"""
-    return lambda x: (not pred1(x)) or pred2(x)
+    return Implication(pred1, pred2)
 
 
 def logical_iff(pred1: Predicate[T], pred2: Predicate[T]) -> Predicate[T]:
     """Biconditional: P ↔ Q (P if and only if Q)"""
-    return lambda x: pred1(x) == pred2(x)
+    return Biconditional(pred1, pred2)
 
 
 def logical_xor(pred1: Predicate[T], pred2: Predicate[T]) -> Predicate[T]:
     """Exclusive or: P ⊕ Q"""
-    return lambda x: pred1(x) != pred2(x)
+    return ExclusiveOr(pred1, pred2)
@@ -0,0 +1,153 @@
+"""
+Goal-directed bottom-up evaluation by magic-sets rewriting.
+
+Materializing a recursive predicate such as ancestor computes every fact
+it holds for, even when a query only asks about ancestor(john, Y). The
+magic-sets transformation rewrites the rules for a query's binding pattern
+(its adornment: "bf" for a bound first and a free second argument) so that
+semi-naive evaluation only derives facts relevant to the query.
+
+Each derived predicate p reached with adornment a gets an adorned copy
+p[a] and a magic predicate magic_p[a] holding the bound argument values
+that are actually asked for. Every rewritten rule is guarded by the magic
+atom of its head, and magic rules pass bindings sideways from the head and
+the preceding body atoms to each derived body atom, which is how the
+query's constants flow into recursive calls.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from .rules import (
+    Atom,
+    FactTable,
+    Row,
+    Rule,
+    RuleStats,
+    Var,
+    head_predicates,
+    materialize,
+    plan_body,
+)
+
+
+class MagicProgram(NamedTuple):
+    """Rules rewritten for one query, and where to read its answers"""
+
+    rules: List[Rule]
+    #: Adorned predicate holding the answers to the query
+    answer: str
+    #: Magic predicate and row to seed evaluation with
+    seed: Tuple[str, Row]
+
+
+def adornment(pattern: Sequence[Any]) -> str:
+    """Binding pattern of query arguments: "b" for constants, "f" for Vars"""
+    return "".join("f" if isinstance(arg, Var) else "b" for arg in pattern)
+
+
+def adorned_name(predicate: str, adorned: str) -> str:
+    return f"{predicate}[{adorned}]"
+
+
+def magic_name(predicate: str, adorned: str) -> str:
+    return f"magic_{predicate}[{adorned}]"
+
+
+def _bound_args(atom: Atom, adorned: str) -> Tuple[Any, ...]:
+    return tuple(arg for arg, mode in zip(atom.args, adorned) if mode == "b")
+
+
+def magic_rewrite(
+    rules: Sequence[Rule],
+    predicate: str,
+    pattern: Sequence[Any],
+    sizes: Optional[Dict[str, int]] = None,
+) -> MagicProgram:
+    """Rewrite rules for a query on predicate with the constants in pattern
+
+    sizes holds the number of base facts of each predicate. It orders the
+    body atoms of each rule, and derived predicates that also have base
+    facts get a rule taking in those matching the magic set. Only plain
+    Horn rules are supported: rewriting can make a stratified program with
+    negation or aggregates unstratifiable.
+    """
+    for rule in rules:
+        if not rule.is_positive():
+            raise ValueError(f"rule {rule} uses negation or an aggregate")
+    sizes = sizes or {}
+    derived = head_predicates(rules)
+    by_head: Dict[str, List[Rule]] = {}
+    for rule in rules:
+        by_head.setdefault(rule.head.predicate, []).append(rule)
+
+    query = adornment(pattern)
+    rewritten: List[Rule] = []
+    seen: Set[Tuple[str, str]] = {(predicate, query)}
+    work = [(predicate, query)]
+    while work:
+        name, adorned = work.pop()
+        arity = len(adorned)
+        for rule in by_head.get(name, ()):
+            if len(rule.head.args) != arity:
+                continue
+            guard = Atom(magic_name(name, adorned), _bound_args(rule.head, adorned))
+            bound = set(guard.variables())
+            body = [guard]
+            # Sideways information passing: visit the body in the order
+            # that binds variables earliest, starting from the head's
+            for i in plan_body(rule.body, sizes, bound=bound):
+                atom = rule.body[i]
+                if atom.predicate in derived:
+                    sub = "".join(
+                        "b" if not isinstance(arg, Var) or arg in bound else "f"
+                        for arg in atom.args
+                    )
+                    demand = Atom(
+                        magic_name(atom.predicate, sub), _bound_args(atom, sub)
+                    )
+                    if body != [demand]:
+                        rewritten.append(Rule(demand, tuple(body)))
+                    if (atom.predicate, sub) not in seen:
+                        seen.add((atom.predicate, sub))
+                        work.append((atom.predicate, sub))
+                    atom = Atom(adorned_name(atom.predicate, sub), atom.args)
+                body.append(atom)
+                bound.update(atom.variables())
+            head = Atom(adorned_name(name, adorned), rule.head.args)
+            rewritten.append(Rule(head, tuple(body)))
+        if sizes.get(name):
+            # Base facts of a derived predicate, restricted to the magic set
+            args = tuple(Var(f"_{i}") for i in range(arity))
+            full = Atom(name, args)
+            guard = Atom(magic_name(name, adorned), _bound_args(full, adorned))
+            head = Atom(adorned_name(name, adorned), args)
+            rewritten.append(Rule(head, (guard, full)))
+
+    seed_row = tuple(arg for arg in pattern if not isinstance(arg, Var))
+    return MagicProgram(
+        rewritten,
+        adorned_name(predicate, query),
+        (magic_name(predicate, query), seed_row),
+    )
+
+
+def evaluate_goal(
+    rules: Sequence[Rule],
+    base: Dict[str, FactTable],
+    predicate: str,
+    pattern: Sequence[Any],
+    stats: Optional[List[RuleStats]] = None,
+) -> FactTable:
+    """Facts of predicate derivable from base and rules, as far as pattern needs
+
+    The returned table holds every derivable row matching the constants of
+    pattern (and possibly a few more); match it against pattern to answer
+    the query. stats is filled as by materialize(), for the rewritten rules.
+    """
+    sizes = {name: len(table) for name, table in base.items()}
+    program = magic_rewrite(rules, predicate, pattern, sizes)
+    seed_predicate, seed_row = program.seed
+    tables = dict(base)
+    tables[seed_predicate] = FactTable([seed_row])
+    derived = materialize(program.rules, tables, stats)
+    return derived.get(program.answer, FactTable())
@@ -7,6 +7,8 @@ match statement (Python 3.10+).
 
 from typing import Any, Callable, TypeVar
 
+from .expressions import Expression
+
 # Type variable
 T = TypeVar("T")
 
@@ -14,31 +16,75 @@ T = TypeVar("T")
 Predicate = Callable[[T], bool]
 
 
-def pattern_predicate(pattern: Any) -> Predicate[Any]:
-    """Create predicate based on pattern matching"""
+class PatternMatch(Expression):
+    """Pattern match against a sample value as an inspectable expression"""
+
+    __slots__ = ()
+    op = "pattern_predicate"
+
+    def compile(self) -> Callable[[Any], bool]:
+        pattern = self.args[0]
+
+        def pred(value: Any) -> bool:
+            # Pattern matching logic compatible with Python 3.8+
+            if isinstance(pattern, int) and pattern > 0:
+                return isinstance(value, int) and value > 0
+            elif isinstance(pattern, str) and len(pattern) > 0:
+                return isinstance(value, str) and len(value) > 0
+            else:
+                return bool(value == pattern)
+
+        return pred
+
+
+class IsInstance(Expression):
+    """isinstance(x, expected_type) as an inspectable expression"""
+
+    __slots__ = ()
+    op = "type_predicate"
+
+    def compile(self) -> Callable[[Any], bool]:
+        expected_type = self.args[0]
+        return lambda x: isinstance(x, expected_type)
 
-    def pred(value: Any) -> bool:
-        # Pattern matching logic compatible with Python 3.8+
-        if isinstance(pattern, int) and pattern > 0:
-            return isinstance(value, int) and value > 0
-        elif isinstance(pattern, str) and len(pattern) > 0:
-            return isinstance(value, str) and len(value) > 0
-        else:
-            return bool(value == pattern)
 
-    return pred
+class InRange(Expression):
+    """min_val <= x <= max_val as an inspectable expression"""
+
+    __slots__ = ()
+    op = "range_predicate"
+
+    def compile(self) -> Callable[[Any], bool]:
+        min_val, max_val = self.args
+        return lambda x: min_val <= x <= max_val
+
+
+class HasLength(Expression):
+    """len(x) == expected_length as an inspectable expression"""
+
+    __slots__ = ()
+    op = "length_predicate"
+
+    def compile(self) -> Callable[[Any], bool]:
+        expected_length = self.args[0]
+        return lambda x: hasattr(x, "__len__") and len(x) == expected_length
+
+
+def pattern_predicate(pattern: Any) -> Predicate[Any]:
+    """Create predicate based on pattern matching"""
+    return PatternMatch(pattern)
 
 
 def type_predicate(expected_type: type) -> Predicate[Any]:
     """Create predicate that checks for a specific type"""
-    return lambda x: isinstance(x, expected_type)
+    return IsInstance(expected_type)
 
 
 def range_predicate(min_val: float, max_val: float) -> Predicate[float]:
     """Create predicate that checks if value is in range [min_val, max_val]"""
-    return lambda x: min_val <= x <= max_val
+    return InRange(min_val, max_val)
 
 
 def length_predicate(expected_length: int) -> Predicate[Any]:
     """Create predicate that checks if value has expected length"""
-    return lambda x: hasattr(x, "__len__") and len(x) == expected_length
+    return HasLength(expected_length)
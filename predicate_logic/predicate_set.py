@@ -0,0 +1,261 @@
+"""
+Shared evaluation of many predicates over the same records.
+
+A PredicateSet holds many predicates built with the library's combinators
+(subscription filters, routing rules, ...) and merges them into a single
+DAG, in the manner of a Rete discrimination network: structurally equal
+sub-predicates, down to atoms such as greater_than(100) or
+type_predicate(str), become one node no matter how many predicates use
+them. match() evaluates the predicates against a record with a memo of
+node results, so each shared node, and in particular each atom, runs at
+most once per record, while logical_and / logical_or still short-circuit.
+"""
+
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .columnar import Field
+from .expressions import compiled, structural_key
+from .logical_operators import (
+    Biconditional,
+    Conjunction,
+    Disjunction,
+    ExclusiveOr,
+    Implication,
+    Negation,
+)
+from .predicates import AllOf
+
+# Type alias for a predicate function
+Predicate = Callable[[Any], bool]
+
+# A compiled DAG node: reads and fills the per-record memo
+Node = Callable[[List[Any], Any], Any]
+
+# A record field path: the names of the enclosing field() calls
+Scope = Tuple[str, ...]
+
+_UNSET = object()
+
+
+class PredicateSet:
+    """Many predicates evaluated together, sharing common sub-predicates"""
+
+    def __init__(
+        self,
+        predicates: Union[Mapping[Hashable, Predicate], Iterable[Predicate]] = (),
+    ) -> None:
+        self._predicates: Dict[Hashable, Predicate] = {}
+        self._roots: Optional[List[Tuple[Hashable, Node]]] = None
+        self._slots = 0
+        self._next_id = 0
+        #: Distinct nodes (sub-predicates) and atomic predicates in the DAG
+        self.node_count = 0
+        self.atom_count = 0
+        #: Nodes used by more than one predicate or parent, evaluated once
+        self.shared = 0
+        if isinstance(predicates, Mapping):
+            for pred_id, predicate in predicates.items():
+                self.add(predicate, pred_id)
+        else:
+            for predicate in predicates:
+                self.add(predicate)
+
+    def __len__(self) -> int:
+        return len(self._predicates)
+
+    def __contains__(self, pred_id: object) -> bool:
+        return pred_id in self._predicates
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._predicates)
+
+    def __getitem__(self, pred_id: Hashable) -> Predicate:
+        return self._predicates[pred_id]
+
+    def add(self, predicate: Predicate, pred_id: Optional[Hashable] = None) -> Hashable:
+        """Add a predicate and return its ID (a new integer unless given)"""
+        if pred_id is None:
+            while self._next_id in self._predicates:
+                self._next_id += 1
+            pred_id = self._next_id
+        elif pred_id in self._predicates:
+            raise KeyError(f"predicate ID {pred_id!r} is already in use")
+        self._predicates[pred_id] = predicate
+        self._roots = None
+        return pred_id
+
+    def remove(self, pred_id: Hashable) -> None:
+        """Remove a predicate; the DAG is rebuilt on the next match"""
+        del self._predicates[pred_id]
+        self._roots = None
+
+    def match(self, record: Any) -> List[Hashable]:
+        """IDs of the predicates that record satisfies, in insertion order"""
+        roots = self._roots
+        if roots is None:
+            roots = self._build()
+        memo = [_UNSET] * self._slots
+        return [pred_id for pred_id, root in roots if root(memo, record)]
+
+    def match_all(self, records: Iterable[Any]) -> Iterator[List[Hashable]]:
+        """match() for each record in turn"""
+        for record in records:
+            yield self.match(record)
+
+    # DAG construction ----------------------------------------------------
+
+    def _build(self) -> List[Tuple[Hashable, Node]]:
+        """Compile every predicate into one DAG, memoizing shared nodes"""
+        uses: Dict[Hashable, int] = {}
+        for predicate in self._predicates.values():
+            _count_uses(predicate, (), uses)
+        builder = _DagBuilder(uses)
+        roots = [
+            (pred_id, builder.compile(predicate, ()))
+            for pred_id, predicate in self._predicates.items()
+        ]
+        self._slots = builder.slots
+        self.node_count = len(uses)
+        self.atom_count = builder.atoms
+        self.shared = sum(1 for count in uses.values() if count > 1)
+        self._roots = roots
+        return roots
+
+
+def _children(predicate: Predicate) -> Tuple[Predicate, ...]:
+    """Sub-predicates of a connective; atoms have none"""
+    if isinstance(predicate, _CONNECTIVES):
+        return tuple(predicate.args)
+    return ()
+
+
+def _count_uses(predicate: Predicate, scope: Scope, uses: Dict[Hashable, int]) -> None:
+    """Count how many parents (or roots) refer to each distinct node"""
+    while isinstance(predicate, Field):
+        name, predicate = predicate.args
+        scope = scope + (name,)
+    key = (scope, structural_key(predicate))
+    uses[key] = uses.get(key, 0) + 1
+    if uses[key] == 1:
+        for child in _children(predicate):
+            _count_uses(child, scope, uses)
+
+
+class _DagBuilder:
+    """Compiles predicates into nodes, one per distinct sub-predicate"""
+
+    def __init__(self, uses: Dict[Hashable, int]) -> None:
+        self.uses = uses
+        self.nodes: Dict[Hashable, Node] = {}
+        self.inputs: Dict[Scope, Node] = {(): lambda memo, record: record}
+        self.slots = 0
+        self.atoms = 0
+
+    def input(self, scope: Scope) -> Node:
+        """Node producing the value that atoms under scope are applied to"""
+        node = self.inputs.get(scope)
+        if node is None:
+            parent = self.input(scope[:-1])
+            name = scope[-1]
+            node = self.inputs[scope] = lambda memo, record: parent(memo, record)[name]
+        return node
+
+    def compile(self, predicate: Predicate, scope: Scope) -> Node:
+        while isinstance(predicate, Field):
+            name, predicate = predicate.args
+            scope = scope + (name,)
+        key = (scope, structural_key(predicate))
+        node = self.nodes.get(key)
+        if node is None:
+            node = self.compute(predicate, scope)
+            if self.uses[key] > 1:
+                # Shared: evaluate once per record and remember the result
+                node = _memoized(self.slots, node)
+                self.slots += 1
+            self.nodes[key] = node
+        return node
+
+    def compute(self, predicate: Predicate, scope: Scope) -> Node:
+        """Evaluation of one node from its children
+
+        Like Python's and / or, nodes may return any truthy or falsy value.
+        """
+        if isinstance(predicate, (Conjunction, AllOf, Disjunction)):
+            children = tuple(self.compile(child, scope) for child in predicate.args)
+            if isinstance(predicate, Disjunction):
+                first, second = children
+                return lambda memo, record: first(memo, record) or second(
+                    memo, record
+                )
+            if len(children) == 2:
+                first, second = children
+                return lambda memo, record: first(memo, record) and second(
+                    memo, record
+                )
+
+            def conjunction(memo: List[Any], record: Any) -> bool:
+                for child in children:
+                    if not child(memo, record):
+                        return False
+                return True
+
+            return conjunction
+        if isinstance(predicate, Negation):
+            operand = self.compile(predicate.args[0], scope)
+            return lambda memo, record: not operand(memo, record)
+        if isinstance(predicate, (Implication, Biconditional, ExclusiveOr)):
+            first, second = (self.compile(c, scope) for c in predicate.args)
+            if isinstance(predicate, Implication):
+                return lambda memo, record: (
+                    not first(memo, record) or second(memo, record)
+                )
+            # Raw results are compared, as logical_iff and logical_xor do
+            if isinstance(predicate, ExclusiveOr):
+                return lambda memo, record: first(memo, record) != second(
+                    memo, record
+                )
+            return lambda memo, record: first(memo, record) == second(memo, record)
+        self.atoms += 1
+        test = compiled(predicate)
+        if not scope:
+            return lambda memo, record: test(record)
+        if len(scope) == 1:
+            name = scope[0]
+            return lambda memo, record: test(record[name])
+        value = self.input(scope)
+        return lambda memo, record: test(value(memo, record))
+
+
+_CONNECTIVES = (
+    Conjunction,
+    AllOf,
+    Disjunction,
+    Negation,
+    Implication,
+    Biconditional,
+    ExclusiveOr,
+)
+
+
+def _memoized(slot: int, compute: Node) -> Node:
+    """Wrap compute so it runs at most once per memo"""
+
+    def node(memo: List[Any], record: Any) -> Any:
+        value = memo[slot]
+        if value is _UNSET:
+            value = memo[slot] = compute(memo, record)
+        return value
+
+    return node
@@ -5,7 +5,9 @@ This module contains fundamental predicate functions and higher-order
 functions for creating predicates.
 """
 
-from typing import Callable, TypeVar
+from typing import Any, Callable, TypeVar
+
+from .expressions import Expression, compiled
 
 # Type variable for the input type to predicates
 T = TypeVar("T")
@@ -14,6 +16,55 @@ T = TypeVar("T")
 Predicate = Callable[[T], bool]
 
 
+class GreaterThan(Expression):
+    """x > threshold as an inspectable expression"""
+
+    __slots__ = ()
+    op = "greater_than"
+
+    def compile(self) -> Callable[[Any], bool]:
+        threshold = self.args[0]
+        return lambda x: x > threshold
+
+
+class LessThan(Expression):
+    """x < threshold as an inspectable expression"""
+
+    __slots__ = ()
+    op = "less_than"
+
+    def compile(self) -> Callable[[Any], bool]:
+        threshold = self.args[0]
+        return lambda x: x < threshold
+
+
+class Equals(Expression):
+    """x == value as an inspectable expression"""
+
+    __slots__ = ()
+    op = "equals"
+
+    def compile(self) -> Callable[[Any], bool]:
+        value = self.args[0]
+        return lambda x: x == value
+
+
+class AllOf(Expression):
+    """Conjunction of any number of predicates as an inspectable expression"""
+
+    __slots__ = ()
+    op = "compose_predicates"
+    child_slice = slice(None)
+
+    def compile(self) -> Callable[[Any], bool]:
+        predicates = tuple(map(compiled, self.args))
+
+        def composed_predicate(x: Any) -> bool:
+            return all(pred(x) for pred in predicates)
+
+        return composed_predicate
+
+
 def is_even(x: int) -> bool:
     """Predicate: x is even"""
     return x % 2 == 0
@@ -26,23 +77,19 @@ def is_positive(x: float) -> bool:
 
 def greater_than(threshold: float) -> Predicate[float]:
     """Higher-order predicate: returns a predicate function"""
-    return lambda x: x > threshold
+    return GreaterThan(threshold)
 
 
 def less_than(threshold: float) -> Predicate[float]:
     """Higher-order predicate: returns a predicate function"""
-    return lambda x: x < threshold
+    return LessThan(threshold)
 
 
 def equals(value: T) -> Predicate[T]:
     """Higher-order predicate: returns a predicate function for equality"""
-    return lambda x: x == value
+    return Equals(value)
 
 
 def compose_predicates(*predicates: Predicate[T]) -> Predicate[T]:
     """Compose multiple predicates with AND logic"""
-
-    def composed_predicate(x: T) -> bool:
-        return all(pred(x) for pred in predicates)
-
-    return composed_predicate
+    return AllOf(*predicates)
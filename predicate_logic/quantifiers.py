@@ -7,6 +7,9 @@ using functional programming approaches.
 
 from typing import Callable, Iterable, List, Optional, TypeVar
 
+from .expressions import compiled
+from .indexing import IndexedDomain
+
 # Type variable for the input type to predicates
 T = TypeVar("T")
 
@@ -16,32 +19,50 @@ Predicate = Callable[[T], bool]
 
 def forall(predicate: Predicate[T], domain: Iterable[T]) -> bool:
     """Universal quantifier: ∀x ∈ domain, P(x)"""
-    return all(predicate(x) for x in domain)
+    if isinstance(domain, IndexedDomain):
+        return domain.forall(predicate)
+    test = compiled(predicate)
+    return all(test(x) for x in domain)
 
 
 def exists(predicate: Predicate[T], domain: Iterable[T]) -> bool:
     """Existential quantifier: ∃x ∈ domain, P(x)"""
-    return any(predicate(x) for x in domain)
+    if isinstance(domain, IndexedDomain):
+        return domain.exists(predicate)
+    test = compiled(predicate)
+    return any(test(x) for x in domain)
 
 
 def exists_unique(predicate: Predicate[T], domain: Iterable[T]) -> bool:
     """Unique existence: ∃!x ∈ domain, P(x)"""
-    return sum(1 for x in domain if predicate(x)) == 1
+    if isinstance(domain, IndexedDomain):
+        return domain.exists_unique(predicate)
+    test = compiled(predicate)
+    return sum(1 for x in domain if test(x)) == 1
 
 
 def count_where(predicate: Predicate[T], domain: Iterable[T]) -> int:
     """Count how many elements in domain satisfy the predicate"""
-    return sum(1 for x in domain if predicate(x))
+    if isinstance(domain, IndexedDomain):
+        return domain.count_where(predicate)
+    test = compiled(predicate)
+    return sum(1 for x in domain if test(x))
 
 
 def find_all(predicate: Predicate[T], domain: Iterable[T]) -> List[T]:
     """Find all elements in domain that satisfy the predicate"""
-    return [x for x in domain if predicate(x)]
+    if isinstance(domain, IndexedDomain):
+        return domain.find_all(predicate)
+    test = compiled(predicate)
+    return [x for x in domain if test(x)]
 
 
 def find_first(predicate: Predicate[T], domain: Iterable[T]) -> Optional[T]:
     """Find the first element in domain that satisfies the predicate"""
+    if isinstance(domain, IndexedDomain):
+        return domain.find_first(predicate)
+    test = compiled(predicate)
     for x in domain:
-        if predicate(x):
+        if test(x):
             return x
     return None
@@ -7,7 +7,7 @@ and checking their properties (reflexive, symmetric, transitive, etc.).
 
 from typing import Any, Callable, Iterable, Tuple, TypeVar
 
-from .logical_operators import logical_implies
+from .expressions import Expression, compiled
 from .quantifiers import forall
 
 # Type variables
@@ -19,6 +19,42 @@ BinaryRelation = Callable[[T, T], bool]
 Predicate = Callable[[T], bool]
 
 
+class CartesianProduct(Expression):
+    """pred1(x) and pred2(y) over pairs (x, y) as an inspectable expression"""
+
+    __slots__ = ()
+    op = "cartesian_predicate"
+    child_slice = slice(None)
+
+    def compile(self) -> Callable[[Tuple[Any, Any]], bool]:
+        pred1, pred2 = map(compiled, self.args)
+
+        def cart_pred(xy_pair: Tuple[Any, Any]) -> bool:
+            x, y = xy_pair
+            return pred1(x) and pred2(y)
+
+        return cart_pred
+
+
+class BoundVariable(Expression):
+    """A multi-argument predicate with one argument fixed"""
+
+    __slots__ = ()
+    op = "bind_variable"
+    child_slice = slice(0, 1)
+
+    def compile(self) -> Callable[..., Any]:
+        predicate = compiled(self.args[0])
+        var_index, value = self.args[1:]
+
+        def bound_predicate(*args: Any) -> Any:
+            new_args = list(args)
+            new_args.insert(var_index, value)
+            return predicate(*new_args)
+
+        return bound_predicate
+
+
 def loves(person1: str, person2: str) -> bool:
     """Binary predicate: person1 loves person2"""
     # This would typically check some data structure
@@ -55,28 +91,22 @@ def is_reflexive(relation: BinaryRelation[T], domain: Iterable[T]) -> bool:
 
 def is_symmetric(relation: BinaryRelation[T], domain: Iterable[T]) -> bool:
     """Check if a binary relation is symmetric"""
+    # relation(x, y) → relation(y, x), written out rather than built with
+    # logical_implies, which would construct an expression for every pair
+    relation = compiled(relation)
     return forall(
-        lambda x: forall(
-            lambda y: logical_implies(
-                lambda _: relation(x, y), lambda _: relation(y, x)
-            )(None),
-            domain,
-        ),
+        lambda x: forall(lambda y: not relation(x, y) or relation(y, x), domain),
         domain,
     )
 
 
 def is_transitive(relation: BinaryRelation[T], domain: Iterable[T]) -> bool:
     """Check if a binary relation is transitive"""
+    relation = compiled(relation)
     return forall(
         lambda x: forall(
-            lambda y: forall(
-                lambda z: logical_implies(
-                    lambda _: relation(x, y) and relation(y, z),
-                    lambda _: relation(x, z),
-                )(None),
-                domain,
-            ),
+            lambda y: not relation(x, y)
+            or forall(lambda z: not relation(y, z) or relation(x, z), domain),
             domain,
         ),
         domain,
@@ -96,22 +126,11 @@ def cartesian_predicate(
     pred1: Predicate[T], pred2: Predicate[U]
 ) -> Predicate[Tuple[T, U]]:
     """Create predicate over cartesian product of domains"""
-
-    def cart_pred(xy_pair: Tuple[T, U]) -> bool:
-        x, y = xy_pair
-        return pred1(x) and pred2(y)
-
-    return cart_pred
+    return CartesianProduct(pred1, pred2)
 
 
 def bind_variable(
     predicate: Callable[..., Any], var_index: int, value: Any
 ) -> Callable[..., Any]:
     """Bind a specific variable in a multi-argument predicate"""
-
-    def bound_predicate(*args: Any) -> Any:
-        new_args = list(args)
-        new_args.insert(var_index, value)
-        return predicate(*new_args)
-
-    return bound_predicate
+    return BoundVariable(predicate, var_index, value)
@@ -0,0 +1,371 @@
+"""
+Incremental rule matching with a Rete network.
+
+A ReteNetwork compiles Horn rules into a discrimination network. Each body
+atom becomes an alpha memory holding the facts that pass its constant and
+repeated-variable tests; alpha memories are shared by every rule body atom
+with the same tests. The atoms of a body are then joined left to right by
+join nodes, each of which stores its partial matches (tokens) in a beta
+memory with hash indexes on the join variables.
+
+Inserting a fact only visits the alpha memories of its predicate and the
+partial matches it extends, so its cost depends on the matches it affects
+rather than on the number of facts already known. When a token reaches the
+end of a rule body the rule fires: an Activation is reported to on_fire
+and the head fact is inserted in turn, so derived facts are matched too.
+
+Retracting a fact walks the same paths backwards: it leaves the alpha
+memories it passed, and the tokens built from it leave the beta memories
+downstream. Derived facts that lose a derivation are deleted in turn, then
+those that still have one left are inserted again (delete and rederive),
+which stays correct when recursive rules make facts support each other.
+"""
+
+from collections import deque
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from .rules import Atom, FactTable, Row, Rule, Var, plan_body, substitute
+
+# A ground fact: (predicate name, argument tuple)
+Fact = Tuple[str, Row]
+
+# Alpha memory tests: the predicate, its arity, (position, constant) pairs
+# and (position, earlier position) pairs for repeated variables
+AlphaKey = Tuple[str, int, Tuple[Tuple[int, Any], ...], Tuple[Tuple[int, int], ...]]
+
+
+class Activation(NamedTuple):
+    """A rule firing: the rule, the variable binding and the fact it derives"""
+
+    rule: Rule
+    binding: Dict[Var, Any]
+    fact: Fact
+
+
+ActivationHook = Callable[[Activation], None]
+
+
+class _AlphaMemory:
+    """Facts of one predicate passing an atom's tests, shared between rules"""
+
+    __slots__ = ("arity", "constants", "equal", "rows", "joins")
+
+    def __init__(self, key: AlphaKey) -> None:
+        _, self.arity, self.constants, self.equal = key
+        self.rows = FactTable()
+        self.joins: List[_JoinNode] = []
+
+    def test(self, row: Row) -> bool:
+        return (
+            len(row) == self.arity
+            and all(row[p] == value for p, value in self.constants)
+            and all(row[p] == row[q] for p, q in self.equal)
+        )
+
+
+class _JoinNode:
+    """Joins the tokens of the previous node with the rows of one body atom
+
+    A token is a tuple holding the values of the variables bound so far, in
+    order of first appearance in the (reordered) body.
+    """
+
+    __slots__ = (
+        "alpha",
+        "left",
+        "left_positions",
+        "right_positions",
+        "outputs",
+        "memory",
+        "next",
+        "rule",
+        "variables",
+    )
+
+    def __init__(
+        self,
+        alpha: _AlphaMemory,
+        left: Optional[FactTable],
+        left_positions: Tuple[int, ...],
+        right_positions: Tuple[int, ...],
+        outputs: Tuple[int, ...],
+    ) -> None:
+        self.alpha = alpha
+        self.left = left
+        self.left_positions = left_positions
+        self.right_positions = right_positions
+        self.outputs = outputs
+        self.memory = FactTable()
+        self.next: Optional[_JoinNode] = None
+        # Set on the last node of a body: the rule and the token's variables
+        self.rule: Optional[Rule] = None
+        self.variables: Tuple[Var, ...] = ()
+
+
+class ReteNetwork:
+    """Horn rules matched incrementally against a growing set of facts"""
+
+    def __init__(
+        self,
+        rules: Iterable[Rule] = (),
+        on_fire: Optional[ActivationHook] = None,
+    ) -> None:
+        #: Every fact inserted or derived so far, by predicate
+        self.tables: Dict[str, FactTable] = {}
+        self.rules: List[Rule] = []
+        self.on_fire = on_fire
+        self._alphas: Dict[str, Dict[AlphaKey, _AlphaMemory]] = {}
+        self._pending: Deque[Fact] = deque()
+        # Facts given to insert(), which hold whatever is retracted
+        self._asserted: Set[Fact] = set()
+        # Complete tokens (rule body matches) deriving each fact
+        self._support: Dict[Fact, int] = {}
+        #: Partial matches created and rule firings, over the network's life
+        self.tokens = 0
+        self.firings = 0
+        for rule in rules:
+            self.add_rule(rule)
+
+    @property
+    def alpha_count(self) -> int:
+        """Number of distinct alpha memories"""
+        return sum(len(alphas) for alphas in self._alphas.values())
+
+    def add_rule(self, rule: Rule) -> List[Fact]:
+        """Compile a rule into the network and return the facts it derives
+
+        Only plain Horn rules can be matched incrementally: a new fact can
+        retract the conclusions of negated atoms and change aggregates.
+        """
+        rule.validate()
+        if not rule.is_positive():
+            raise ValueError(f"rule {rule} uses negation or an aggregate")
+        self.rules.append(rule)
+        self.tables.setdefault(rule.head.predicate, FactTable())
+        sizes = {name: len(table) for name, table in self.tables.items()}
+        variables: List[Var] = []
+        first: Optional[_JoinNode] = None
+        node: Optional[_JoinNode] = None
+        for i in plan_body(rule.body, sizes):
+            atom = rule.body[i]
+            left_positions: List[int] = []
+            right_positions: List[int] = []
+            outputs: List[int] = []
+            known = len(variables)
+            for position, arg in enumerate(atom.args):
+                if not isinstance(arg, Var):
+                    continue
+                if arg not in variables:
+                    variables.append(arg)
+                    outputs.append(position)
+                elif variables.index(arg) < known:
+                    left_positions.append(variables.index(arg))
+                    right_positions.append(position)
+                # else: repeated within this atom, checked by the alpha test
+            join = _JoinNode(
+                self._alpha_memory(atom),
+                node.memory if node is not None else None,
+                tuple(left_positions),
+                tuple(right_positions),
+                tuple(outputs),
+            )
+            join.alpha.joins.append(join)
+            if node is None:
+                first = join
+            else:
+                node.next = join
+            node = join
+        assert first is not None and node is not None
+        node.rule = rule
+        node.variables = tuple(variables)
+        # Match the facts already known against the new rule
+        for row in list(first.alpha.rows):
+            self._right_activate(first, row)
+        return self._drain([])
+
+    def insert(self, predicate: str, args: Iterable[Any]) -> List[Fact]:
+        """Add a fact and return the facts derived from it, in firing order"""
+        fact = (predicate, tuple(args))
+        self._asserted.add(fact)
+        return self._drain([fact])
+
+    def retract(self, predicate: str, args: Iterable[Any]) -> List[Fact]:
+        """Remove an inserted fact and return the derived facts that went with it
+
+        The fact itself stays if rules still derive it. Only the matches
+        that the removed facts took part in are visited, as for insert().
+        """
+        fact = (predicate, tuple(args))
+        if fact not in self._asserted:
+            return []
+        self._asserted.discard(fact)
+        deleted = self._delete(fact)
+        # Deleted facts that still have a match of a rule body, from facts
+        # that were not deleted, hold after all
+        restore = [f for f in deleted if self._support.get(f)]
+        on_fire, self.on_fire = self.on_fire, None
+        try:
+            # Their consequences were reported when first derived
+            self._drain(restore)
+        finally:
+            self.on_fire = on_fire
+        return [f for f in deleted if f != fact and f not in self]
+
+    def __contains__(self, fact: object) -> bool:
+        if not isinstance(fact, tuple) or len(fact) != 2:
+            return False
+        table = self.tables.get(fact[0])
+        return table is not None and fact[1] in table
+
+    def _alpha_memory(self, atom: Atom) -> _AlphaMemory:
+        """The alpha memory for atom's tests, created and filled on first use"""
+        constants: List[Tuple[int, Any]] = []
+        equal: List[Tuple[int, int]] = []
+        first_seen: Dict[Var, int] = {}
+        for position, arg in enumerate(atom.args):
+            if not isinstance(arg, Var):
+                constants.append((position, arg))
+            elif arg in first_seen:
+                equal.append((position, first_seen[arg]))
+            else:
+                first_seen[arg] = position
+        key: AlphaKey = (
+            atom.predicate,
+            len(atom.args),
+            tuple(constants),
+            tuple(equal),
+        )
+        alphas = self._alphas.setdefault(atom.predicate, {})
+        alpha = alphas.get(key)
+        if alpha is None:
+            alpha = alphas[key] = _AlphaMemory(key)
+            for row in self.tables.get(atom.predicate, ()):
+                if alpha.test(row):
+                    alpha.rows.add(row)
+        return alpha
+
+    def _drain(self, facts: List[Fact]) -> List[Fact]:
+        """Insert facts and everything they derive; return the derived ones"""
+        pending = self._pending
+        pending.extend(facts)
+        # The first len(facts) entries popped are the given facts
+        given = len(facts)
+        derived: List[Fact] = []
+        while pending:
+            predicate, row = pending.popleft()
+            given -= 1
+            table = self.tables.get(predicate)
+            if table is None:
+                table = self.tables[predicate] = FactTable()
+            if not table.add(row):
+                continue
+            if given < 0:
+                derived.append((predicate, row))
+            for alpha in self._alphas.get(predicate, {}).values():
+                if alpha.test(row):
+                    alpha.rows.add(row)
+                    for join in alpha.joins:
+                        self._right_activate(join, row)
+        return derived
+
+    def _delete(self, fact: Fact) -> List[Fact]:
+        """Delete fact and every derived fact that loses a derivation"""
+        pending: Deque[Fact] = deque([fact])
+        deleted: List[Fact] = []
+        while pending:
+            predicate, row = pending.popleft()
+            table = self.tables.get(predicate)
+            if table is None or not table.discard(row):
+                continue
+            deleted.append((predicate, row))
+            alphas = [
+                alpha
+                for alpha in self._alphas.get(predicate, {}).values()
+                if alpha.test(row)
+            ]
+            # Rows leave their alpha memories only once every join has seen
+            # them, so that tokens joining the row with itself are found
+            for alpha in alphas:
+                for join in alpha.joins:
+                    self._right_retract(join, row, pending)
+            for alpha in alphas:
+                alpha.rows.discard(row)
+        return deleted
+
+    def _right_retract(self, join: _JoinNode, row: Row, pending: Deque[Fact]) -> None:
+        """A row leaving join's alpha memory: drop the tokens it extended"""
+        extension = tuple(row[p] for p in join.outputs)
+        if join.left is None:
+            self._unemit(join, extension, pending)
+            return
+        key = tuple(row[p] for p in join.right_positions)
+        for token in join.left.lookup(join.left_positions, key):
+            self._unemit(join, token + extension, pending)
+
+    def _unemit(self, join: _JoinNode, token: Row, pending: Deque[Fact]) -> None:
+        """Drop a token of join and the tokens built on it downstream"""
+        if not join.memory.discard(token):
+            return
+        successor = join.next
+        if successor is None:
+            rule = join.rule
+            assert rule is not None
+            binding = dict(zip(join.variables, token))
+            fact = (rule.head.predicate, substitute(rule.head, binding))
+            self._support[fact] -= 1
+            if not self._support[fact]:
+                del self._support[fact]
+            if fact not in self._asserted:
+                pending.append(fact)
+            return
+        key = tuple(token[p] for p in successor.left_positions)
+        for row in successor.alpha.rows.lookup(successor.right_positions, key):
+            self._unemit(
+                successor, token + tuple(row[p] for p in successor.outputs), pending
+            )
+
+    def _right_activate(self, join: _JoinNode, row: Row) -> None:
+        """A new row in join's alpha memory: extend the matching tokens"""
+        extension = tuple(row[p] for p in join.outputs)
+        if join.left is None:
+            self._emit(join, extension)
+            return
+        key = tuple(row[p] for p in join.right_positions)
+        for token in join.left.lookup(join.left_positions, key):
+            self._emit(join, token + extension)
+
+    def _emit(self, join: _JoinNode, token: Row) -> None:
+        """Store a token produced by join and pass it on (left activation)"""
+        if not join.memory.add(token):
+            return
+        self.tokens += 1
+        successor = join.next
+        if successor is None:
+            self._fire(join, token)
+            return
+        key = tuple(token[p] for p in successor.left_positions)
+        for row in successor.alpha.rows.lookup(successor.right_positions, key):
+            self._emit(successor, token + tuple(row[p] for p in successor.outputs))
+
+    def _fire(self, join: _JoinNode, token: Row) -> None:
+        """A complete match of a rule body: derive its head"""
+        rule = join.rule
+        assert rule is not None
+        self.firings += 1
+        binding = dict(zip(join.variables, token))
+        fact = (rule.head.predicate, substitute(rule.head, binding))
+        self._support[fact] = self._support.get(fact, 0) + 1
+        self._pending.append(fact)
+        if self.on_fire is not None:
+            self.on_fire(Activation(rule, binding, fact))
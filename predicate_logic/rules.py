@@ -0,0 +1,798 @@
+"""
+Horn rules with variables and their bottom-up evaluation.
+
+A rule such as grandparent(X, Z) :- parent(X, Y), parent(Y, Z) is a Rule
+whose head and body are Atoms over Vars and constants. materialize()
+computes every fact derivable from a set of rules and base facts by
+semi-naive evaluation: each round only joins against the facts that are
+new since the previous round. Bodies are joined through hash indexes in an
+order that binds variables as early as possible, except for cyclic bodies
+such as triangle(X, Y, Z) :- e(X, Y), e(Y, Z), e(Z, X), where pairwise joins
+can produce far more intermediate rows than results; those are joined one
+variable at a time by leapfrog triejoin over sorted tries of the facts.
+"""
+
+import time
+from bisect import bisect_left
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+# A row of a fact table: the arguments of one fact
+Row = Tuple[Any, ...]
+
+# A trie level: its values in sorted order and, except at the last level,
+# the child level below each value
+TrieNode = Tuple[List[Any], Optional[List[Any]]]
+
+# What a trie column holds: "number", "str", or None when it is empty
+ColumnKind = Optional[str]
+
+HASH_JOIN = "Hash join"
+LEAPFROG_TRIEJOIN = "Leapfrog triejoin"
+
+
+class Var:
+    """A logic variable, written X (or any capitalized name) in rule text"""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Var) and other.name == self.name
+
+    def __hash__(self) -> int:
+        return hash((Var, self.name))
+
+    def __repr__(self) -> str:
+        return self.name
+
+    def __reduce__(self) -> Tuple[Any, Tuple[str]]:
+        return (Var, (self.name,))
+
+
+class Aggregate(NamedTuple):
+    """count(X), sum(X), min(X) or max(X) in a rule head"""
+
+    function: str
+    var: Var
+
+
+# Initial value and update step of each aggregate function
+_AGGREGATES: Dict[str, Tuple[Any, Callable[[Any, Any], Any]]] = {
+    "count": (0, lambda total, value: total + 1),
+    "sum": (0, lambda total, value: total + value),
+    "min": (None, lambda least, value: value if least is None else min(least, value)),
+    "max": (None, lambda most, value: value if most is None else max(most, value)),
+}
+
+
+class Atom(NamedTuple):
+    """predicate(arg, ...) where each argument is a Var or a constant
+
+    In a rule body, a negated atom (not parent(X, _)) holds when no fact
+    matches it; its variables that no positive atom binds are existential.
+    """
+
+    predicate: str
+    args: Tuple[Any, ...]
+    negated: bool = False
+
+    def variables(self) -> List[Var]:
+        """The distinct variables of the atom, in order of appearance"""
+        seen: List[Var] = []
+        for arg in self.args:
+            if isinstance(arg, Aggregate):
+                arg = arg.var
+            if isinstance(arg, Var) and arg not in seen:
+                seen.append(arg)
+        return seen
+
+    def is_ground(self) -> bool:
+        """True if the atom contains no variables"""
+        return not self.variables()
+
+    def __str__(self) -> str:
+        text = f"{self.predicate}({', '.join(_format_term(a) for a in self.args)})"
+        return f"not {text}" if self.negated else text
+
+
+class Rule(NamedTuple):
+    """head :- body[0], body[1], ..."""
+
+    head: Atom
+    body: Tuple[Atom, ...]
+
+    def validate(self) -> "Rule":
+        """Check that every head variable is bound by a positive body atom"""
+        if not self.body:
+            raise ValueError(f"rule {self} has an empty body")
+        if self.head.negated:
+            raise ValueError(f"rule {self} has a negated head")
+        for atom in self.body:
+            if any(isinstance(arg, Aggregate) for arg in atom.args):
+                raise ValueError(f"aggregates are only allowed in rule heads: {self}")
+        for arg in self.head.args:
+            if isinstance(arg, Aggregate) and arg.function not in _AGGREGATES:
+                raise ValueError(f"unknown aggregate {arg.function!r} in {self}")
+        positive, _ = self.split_body()
+        bound = {var for atom in positive for var in atom.variables()}
+        unbound = [var for var in self.head.variables() if var not in bound]
+        if unbound:
+            names = ", ".join(var.name for var in unbound)
+            raise ValueError(
+                f"head variables {names} do not appear in a positive body atom"
+            )
+        return self
+
+    def split_body(self) -> Tuple[Tuple[Atom, ...], Tuple[Atom, ...]]:
+        """The positive and the negated atoms of the body"""
+        positive = tuple(atom for atom in self.body if not atom.negated)
+        negative = tuple(atom for atom in self.body if atom.negated)
+        return positive, negative
+
+    def is_aggregate(self) -> bool:
+        """True if the head computes count, sum, min or max"""
+        return any(isinstance(arg, Aggregate) for arg in self.head.args)
+
+    def is_positive(self) -> bool:
+        """True for plain Horn rules: no negation and no aggregates"""
+        return not self.is_aggregate() and not any(a.negated for a in self.body)
+
+    def __str__(self) -> str:
+        return f"{self.head} :- {', '.join(str(atom) for atom in self.body)}."
+
+
+def _format_term(term: Any) -> str:
+    if isinstance(term, Var):
+        return term.name
+    if isinstance(term, Aggregate):
+        return f"{term.function}({term.var.name})"
+    if isinstance(term, str) and term.isidentifier() and term[0].islower():
+        return term
+    return repr(term)
+
+
+class FactTable:
+    """The rows of one predicate, with hash indexes on argument positions"""
+
+    __slots__ = ("rows", "_indexes", "_tries")
+
+    def __init__(self, rows: Iterable[Row] = ()) -> None:
+        self.rows: Set[Row] = set(rows)
+        self._indexes: Dict[Tuple[int, ...], Dict[Row, List[Row]]] = {}
+        self._tries: Dict[Tuple[Any, ...], Tuple[TrieNode, List[ColumnKind]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, row: object) -> bool:
+        return row in self.rows
+
+    def __iter__(self) -> Iterator[Row]:
+        return iter(self.rows)
+
+    def add(self, row: Row) -> bool:
+        """Add a row, keeping indexes current; False if it was present"""
+        if row in self.rows:
+            return False
+        self.rows.add(row)
+        for positions, index in self._indexes.items():
+            index.setdefault(tuple(row[p] for p in positions), []).append(row)
+        self._tries.clear()
+        return True
+
+    def discard(self, row: Row) -> bool:
+        """Remove a row, keeping indexes current; False if it was absent"""
+        if row not in self.rows:
+            return False
+        self.rows.discard(row)
+        for positions, index in self._indexes.items():
+            key = tuple(row[p] for p in positions)
+            bucket = index[key]
+            bucket.remove(row)
+            if not bucket:
+                del index[key]
+        self._tries.clear()
+        return True
+
+    def clear(self) -> None:
+        self.rows.clear()
+        self._indexes.clear()
+        self._tries.clear()
+
+    def lookup(self, positions: Tuple[int, ...], key: Row) -> Iterable[Row]:
+        """Rows whose values at positions equal key"""
+        if not positions:
+            return self.rows
+        index = self._indexes.get(positions)
+        if index is None:
+            index = self._indexes[positions] = {}
+            for row in self.rows:
+                index.setdefault(tuple(row[p] for p in positions), []).append(row)
+        return index.get(key, ())
+
+    def trie(
+        self,
+        arity: int,
+        columns: Tuple[int, ...],
+        constants: Tuple[Tuple[int, Any], ...] = (),
+        equal: Tuple[Tuple[int, int], ...] = (),
+    ) -> Tuple[TrieNode, List[ColumnKind]]:
+        """Rows passing the constant and equality tests, as a sorted trie
+
+        The trie has one level per column, in the given order; it comes with
+        the kind of values in each column. It is built on first use and
+        dropped when the table changes. Raises TypeError unless each column
+        holds only numbers or only strings.
+        """
+        key = (arity, columns, constants, equal)
+        trie = self._tries.get(key)
+        if trie is None:
+            rows = self.lookup(
+                tuple(p for p, _ in constants), tuple(v for _, v in constants)
+            )
+            projected = [
+                tuple(row[c] for c in columns)
+                for row in rows
+                if len(row) == arity and all(row[p] == row[q] for p, q in equal)
+            ]
+            kinds = [
+                _column_kind(row[i] for row in projected)
+                for i in range(len(columns))
+            ]
+            root = _build_trie(projected, 0, len(columns))
+            trie = self._tries[key] = (root, kinds)
+        return trie
+
+    def match(self, pattern: Sequence[Any]) -> List[Row]:
+        """Rows matching a pattern of constants and Vars"""
+        positions = tuple(
+            i for i, arg in enumerate(pattern) if not isinstance(arg, Var)
+        )
+        key = tuple(pattern[i] for i in positions)
+        rows = self.lookup(positions, key)
+        return [row for row in rows if _consistent(pattern, row)]
+
+
+def _column_kind(values: Iterable[Any]) -> ColumnKind:
+    """The one kind of sortable value in a column; TypeError for any other"""
+    kinds = {type(value) for value in values}
+    if not kinds:
+        return None
+    if kinds <= {int, float, bool}:
+        return "number"
+    if kinds == {str}:
+        return "str"
+    raise TypeError(f"cannot sort a column of {', '.join(k.__name__ for k in kinds)}")
+
+
+def _build_trie(rows: List[Row], depth: int, width: int) -> TrieNode:
+    groups: Dict[Any, List[Row]] = {}
+    for row in rows:
+        groups.setdefault(row[depth], []).append(row)
+    values = sorted(groups)
+    children = None
+    if depth + 1 < width:
+        children = [_build_trie(groups[v], depth + 1, width) for v in values]
+    return values, children
+
+
+def _consistent(pattern: Sequence[Any], row: Row) -> bool:
+    """Check repeated variables in pattern take equal values in row"""
+    seen: Dict[Var, Any] = {}
+    for arg, value in zip(pattern, row):
+        if isinstance(arg, Var):
+            if arg in seen and seen[arg] != value:
+                return False
+            seen[arg] = value
+    return len(row) == len(pattern)
+
+
+# Join planning ---------------------------------------------------------
+
+
+def plan_body(
+    body: Sequence[Atom],
+    sizes: Dict[str, int],
+    first: Optional[int] = None,
+    bound: Iterable[Var] = (),
+) -> List[int]:
+    """Order body atoms so each one shares as many bound variables as possible
+
+    Ties go to the atom with fewer rows. first, if given, is placed first
+    (semi-naive evaluation starts from the atom reading new facts).
+    """
+    bound_vars: Set[Var] = set(bound)
+    remaining = list(range(len(body)))
+    order: List[int] = []
+    if first is not None:
+        order.append(first)
+        remaining.remove(first)
+        bound_vars.update(body[first].variables())
+    while remaining:
+
+        def score(i: int) -> Tuple[int, int, int]:
+            atom = body[i]
+            fixed = sum(
+                1 for a in atom.args if not isinstance(a, Var) or a in bound_vars
+            )
+            return (-fixed, sizes.get(atom.predicate, 0), i)
+
+        best = min(remaining, key=score)
+        order.append(best)
+        remaining.remove(best)
+        bound_vars.update(body[best].variables())
+    return order
+
+
+def is_cyclic(body: Sequence[Atom]) -> bool:
+    """True if the variables of body form a cyclic hypergraph
+
+    Uses GYO reduction: variables found in a single atom are dropped, as
+    are atoms whose variables all appear in another atom. Acyclic bodies
+    reduce to at most one atom.
+    """
+    edges = [set(atom.variables()) for atom in body]
+    changed = True
+    while changed and len(edges) > 1:
+        changed = False
+        counts: Dict[Var, int] = {}
+        for edge in edges:
+            for var in edge:
+                counts[var] = counts.get(var, 0) + 1
+        for edge in edges:
+            lonely = {var for var in edge if counts[var] == 1}
+            if lonely:
+                edge -= lonely
+                changed = True
+        for i, edge in enumerate(edges):
+            if any(j != i and edge <= other for j, other in enumerate(edges)):
+                del edges[i]
+                changed = True
+                break
+    return len(edges) > 1
+
+
+def join_strategy(body: Sequence[Atom]) -> str:
+    """The join algorithm for a rule body: leapfrog triejoin if it is cyclic"""
+    return LEAPFROG_TRIEJOIN if is_cyclic(body) else HASH_JOIN
+
+
+def join_body(
+    body: Sequence[Atom],
+    order: Sequence[int],
+    tables: Sequence[FactTable],
+    binding: Optional[Dict[Var, Any]] = None,
+) -> Iterator[Dict[Var, Any]]:
+    """Every variable binding satisfying all atoms of body
+
+    tables[i] holds the rows to match body[i] against; atoms are visited
+    in the given order and each is probed through a hash index on the
+    positions already bound.
+    """
+    steps = []
+    bound: Set[Var] = set(binding or {})
+    for i in order:
+        atom = body[i]
+        positions: List[int] = []
+        key_terms: List[Any] = []
+        outputs: List[Tuple[int, Var]] = []
+        checks: List[Tuple[int, Var]] = []
+        newly: Set[Var] = set()
+        for position, arg in enumerate(atom.args):
+            if not isinstance(arg, Var) or arg in bound:
+                positions.append(position)
+                key_terms.append(arg)
+            elif arg in newly:
+                checks.append((position, arg))
+            else:
+                outputs.append((position, arg))
+                newly.add(arg)
+        bound |= newly
+        arity = len(atom.args)
+        steps.append((tables[i], tuple(positions), key_terms, outputs, checks, arity))
+
+    def walk(depth: int, env: Dict[Var, Any]) -> Iterator[Dict[Var, Any]]:
+        if depth == len(steps):
+            yield env
+            return
+        table, positions, key_terms, outputs, checks, arity = steps[depth]
+        key = tuple(env[t] if isinstance(t, Var) else t for t in key_terms)
+        for row in table.lookup(positions, key):
+            if len(row) != arity:
+                continue
+            extended = dict(env)
+            for position, var in outputs:
+                extended[var] = row[position]
+            if all(extended[var] == row[position] for position, var in checks):
+                yield from walk(depth + 1, extended)
+
+    yield from walk(0, dict(binding or {}))
+
+
+def variable_order(body: Sequence[Atom]) -> List[Var]:
+    """Order in which leapfrog triejoin binds the variables of body
+
+    Variables shared by more atoms come first, as they prune the most.
+    """
+    counts: Dict[Var, int] = {}
+    for atom in body:
+        for var in atom.variables():
+            counts[var] = counts.get(var, 0) + 1
+    first = list(counts)
+    return sorted(first, key=lambda var: (-counts[var], first.index(var)))
+
+
+def leapfrog_join(
+    body: Sequence[Atom],
+    tables: Sequence[FactTable],
+    binding: Optional[Dict[Var, Any]] = None,
+) -> Iterator[Dict[Var, Any]]:
+    """Every variable binding satisfying all atoms of body, by leapfrog triejoin
+
+    Variables are bound one at a time: the candidate values for a variable
+    are the intersection of the matching trie levels of every atom that
+    contains it, found by leapfrogging through the sorted levels. Unlike a
+    sequence of pairwise joins, this never produces more intermediate
+    results than the worst-case output size. The tries are built before
+    this returns, so values that cannot be sorted raise TypeError here.
+    """
+    given = dict(binding or {})
+    atoms = [
+        Atom(atom.predicate, tuple(given.get(a, a) for a in atom.args))
+        for atom in body
+    ]
+    order = variable_order(atoms)
+    rank = {var: i for i, var in enumerate(order)}
+    roots: List[TrieNode] = []
+    # participants[d]: the atoms whose tries have a level for order[d]
+    participants: List[List[int]] = [[] for _ in order]
+    # The kind of values each variable takes, which all its columns share
+    var_kinds: List[ColumnKind] = [None for _ in order]
+    for atom, table in zip(atoms, tables):
+        first_seen: Dict[Var, int] = {}
+        constants: List[Tuple[int, Any]] = []
+        equal: List[Tuple[int, int]] = []
+        for position, arg in enumerate(atom.args):
+            if not isinstance(arg, Var):
+                constants.append((position, arg))
+            elif arg in first_seen:
+                equal.append((position, first_seen[arg]))
+            else:
+                first_seen[arg] = position
+        if not first_seen:
+            # A ground atom is a membership test
+            if atom.args not in table:
+                return iter(())
+            continue
+        variables = sorted(first_seen, key=rank.__getitem__)
+        columns = tuple(first_seen[var] for var in variables)
+        root, kinds = table.trie(
+            len(atom.args), columns, tuple(constants), tuple(equal)
+        )
+        for var, kind in zip(variables, kinds):
+            d = rank[var]
+            if kind is not None and var_kinds[d] not in (None, kind):
+                raise TypeError(f"{var} takes both numbers and strings")
+            var_kinds[d] = var_kinds[d] or kind
+            participants[d].append(len(roots))
+        roots.append(root)
+    values: List[Any] = []
+
+    def walk(depth: int, nodes: List[Any]) -> Iterator[Dict[Var, Any]]:
+        if depth == len(order):
+            result = dict(given)
+            result.update(zip(order, values))
+            yield result
+            return
+        members = participants[depth]
+        current: List[TrieNode] = [nodes[i] for i in members]
+        for positions in _leapfrog([level for level, _ in current]):
+            values.append(current[0][0][positions[0]])
+            for i, (_, children), position in zip(members, current, positions):
+                nodes[i] = children[position] if children is not None else None
+            yield from walk(depth + 1, nodes)
+            values.pop()
+        for i, node in zip(members, current):
+            nodes[i] = node
+
+    return walk(0, list(roots))
+
+
+def _leapfrog(levels: List[List[Any]]) -> Iterator[Tuple[int, ...]]:
+    """Positions at which every sorted list holds the same value"""
+    if not all(levels):
+        return
+    if len(levels) == 1:
+        for i in range(len(levels[0])):
+            yield (i,)
+        return
+    count = len(levels)
+    positions = [0] * count
+    high = max(keys[0] for keys in levels)
+    while True:
+        # Seek each list in turn to the highest key seen, until all agree
+        agreed = 0
+        p = 0
+        while agreed < count:
+            keys = levels[p]
+            i = positions[p]
+            if keys[i] < high:
+                i = positions[p] = bisect_left(keys, high, i + 1)
+                if i == len(keys):
+                    return
+            if keys[i] == high:
+                agreed += 1
+            else:
+                high = keys[i]
+                agreed = 1
+            p = (p + 1) % count
+        yield tuple(positions)
+        positions[0] += 1
+        if positions[0] == len(levels[0]):
+            return
+        high = levels[0][positions[0]]
+
+
+def evaluate_body(
+    body: Sequence[Atom],
+    order: Sequence[int],
+    tables: Sequence[FactTable],
+    strategy: str = HASH_JOIN,
+) -> Iterator[Dict[Var, Any]]:
+    """Bindings satisfying body, joined by strategy (see join_strategy)"""
+    if strategy == LEAPFROG_TRIEJOIN:
+        try:
+            return leapfrog_join(body, tables)
+        except TypeError:
+            # Values that cannot be sorted: hash joins need only equality
+            pass
+    return join_body(body, order, tables)
+
+
+def substitute(atom: Atom, binding: Dict[Var, Any]) -> Row:
+    """The row obtained by replacing the variables of atom with their values"""
+    return tuple(binding[a] if isinstance(a, Var) else a for a in atom.args)
+
+
+# Bottom-up evaluation --------------------------------------------------
+
+
+class RuleStats:
+    """Work done for one rule during materialization"""
+
+    def __init__(self, rule: Rule) -> None:
+        self.rule = rule
+        self.firings = 0
+        self.derived = 0
+        self.elapsed = 0.0
+        self.last_round = 0
+        self.join_order: List[int] = []
+        self.strategy = HASH_JOIN
+
+
+def materialize(
+    rules: Sequence[Rule],
+    base: Dict[str, FactTable],
+    stats: Optional[List[RuleStats]] = None,
+) -> Dict[str, FactTable]:
+    """All facts derivable from base facts and rules, by predicate
+
+    Predicates that no rule derives are returned as the (unmodified) base
+    tables; derived predicates get fresh tables seeded with their base rows.
+    Rules are evaluated stratum by stratum (see stratify), so negated atoms
+    and aggregates only read predicates that are already complete. When
+    stats is a list, one RuleStats per rule is appended to it.
+    """
+    tables: Dict[str, FactTable] = dict(base)
+    for name in head_predicates(rules):
+        tables[name] = FactTable(base.get(name, ()))
+    rule_stats = [RuleStats(rule) for rule in rules]
+    if stats is not None:
+        stats.extend(rule_stats)
+    for rs in rule_stats:
+        rs.strategy = join_strategy(rs.rule.split_body()[0])
+    rounds = 0
+    for stratum in _strata(rules):
+        recursive = []
+        for i in stratum:
+            if rules[i].is_aggregate():
+                rounds += 1
+                _aggregate(rule_stats[i], tables, rounds)
+            else:
+                recursive.append(rule_stats[i])
+        if recursive:
+            rounds = _fixpoint(recursive, tables, rounds)
+    return tables
+
+
+def _fixpoint(
+    rule_stats: List[RuleStats], tables: Dict[str, FactTable], rounds: int
+) -> int:
+    """Apply rules by semi-naive evaluation until nothing new is derived
+
+    Returns the number of the last round, counting on from rounds.
+    """
+    empty = FactTable()
+    bodies = [rs.rule.split_body() for rs in rule_stats]
+
+    # The first round joins every rule against everything known; later
+    # rounds only look for derivations that use at least one new fact.
+    delta: Optional[Dict[str, FactTable]] = None
+    while delta is None or delta:
+        rounds += 1
+        new: Dict[str, FactTable] = {}
+        sizes = {name: len(table) for name, table in tables.items()}
+        for rs, (body, negative) in zip(rule_stats, bodies):
+            start = time.perf_counter()
+            rule = rs.rule
+            target = tables[rule.head.predicate]
+            fresh = new.setdefault(rule.head.predicate, FactTable())
+            if delta is None:
+                rs.join_order = plan_body(body, sizes)
+                variants = [(rs.join_order, -1)]
+            else:
+                variants = [
+                    (plan_body(body, sizes, first=i), i)
+                    for i, atom in enumerate(body)
+                    if atom.predicate in delta
+                ]
+            for order, i in variants:
+                sources = [tables.get(a.predicate, empty) for a in body]
+                if delta is not None:
+                    sources[i] = delta[body[i].predicate]
+                for binding in evaluate_body(body, order, sources, rs.strategy):
+                    if negative and _excluded(negative, binding, tables):
+                        continue
+                    rs.firings += 1
+                    row = substitute(rule.head, binding)
+                    if row not in target and fresh.add(row):
+                        rs.derived += 1
+                        rs.last_round = rounds
+            rs.elapsed += time.perf_counter() - start
+        delta = {name: rows for name, rows in new.items() if rows}
+        for name, rows in delta.items():
+            target = tables[name]
+            for row in rows:
+                target.add(row)
+    return rounds
+
+
+def _excluded(
+    negative: Sequence[Atom], binding: Dict[Var, Any], tables: Dict[str, FactTable]
+) -> bool:
+    """True if a fact matches one of the negated atoms under binding"""
+    for atom in negative:
+        table = tables.get(atom.predicate)
+        if table is not None:
+            pattern = [
+                binding.get(a, a) if isinstance(a, Var) else a for a in atom.args
+            ]
+            if table.match(pattern):
+                return True
+    return False
+
+
+def _aggregate(rs: RuleStats, tables: Dict[str, FactTable], rounds: int) -> None:
+    """Evaluate an aggregate rule by a streaming hash group-by over its body
+
+    Each distinct binding of the body variables is folded into the running
+    totals of its group as the join produces it, without collecting them.
+    """
+    start = time.perf_counter()
+    rule = rs.rule
+    body, negative = rule.split_body()
+    sizes = {name: len(table) for name, table in tables.items()}
+    rs.join_order = plan_body(body, sizes)
+    sources = [tables.get(a.predicate, FactTable()) for a in body]
+    keys = [arg for arg in rule.head.args if not isinstance(arg, Aggregate)]
+    aggregates = [arg for arg in rule.head.args if isinstance(arg, Aggregate)]
+    steps = [_AGGREGATES[agg.function][1] for agg in aggregates]
+    groups: Dict[Row, List[Any]] = {}
+    for binding in evaluate_body(body, rs.join_order, sources, rs.strategy):
+        if negative and _excluded(negative, binding, tables):
+            continue
+        rs.firings += 1
+        key = tuple(binding[a] if isinstance(a, Var) else a for a in keys)
+        totals = groups.get(key)
+        if totals is None:
+            totals = groups[key] = [_AGGREGATES[a.function][0] for a in aggregates]
+        for j, (agg, step) in enumerate(zip(aggregates, steps)):
+            totals[j] = step(totals[j], binding[agg.var])
+    target = tables[rule.head.predicate]
+    for key, totals in groups.items():
+        values = iter(key)
+        results = iter(totals)
+        row = tuple(
+            next(results) if isinstance(arg, Aggregate) else next(values)
+            for arg in rule.head.args
+        )
+        if target.add(row):
+            rs.derived += 1
+            rs.last_round = rounds
+    rs.elapsed += time.perf_counter() - start
+
+
+def stratify(rules: Sequence[Rule]) -> List[List[Rule]]:
+    """Rules grouped into strata, to be evaluated in order
+
+    Each stratum holds the rules for one set of mutually recursive
+    predicates and comes after the strata of every predicate they use.
+    Raises ValueError if a predicate depends on itself through negation
+    or an aggregate, which has no well-defined meaning.
+    """
+    return [[rules[i] for i in stratum] for stratum in _strata(rules)]
+
+
+def _strata(rules: Sequence[Rule]) -> List[List[int]]:
+    """Indexes of the rules in each stratum (see stratify)"""
+    derived = head_predicates(rules)
+    uses: Dict[str, Set[str]] = {name: set() for name in derived}
+    strict: Set[Tuple[str, str]] = set()
+    for rule in rules:
+        head = rule.head.predicate
+        for atom in rule.body:
+            if atom.predicate in derived:
+                uses[head].add(atom.predicate)
+                if atom.negated or rule.is_aggregate():
+                    strict.add((head, atom.predicate))
+
+    # Tarjan's algorithm lists each strongly connected component after the
+    # components it depends on, which is the evaluation order
+    component: Dict[str, int] = {}
+    order: List[List[str]] = []
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    stack: List[str] = []
+    on_stack: Set[str] = set()
+
+    def visit(name: str) -> None:
+        index[name] = low[name] = len(index)
+        stack.append(name)
+        on_stack.add(name)
+        for used in sorted(uses[name]):
+            if used not in index:
+                visit(used)
+                low[name] = min(low[name], low[used])
+            elif used in on_stack:
+                low[name] = min(low[name], index[used])
+        if low[name] == index[name]:
+            members: List[str] = []
+            while True:
+                member = stack.pop()
+                on_stack.discard(member)
+                component[member] = len(order)
+                members.append(member)
+                if member == name:
+                    break
+            order.append(members)
+
+    for name in sorted(derived):
+        if name not in index:
+            visit(name)
+    for head, used in sorted(strict):
+        if component[head] == component[used]:
+            kind = "negation or an aggregate"
+            raise ValueError(f"{head} depends on {used} through {kind} in a cycle")
+    strata: List[List[int]] = [[] for _ in order]
+    for i, rule in enumerate(rules):
+        strata[component[rule.head.predicate]].append(i)
+    return strata
+
+
+def head_predicates(rules: Iterable[Rule]) -> Set[str]:
+    """Names of the predicates derived by rules"""
+    return {rule.head.predicate for rule in rules}
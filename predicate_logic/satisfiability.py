@@ -0,0 +1,480 @@
+"""
+Satisfiability checking for compound predicates.
+
+A predicate built with logical_and, logical_or, logical_not,
+logical_implies, logical_iff, logical_xor and compose_predicates is
+abstracted into a propositional formula: every other predicate (is_even,
+greater_than(5), field("price", less_than(10)), ...) becomes a Boolean
+variable, with structurally equal atoms sharing one variable. The formula
+is converted to CNF by Tseitin encoding and handed to a small CDCL solver
+with two watched literals per clause, first-UIP clause learning,
+activity-based branching and restarts.
+
+Atoms are mostly treated as independent. The exception is comparisons of
+the same value against numeric constants (greater_than, less_than, equals,
+range_predicate), whose ranges are checked against each other, so that
+greater_than(5) & less_than(3) is found unsatisfiable. Answers that
+something never holds (is_satisfiable False, is_tautology True,
+are_equivalent True, implies True) are therefore always correct; the
+opposite answers may be caused by a relationship between atoms that the
+abstraction cannot see.
+"""
+
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from .columnar import Field
+from .expressions import structural_key
+from .logical_operators import (
+    Biconditional,
+    Conjunction,
+    Disjunction,
+    ExclusiveOr,
+    Implication,
+    Negation,
+)
+from .patterns import InRange
+from .predicates import AllOf, Equals, GreaterThan, LessThan
+
+# Type alias for a predicate function
+Predicate = Callable[[Any], bool]
+
+# A record field path: the names of the enclosing field() calls
+Scope = Tuple[str, ...]
+
+# An interval bound: (value, closed), with None for an infinite bound
+Bound = Optional[Tuple[Any, bool]]
+
+
+class SatSolver:
+    """CDCL SAT solver over clauses of non-zero integer literals
+
+    Variables are numbered from 1; literal v means variable v is true and
+    -v that it is false, as in DIMACS.
+    """
+
+    def __init__(self) -> None:
+        self.num_vars = 0
+        self.clauses: List[List[int]] = []
+        self.model: Dict[int, bool] = {}
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+        self._watches: Dict[int, List[int]] = {}
+        self._values: List[int] = [0]
+        self._levels: List[int] = [0]
+        self._reasons: List[Optional[int]] = [None]
+        self._activity: List[float] = [0.0]
+        self._phase: List[bool] = [False]
+        self._increment = 1.0
+        self._trail: List[int] = []
+        self._trail_lim: List[int] = []
+        self._qhead = 0
+        self._unsat = False
+
+    def new_var(self) -> int:
+        """Allocate a fresh variable"""
+        self.num_vars += 1
+        self._values.append(0)
+        self._levels.append(0)
+        self._reasons.append(None)
+        self._activity.append(0.0)
+        self._phase.append(False)
+        return self.num_vars
+
+    def _value(self, lit: int) -> int:
+        value = self._values[abs(lit)]
+        return value if lit > 0 else -value
+
+    def add_clause(self, lits: Iterable[int]) -> bool:
+        """Add a clause; False once the clauses are known to be unsatisfiable"""
+        self._backtrack(0)
+        clause: List[int] = []
+        for lit in lits:
+            while abs(lit) > self.num_vars:
+                self.new_var()
+            if -lit in clause:
+                return not self._unsat
+            if lit not in clause:
+                clause.append(lit)
+        if any(self._value(lit) == 1 for lit in clause):
+            return not self._unsat
+        clause = [lit for lit in clause if self._value(lit) == 0]
+        if not clause:
+            self._unsat = True
+        elif len(clause) == 1:
+            self._enqueue(clause[0], None)
+            if self._propagate() is not None:
+                self._unsat = True
+        else:
+            self._attach(clause)
+        return not self._unsat
+
+    def _attach(self, clause: List[int]) -> int:
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self._watches.setdefault(clause[0], []).append(index)
+        self._watches.setdefault(clause[1], []).append(index)
+        return index
+
+    def _enqueue(self, lit: int, reason: Optional[int]) -> None:
+        var = abs(lit)
+        self._values[var] = 1 if lit > 0 else -1
+        self._levels[var] = len(self._trail_lim)
+        self._reasons[var] = reason
+        self._trail.append(lit)
+
+    def _propagate(self) -> Optional[int]:
+        """Unit propagation; the index of a conflicting clause, if any"""
+        trail = self._trail
+        while self._qhead < len(trail):
+            false_lit = -trail[self._qhead]
+            self._qhead += 1
+            watchers = self._watches.get(false_lit)
+            if not watchers:
+                continue
+            kept: List[int] = []
+            for position, index in enumerate(watchers):
+                clause = self.clauses[index]
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self._value(clause[0]) == 1:
+                    kept.append(index)
+                    continue
+                for k in range(2, len(clause)):
+                    if self._value(clause[k]) != -1:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self._watches.setdefault(clause[1], []).append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if self._value(clause[0]) == -1:
+                        kept.extend(watchers[position + 1 :])
+                        self._watches[false_lit] = kept
+                        self._qhead = len(trail)
+                        return index
+                    self.propagations += 1
+                    self._enqueue(clause[0], index)
+            self._watches[false_lit] = kept
+        return None
+
+    def _analyze(self, conflict: int) -> Tuple[List[int], int]:
+        """First-UIP learnt clause and the level to jump back to"""
+        level = len(self._trail_lim)
+        learnt = [0]
+        seen = set()
+        pending = 0
+        lit = 0
+        position = len(self._trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for other in clause:
+                var = abs(other)
+                if other == lit or var in seen or self._levels[var] == 0:
+                    continue
+                seen.add(var)
+                self._bump(var)
+                if self._levels[var] == level:
+                    pending += 1
+                else:
+                    learnt.append(other)
+            while abs(self._trail[position]) not in seen:
+                position -= 1
+            lit = self._trail[position]
+            position -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            reason = self._reasons[abs(lit)]
+            assert reason is not None
+            clause = self.clauses[reason]
+        learnt[0] = -lit
+        if len(learnt) == 1:
+            return learnt, 0
+        # Watch the literal that becomes false last when jumping back
+        top = max(range(1, len(learnt)), key=lambda i: self._levels[abs(learnt[i])])
+        learnt[1], learnt[top] = learnt[top], learnt[1]
+        return learnt, self._levels[abs(learnt[1])]
+
+    def _bump(self, var: int) -> None:
+        self._activity[var] += self._increment
+        if self._activity[var] > 1e100:
+            self._activity = [a * 1e-100 for a in self._activity]
+            self._increment *= 1e-100
+
+    def _backtrack(self, level: int) -> None:
+        if len(self._trail_lim) <= level:
+            return
+        stop = self._trail_lim[level]
+        for lit in self._trail[stop:]:
+            var = abs(lit)
+            self._phase[var] = lit > 0
+            self._values[var] = 0
+            self._reasons[var] = None
+        del self._trail[stop:]
+        del self._trail_lim[level:]
+        self._qhead = len(self._trail)
+
+    def _pick(self) -> int:
+        """The unassigned variable with the highest activity, or 0"""
+        best = 0
+        best_activity = -1.0
+        values = self._values
+        activity = self._activity
+        for var in range(1, self.num_vars + 1):
+            if values[var] == 0 and activity[var] > best_activity:
+                best, best_activity = var, activity[var]
+        return best
+
+    def solve(self) -> bool:
+        """True if the clauses are satisfiable; the assignment is in model"""
+        self.model = {}
+        if self._unsat:
+            return False
+        restart_after = 100
+        since_restart = 0
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                since_restart += 1
+                if not self._trail_lim:
+                    self._unsat = True
+                    return False
+                learnt, level = self._analyze(conflict)
+                self._backtrack(level)
+                if len(learnt) == 1:
+                    self._enqueue(learnt[0], None)
+                else:
+                    self._enqueue(learnt[0], self._attach(learnt))
+                self._increment /= 0.95
+                continue
+            if since_restart >= restart_after:
+                self._backtrack(0)
+                since_restart = 0
+                restart_after = restart_after * 3 // 2
+                continue
+            var = self._pick()
+            if not var:
+                self.model = {
+                    v: self._values[v] == 1 for v in range(1, self.num_vars + 1)
+                }
+                self._backtrack(0)
+                return True
+            self.decisions += 1
+            self._trail_lim.append(len(self._trail))
+            self._enqueue(var if self._phase[var] else -var, None)
+
+
+class PropositionalAbstraction:
+    """Tseitin encoding of predicates into a SatSolver, sharing atoms
+
+    literal() returns a solver literal equivalent to the given predicate;
+    structurally equal sub-predicates, and equal atoms, are encoded once.
+    """
+
+    def __init__(self) -> None:
+        self.solver = SatSolver()
+        self.atoms: Dict[int, Predicate] = {}
+        self._literals: Dict[Hashable, int] = {}
+        self._ranges: Dict[Scope, List[Tuple[int, Bound, Bound]]] = {}
+        self._true: Optional[int] = None
+
+    def literal(self, predicate: Predicate, scope: Scope = ()) -> int:
+        """Solver literal that is true exactly when predicate holds"""
+        if isinstance(predicate, Field):
+            name, inner = predicate.args
+            return self.literal(inner, scope + (name,))
+        if isinstance(predicate, Negation):
+            return -self.literal(predicate.args[0], scope)
+        key = (scope, structural_key(predicate))
+        lit = self._literals.get(key)
+        if lit is None:
+            lit = self._literals[key] = self._encode(predicate, scope)
+        return lit
+
+    def _encode(self, predicate: Predicate, scope: Scope) -> int:
+        add = self.solver.add_clause
+        if isinstance(predicate, (Conjunction, AllOf, Disjunction)):
+            children = [self.literal(child, scope) for child in predicate.args]
+            if not children:
+                return self.true() if isinstance(predicate, AllOf) else -self.true()
+            gate = self.solver.new_var()
+            sign = 1 if isinstance(predicate, Disjunction) else -1
+            # gate <-> AND(children) is -gate <-> OR(-children)
+            for child in children:
+                add([sign * gate, -sign * child])
+            add([-sign * gate] + [sign * child for child in children])
+            return gate
+        if isinstance(predicate, Implication):
+            first, second = predicate.args
+            return self._encode(Disjunction(Negation(first), second), scope)
+        if isinstance(predicate, (Biconditional, ExclusiveOr)):
+            a, b = (self.literal(child, scope) for child in predicate.args)
+            gate = self.solver.new_var()
+            if isinstance(predicate, ExclusiveOr):
+                gate = -gate
+            # gate <-> (a <-> b)
+            add([-gate, -a, b])
+            add([-gate, a, -b])
+            add([gate, a, b])
+            add([gate, -a, -b])
+            return abs(gate)
+        var = self.solver.new_var()
+        self.atoms[var] = _in_scope(predicate, scope)
+        self._relate_range(var, predicate, scope)
+        return var
+
+    def true(self) -> int:
+        """A literal that is always true"""
+        if self._true is None:
+            self._true = self.solver.new_var()
+            self.solver.add_clause([self._true])
+        return self._true
+
+    def _relate_range(self, var: int, predicate: Predicate, scope: Scope) -> None:
+        """Add clauses linking a numeric comparison to earlier ones on scope"""
+        interval = _interval(predicate)
+        if interval is None:
+            return
+        low, high = interval
+        known = self._ranges.setdefault(scope, [])
+        for other, other_low, other_high in known:
+            if _empty(_max_low(low, other_low), _min_high(high, other_high)):
+                self.solver.add_clause([-var, -other])
+            if _contains(other_low, other_high, low, high):
+                self.solver.add_clause([-var, other])
+            if _contains(low, high, other_low, other_high):
+                self.solver.add_clause([-other, var])
+        known.append((var, low, high))
+
+    def model(self) -> Dict[Predicate, bool]:
+        """Truth value of every atom in the solver's last model"""
+        return {atom: self.solver.model.get(v, False) for v, atom in self.atoms.items()}
+
+
+def _in_scope(predicate: Predicate, scope: Scope) -> Predicate:
+    for name in reversed(scope):
+        predicate = Field(name, predicate)
+    return predicate
+
+
+# Numeric ranges --------------------------------------------------------
+
+
+def _number(value: Any) -> bool:
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and value == value
+    )
+
+
+def _interval(predicate: Predicate) -> Optional[Tuple[Bound, Bound]]:
+    """The set of numbers satisfying a comparison, as (low, high) bounds"""
+    if isinstance(predicate, (GreaterThan, LessThan, Equals)):
+        value = predicate.args[0]
+        if not _number(value):
+            return None
+        if isinstance(predicate, GreaterThan):
+            return (value, False), None
+        if isinstance(predicate, LessThan):
+            return None, (value, False)
+        return (value, True), (value, True)
+    if isinstance(predicate, InRange):
+        low, high = predicate.args
+        if _number(low) and _number(high):
+            return (low, True), (high, True)
+    return None
+
+
+def _max_low(a: Bound, b: Bound) -> Bound:
+    if a is None or b is None:
+        return a if b is None else b
+    if a[0] != b[0]:
+        return a if a[0] > b[0] else b
+    return (a[0], a[1] and b[1])
+
+
+def _min_high(a: Bound, b: Bound) -> Bound:
+    if a is None or b is None:
+        return a if b is None else b
+    if a[0] != b[0]:
+        return a if a[0] < b[0] else b
+    return (a[0], a[1] and b[1])
+
+
+def _empty(low: Bound, high: Bound) -> bool:
+    if low is None or high is None:
+        return False
+    return low[0] > high[0] or (low[0] == high[0] and not (low[1] and high[1]))
+
+
+def _contains(low: Bound, high: Bound, inner_low: Bound, inner_high: Bound) -> bool:
+    """True if [inner_low, inner_high] lies within [low, high]"""
+    return _max_low(low, inner_low) == inner_low and _min_high(
+        high, inner_high
+    ) == inner_high
+
+
+# Queries ---------------------------------------------------------------
+
+
+def find_model(predicate: Predicate) -> Optional[Dict[Predicate, bool]]:
+    """Truth values of the atoms of predicate that make it true, or None
+
+    Atoms inside field() are reported wrapped in the same field() calls.
+    """
+    abstraction = PropositionalAbstraction()
+    abstraction.solver.add_clause([abstraction.literal(predicate)])
+    if not abstraction.solver.solve():
+        return None
+    return abstraction.model()
+
+
+def is_satisfiable(predicate: Predicate) -> bool:
+    """False if no input can make predicate true"""
+    return find_model(predicate) is not None
+
+
+def is_tautology(predicate: Predicate) -> bool:
+    """True if predicate holds for every input"""
+    abstraction = PropositionalAbstraction()
+    abstraction.solver.add_clause([-abstraction.literal(predicate)])
+    return not abstraction.solver.solve()
+
+
+def implies(first: Predicate, second: Predicate) -> bool:
+    """True if every input satisfying first also satisfies second"""
+    abstraction = PropositionalAbstraction()
+    abstraction.solver.add_clause([abstraction.literal(first)])
+    abstraction.solver.add_clause([-abstraction.literal(second)])
+    return not abstraction.solver.solve()
+
+
+def are_equivalent(first: Predicate, second: Predicate) -> bool:
+    """True if both predicates hold for exactly the same inputs"""
+    return is_tautology(Biconditional(first, second))
+
+
+def dedupe_equivalent(predicates: Sequence[Predicate]) -> List[Predicate]:
+    """The predicates without those equivalent to an earlier one, or dead
+
+    Unsatisfiable predicates are dropped as well, since they never match.
+    """
+    kept: List[Predicate] = []
+    for predicate in predicates:
+        if not is_satisfiable(predicate):
+            continue
+        if not any(are_equivalent(predicate, other) for other in kept):
+            kept.append(predicate)
+    return kept
@@ -0,0 +1,338 @@
+"""
+Wire formats for predicate expressions.
+
+Expressions built from the library's combinators can be pickled directly.
+This module adds portable encodings that do not execute arbitrary code
+when loaded: a compact JSON form, a smaller binary form, and the Python
+call syntax that repr() produces (parse_expression). Plain functions used as
+leaves (such as is_even) must be registered by name, and types are limited
+to builtins. structural_hash() gives a stable digest of the binary form, so
+identical filters built in different processes can be deduplicated.
+"""
+
+import ast
+import builtins
+import hashlib
+import json
+import struct
+import sys
+from typing import Any, Callable, Dict, List, Tuple
+
+from . import columnar, logical_operators, patterns, predicates, relations  # noqa: F401
+from .expressions import Expression
+
+# Registered leaf functions, keyed by "module:qualname"
+_FUNCTIONS: Dict[str, Callable[..., Any]] = {}
+_FUNCTION_NAMES: Dict[Callable[..., Any], str] = {}
+
+# Builtin types that may appear as arguments, e.g. type_predicate(int)
+_TYPES: Dict[str, type] = {
+    name: obj
+    for name, obj in vars(builtins).items()
+    if isinstance(obj, type) and not issubclass(obj, BaseException)
+}
+_TYPES["NoneType"] = type(None)
+
+_MAGIC = b"PL\x01"
+
+
+def register_function(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Allow a module-level function to appear in serialized expressions"""
+    name = f"{func.__module__}:{func.__qualname__}"
+    _FUNCTIONS[name] = func
+    _FUNCTION_NAMES[func] = name
+    return func
+
+
+for _func in (
+    predicates.is_even,
+    predicates.is_positive,
+    relations.loves,
+    relations.parent_of,
+    relations.grandparent_of,
+):
+    register_function(_func)
+
+
+def _function_name(func: Callable[..., Any]) -> str:
+    try:
+        return _FUNCTION_NAMES[func]
+    except (KeyError, TypeError):
+        raise TypeError(
+            f"cannot serialize {func!r}; build it from the library's combinators "
+            "or register it with register_function()"
+        ) from None
+
+
+def _lookup_function(name: str) -> Callable[..., Any]:
+    try:
+        return _FUNCTIONS[name]
+    except KeyError:
+        raise ValueError(f"unknown function {name!r} in serialized expression")
+
+
+def _lookup_type(name: str) -> type:
+    try:
+        return _TYPES[name]
+    except KeyError:
+        raise ValueError(f"unknown type {name!r} in serialized expression")
+
+
+def _lookup_op(op: str) -> type:
+    try:
+        return Expression.registry[op]
+    except KeyError:
+        raise ValueError(f"unknown operator {op!r} in serialized expression")
+
+
+def registered_functions() -> Dict[str, Callable[..., Any]]:
+    """Registered leaf functions keyed by their short name, such as is_even"""
+    return {func.__name__: func for func in _FUNCTIONS.values()}
+
+
+# JSON form -----------------------------------------------------------------
+
+
+def to_data(obj: Any) -> Any:
+    """Convert an expression (or argument) to JSON-compatible data"""
+    if isinstance(obj, Expression):
+        return {"op": obj.op, "args": [to_data(arg) for arg in obj.args]}
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if isinstance(obj, list):
+        return [to_data(item) for item in obj]
+    if isinstance(obj, tuple):
+        return {"tuple": [to_data(item) for item in obj]}
+    if isinstance(obj, type):
+        if _TYPES.get(obj.__name__) is not obj:
+            raise TypeError(f"cannot serialize non-builtin type {obj!r}")
+        return {"type": obj.__name__}
+    if callable(obj):
+        return {"fn": _function_name(obj)}
+    raise TypeError(f"cannot serialize argument {obj!r}")
+
+
+def from_data(data: Any) -> Any:
+    """Rebuild an expression (or argument) from to_data() output"""
+    if isinstance(data, list):
+        return [from_data(item) for item in data]
+    if not isinstance(data, dict):
+        return data
+    if "op" in data:
+        return _lookup_op(data["op"])(*[from_data(arg) for arg in data["args"]])
+    if "tuple" in data:
+        return tuple(from_data(item) for item in data["tuple"])
+    if "type" in data:
+        return _lookup_type(data["type"])
+    if "fn" in data:
+        return _lookup_function(data["fn"])
+    raise ValueError(f"malformed serialized expression: {data!r}")
+
+
+def to_json(predicate: Callable[..., Any]) -> str:
+    """Encode an expression as compact JSON"""
+    return json.dumps(to_data(predicate), separators=(",", ":"))
+
+
+def from_json(text: str) -> Any:
+    """Decode an expression from to_json() output"""
+    return from_data(json.loads(text))
+
+
+# Source form ---------------------------------------------------------------
+
+
+def parse_expression(source: str) -> Any:
+    """Build an expression from combinator call syntax, as repr() prints it
+
+    Only combinator calls, registered functions, builtin type names and
+    literals are accepted, e.g.
+    ``logical_and(field("price", greater_than(10)), type_predicate(int))``.
+    """
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"invalid predicate expression: {e.msg}") from None
+    return _build(tree.body, registered_functions())
+
+
+def _build(node: ast.AST, functions: Dict[str, Callable[..., Any]]) -> Any:
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.keywords:
+            raise ValueError("only positional calls to combinators are allowed")
+        cls = _lookup_op(node.func.id)
+        # Call the public combinator so arity errors read naturally
+        combinator = getattr(sys.modules[cls.__module__], cls.op)
+        args = [_build(arg, functions) for arg in node.args]
+        try:
+            return combinator(*args)
+        except TypeError as e:
+            raise ValueError(str(e)) from None
+    if isinstance(node, ast.Name):
+        if node.id in functions:
+            return functions[node.id]
+        if node.id in _TYPES:
+            return _TYPES[node.id]
+        raise ValueError(f"unknown name {node.id!r} in predicate expression")
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        operand = _build(node.operand, functions)
+        if isinstance(operand, (int, float)) and not isinstance(operand, bool):
+            return -operand if isinstance(node.op, ast.USub) else operand
+    if isinstance(node, (ast.Tuple, ast.List)):
+        items = [_build(item, functions) for item in node.elts]
+        return tuple(items) if isinstance(node, ast.Tuple) else items
+    raise ValueError(f"unsupported {type(node).__name__} in predicate expression")
+
+
+# Binary form ---------------------------------------------------------------
+
+
+def _write_varint(out: bytearray, n: int) -> None:
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _write_str(out: bytearray, text: str) -> None:
+    raw = text.encode("utf-8")
+    _write_varint(out, len(raw))
+    out += raw
+
+
+def _encode(out: bytearray, obj: Any) -> None:
+    if isinstance(obj, Expression):
+        out += b"E"
+        _write_str(out, obj.op)
+        _write_varint(out, len(obj.args))
+        for arg in obj.args:
+            _encode(out, arg)
+    elif obj is None:
+        out += b"N"
+    elif obj is True:
+        out += b"T"
+    elif obj is False:
+        out += b"F"
+    elif isinstance(obj, int):
+        out += b"i"
+        # Zigzag so small negative numbers stay small
+        _write_varint(out, (obj << 1) if obj >= 0 else ((-obj) << 1) - 1)
+    elif isinstance(obj, float):
+        out += b"f" + struct.pack("<d", obj)
+    elif isinstance(obj, str):
+        out += b"s"
+        _write_str(out, obj)
+    elif isinstance(obj, (list, tuple)):
+        out += b"l" if isinstance(obj, list) else b"t"
+        _write_varint(out, len(obj))
+        for item in obj:
+            _encode(out, item)
+    elif isinstance(obj, type):
+        if _TYPES.get(obj.__name__) is not obj:
+            raise TypeError(f"cannot serialize non-builtin type {obj!r}")
+        out += b"y"
+        _write_str(out, obj.__name__)
+    elif callable(obj):
+        out += b"r"
+        _write_str(out, _function_name(obj))
+    else:
+        raise TypeError(f"cannot serialize argument {obj!r}")
+
+
+class _Reader:
+    """Cursor over an encoded expression"""
+
+    def __init__(self, data: bytes) -> None:
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def take(self, n: int) -> bytes:
+        if self.pos + n > len(self.data):
+            raise ValueError("truncated serialized expression")
+        chunk = bytes(self.data[self.pos : self.pos + n])
+        self.pos += n
+        return chunk
+
+    def varint(self) -> int:
+        shift = result = 0
+        while True:
+            byte = self.take(1)[0]
+            result |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return result
+            shift += 7
+
+    def string(self) -> str:
+        return self.take(self.varint()).decode("utf-8")
+
+
+def _decode(reader: _Reader) -> Any:
+    tag = reader.take(1)
+    if tag == b"E":
+        op = reader.string()
+        args = [_decode(reader) for _ in range(reader.varint())]
+        return _lookup_op(op)(*args)
+    if tag == b"N":
+        return None
+    if tag == b"T":
+        return True
+    if tag == b"F":
+        return False
+    if tag == b"i":
+        n = reader.varint()
+        return (n >> 1) if not n & 1 else -((n + 1) >> 1)
+    if tag == b"f":
+        return struct.unpack("<d", reader.take(8))[0]
+    if tag == b"s":
+        return reader.string()
+    if tag in (b"l", b"t"):
+        items: List[Any] = [_decode(reader) for _ in range(reader.varint())]
+        return items if tag == b"l" else tuple(items)
+    if tag == b"y":
+        return _lookup_type(reader.string())
+    if tag == b"r":
+        return _lookup_function(reader.string())
+    raise ValueError(f"unknown tag {tag!r} in serialized expression")
+
+
+def to_bytes(predicate: Callable[..., Any]) -> bytes:
+    """Encode an expression in the compact binary wire format"""
+    out = bytearray(_MAGIC)
+    _encode(out, predicate)
+    return bytes(out)
+
+
+def from_bytes(data: bytes) -> Any:
+    """Decode an expression from to_bytes() output"""
+    if data[: len(_MAGIC)] != _MAGIC:
+        raise ValueError("not a serialized predicate expression")
+    reader = _Reader(data)
+    reader.pos = len(_MAGIC)
+    result = _decode(reader)
+    if reader.pos != len(data):
+        raise ValueError("trailing data after serialized expression")
+    return result
+
+
+def structural_hash(predicate: Callable[..., Any]) -> str:
+    """Stable hex digest identifying an expression's structure"""
+    return hashlib.sha256(to_bytes(predicate)).hexdigest()
+
+
+def dedupe(predicates: List[Callable[..., Any]]) -> Dict[str, Callable[..., Any]]:
+    """Map structural hash to one representative per distinct expression"""
+    unique: Dict[str, Callable[..., Any]] = {}
+    for predicate in predicates:
+        unique.setdefault(structural_hash(predicate), predicate)
+    return unique
+
+
+def wire_size(predicate: Callable[..., Any]) -> Tuple[int, int]:
+    """Byte sizes of the (JSON, binary) encodings, for choosing a format"""
+    return len(to_json(predicate).encode("utf-8")), len(to_bytes(predicate))
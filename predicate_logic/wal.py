@@ -0,0 +1,318 @@
+"""
+Write-ahead log and snapshots for crash-safe persistence.
+
+A WriteAheadLog appends records, tuples of JSON values such as
+("fact", "parent", ["john", "mary"]), to a log file in a directory. Each
+record is written as one line holding a CRC32 checksum, its sequence
+number and the record, so recovery can tell a line torn by a crash from a
+complete one and drops the incomplete tail.
+
+Appends are grouped: records are buffered, then written and fsynced
+together once batch_size of them are pending, so a single fsync covers
+many records (group commit). A timer thread writes out a smaller batch
+batch_interval seconds after its oldest record was appended, even if
+nothing else is appended, and the pending records are written when the
+log is closed, garbage collected or the interpreter exits. sync() forces
+them out at once; a crash (a killed process, a power loss) loses at most
+the records appended in the last batch_interval seconds.
+
+compact() folds the log into a snapshot: the records that rebuild the
+current state are written to a temporary file, fsynced and renamed over
+the previous snapshot, and the log is emptied. The snapshot stores the
+sequence number of the last record it covers, so recovery reads the
+snapshot and replays only the log records after it, even when a crash
+interrupted compaction before the log was emptied.
+"""
+
+import json
+import os
+import threading
+import time
+import weakref
+import zlib
+from typing import IO, Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+# An operation to persist: its name followed by JSON-compatible arguments
+Record = Tuple[Any, ...]
+
+LOG_FILE = "wal.log"
+SNAPSHOT_FILE = "snapshot"
+
+# Snapshot lines written at a time
+_WRITE_CHUNK = 4096
+
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+_decode = json.JSONDecoder().decode
+
+
+def _frame(data: List[Any]) -> bytes:
+    """One checksummed line: 8 hex digits of CRC32, then the JSON payload"""
+    payload = _encode(data).encode()
+    return b"%08x%s\n" % (zlib.crc32(payload), payload)
+
+
+def _unframe(line: bytes) -> Optional[List[Any]]:
+    """The data of a complete, intact line, or None"""
+    if not line.endswith(b"\n") or len(line) < 10:
+        return None
+    payload = line[8:-1]
+    try:
+        if int(line[:8], 16) != zlib.crc32(payload):
+            return None
+        data = _decode(payload.decode())
+    except ValueError:
+        return None
+    return data if isinstance(data, list) else None
+
+
+def _write_out(file: IO[bytes], buffer: List[bytes], fsync: bool) -> None:
+    """Write the buffered lines to file and clear the buffer"""
+    file.write(b"".join(buffer))
+    file.flush()
+    if fsync:
+        os.fsync(file.fileno())
+    buffer.clear()
+
+
+def _close(lock: Any, file: IO[bytes], buffer: List[bytes], fsync: bool) -> None:
+    """Last resort when a log is collected or the interpreter exits unclosed"""
+    with lock:
+        if not file.closed:
+            if buffer:
+                _write_out(file, buffer, fsync)
+            file.close()
+
+
+def _sync_directory(path: str) -> None:
+    """Make a rename in directory path durable, where the platform allows"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        # Directories cannot be opened on Windows; renames are durable there
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog:
+    """An append-only record log with group commit, snapshots and recovery"""
+
+    def __init__(
+        self,
+        directory: str,
+        batch_size: int = 256,
+        batch_interval: float = 0.01,
+        fsync: bool = True,
+        compact_after: Optional[int] = 100_000,
+        snapshot: Optional[Callable[[], Iterable[Record]]] = None,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+        self.directory = directory
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        #: False to only hand records to the OS: safe if the process dies,
+        #: but not if the machine does
+        self.fsync = fsync
+        #: Records in the log that trigger compaction (None to disable)
+        self.compact_after = compact_after
+        #: Returns the records rebuilding the current state, for compaction
+        self.snapshot = snapshot
+        #: Sequence numbers of the last record appended, written and
+        #: covered by the snapshot
+        self.lsn = 0
+        self.synced_lsn = 0
+        self.snapshot_lsn = 0
+        #: Records in the log after the snapshot
+        self.log_records = 0
+        self.syncs = 0
+        self.compactions = 0
+        self._buffer: List[bytes] = []
+        self._oldest = 0.0
+        self._tail: List[Record] = []
+        # Taken by appends and by the timer thread writing out late batches
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+        os.makedirs(directory, exist_ok=True)
+        self._log_path = os.path.join(directory, LOG_FILE)
+        self._snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self._read_snapshot_header()
+        self._read_log()
+        self._file = open(self._log_path, "ab")
+        # Runs at interpreter exit too; it must not refer to self
+        self._finalizer = weakref.finalize(
+            self, _close, self._lock, self._file, self._buffer, fsync
+        )
+
+    @property
+    def pending(self) -> int:
+        """Records appended but not yet written to the log"""
+        return len(self._buffer)
+
+    def recover(self) -> Iterator[Record]:
+        """The records of the snapshot, then those logged after it
+
+        Replaying them in order rebuilds the state as of the last record
+        that reached the log intact.
+        """
+        if os.path.exists(self._snapshot_path):
+            with open(self._snapshot_path, "rb") as snapshot:
+                next(snapshot)
+                for line in snapshot:
+                    data = _unframe(line)
+                    if data is None:
+                        raise ValueError(f"corrupt snapshot {self._snapshot_path}")
+                    yield tuple(data)
+        tail, self._tail = self._tail, []
+        yield from tail
+
+    def append(self, record: Record) -> int:
+        """Log a record and return its sequence number
+
+        Raises TypeError, before anything is logged, if the record is not
+        JSON-compatible, and ValueError if the log is closed.
+        """
+        with self._lock:
+            if self._file.closed:
+                raise ValueError("append to a closed log")
+            line = _frame([self.lsn + 1, *record])
+            self.lsn += 1
+            self.log_records += 1
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append(line)
+            if (
+                len(self._buffer) >= self.batch_size
+                or time.monotonic() - self._oldest >= self.batch_interval
+            ):
+                self._flush()
+            elif self._timer is None:
+                self._schedule(self.batch_interval)
+            if (
+                self.compact_after is not None
+                and self.snapshot is not None
+                and self.log_records >= self.compact_after
+            ):
+                self.compact()
+            return self.lsn
+
+    def sync(self) -> None:
+        """Write the pending records to the log and wait until they are durable"""
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        _write_out(self._file, self._buffer, self.fsync)
+        self.synced_lsn = self.lsn
+        self.syncs += 1
+
+    def _schedule(self, delay: float) -> None:
+        timer = threading.Timer(delay, self._expire)
+        timer.daemon = True
+        self._timer = timer
+        timer.start()
+
+    def _expire(self) -> None:
+        """Write out a batch whose oldest record has waited batch_interval"""
+        with self._lock:
+            self._timer = None
+            if self._file.closed or not self._buffer:
+                return
+            wait = self._oldest + self.batch_interval - time.monotonic()
+            if wait > 0:
+                # The batch this timer was set for went out, a newer one began
+                self._schedule(wait)
+            else:
+                self._flush()
+
+    def compact(self, records: Optional[Iterable[Record]] = None) -> None:
+        """Fold the log into a new snapshot holding records
+
+        records default to those returned by the snapshot callback.
+        """
+        with self._lock:
+            self._compact(records)
+
+    def _compact(self, records: Optional[Iterable[Record]]) -> None:
+        if records is None:
+            if self.snapshot is None:
+                raise ValueError("compact() needs records or a snapshot callback")
+            records = self.snapshot()
+        self._flush()
+        temporary = self._snapshot_path + ".tmp"
+        with open(temporary, "wb") as out:
+            out.write(_frame(["snapshot", self.lsn]))
+            chunk: List[bytes] = []
+            for record in records:
+                chunk.append(_frame(list(record)))
+                if len(chunk) >= _WRITE_CHUNK:
+                    out.write(b"".join(chunk))
+                    chunk.clear()
+            out.write(b"".join(chunk))
+            out.flush()
+            if self.fsync:
+                os.fsync(out.fileno())
+        os.replace(temporary, self._snapshot_path)
+        _sync_directory(self.directory)
+        # The snapshot now covers every logged record, so recovery would
+        # skip them even if the log were not emptied
+        self._file.truncate(0)
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.snapshot_lsn = self.lsn
+        self.log_records = 0
+        self.compactions += 1
+
+    def close(self) -> None:
+        """Write pending records and close the log"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._file.closed:
+                self._flush()
+                self._file.close()
+            self._finalizer.detach()
+
+    def __enter__(self) -> "WriteAheadLog":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _read_snapshot_header(self) -> None:
+        if not os.path.exists(self._snapshot_path):
+            return
+        with open(self._snapshot_path, "rb") as snapshot:
+            header = _unframe(snapshot.readline())
+        if header is None or header[0] != "snapshot":
+            raise ValueError(f"corrupt snapshot {self._snapshot_path}")
+        self.snapshot_lsn = self.lsn = self.synced_lsn = header[1]
+
+    def _read_log(self) -> None:
+        """Keep the records after the snapshot; cut off a torn tail"""
+        if not os.path.exists(self._log_path):
+            return
+        end = 0
+        with open(self._log_path, "rb") as log:
+            for line in log:
+                data = _unframe(line)
+                if data is None:
+                    break
+                end += len(line)
+                lsn = data[0]
+                if lsn > self.snapshot_lsn:
+                    self._tail.append(tuple(data[1:]))
+                    self.lsn = self.synced_lsn = lsn
+            torn = log.seek(0, os.SEEK_END) > end
+        if torn:
+            with open(self._log_path, "r+b") as log:
+                log.truncate(end)
+                os.fsync(log.fileno())
+        self.log_records = len(self._tail)
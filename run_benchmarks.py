@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark runner for the predicate logic library.
+
+Runs the cases in benchmarks/cases.py over their parametrized sizes, writes
+the timings as JSON and compares them against a stored baseline. Any case
+slower than the baseline by more than the tolerance fails the run.
+
+Usage:
+    python run_benchmarks.py                  # quick sizes, compare to baseline
+    python run_benchmarks.py --full           # sizes up to 10^7
+    python run_benchmarks.py --save-baseline  # store results as the new baseline
+    python run_benchmarks.py -k knowledge_base --output results.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add the project root to the path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.cases import CASES, BenchmarkCase, Workload  # noqa: E402
+
+DEFAULT_BASELINE = project_root / "benchmarks" / "baseline.json"
+DEFAULT_OUTPUT = project_root / "benchmarks" / "latest.json"
+
+
+def time_workload(
+    workload: Workload, repeat: int, min_time: float
+) -> Dict[str, Any]:
+    """Time a workload, batching fast calls so each round lasts min_time"""
+    start = time.perf_counter()
+    workload()
+    single = time.perf_counter() - start
+
+    number = max(1, int(min_time / single)) if single > 0 else 1000
+    rounds: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            workload()
+        rounds.append((time.perf_counter() - start) / number)
+
+    return {
+        "min": min(rounds),
+        "median": statistics.median(rounds),
+        "max": max(rounds),
+        "rounds": repeat,
+        "iterations": number,
+    }
+
+
+def run_case(
+    case: BenchmarkCase, full: bool, repeat: int, min_time: float
+) -> Dict[str, Dict[str, Any]]:
+    """Run one case over all of its sizes"""
+    results = {}
+    for size in case.full_sizes if full else case.quick_sizes:
+        key = f"{case.name}[{size}]"
+        workload = case.setup(size)
+        stats = time_workload(workload, repeat, min_time)
+        stats["size"] = size
+        results[key] = stats
+        print(f"{key:<45} min {stats['min'] * 1e3:>12.4f} ms")
+    return results
+
+
+def compare(
+    current: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+) -> List[str]:
+    """Return a description of every result slower than its baseline"""
+    regressions = []
+    for key, stats in current.items():
+        if key not in baseline:
+            continue
+        old = baseline[key]["min"]
+        new = stats["min"]
+        if old > 0 and new > old * (1 + tolerance):
+            regressions.append(
+                f"{key}: {old * 1e3:.4f} ms -> {new * 1e3:.4f} ms "
+                f"(+{(new / old - 1) * 100:.1f}%)"
+            )
+    return regressions
+
+
+def load_results(path: Path) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Load the results section of a benchmark JSON file, if it exists"""
+    if not path.exists():
+        return None
+    with path.open() as f:
+        results: Dict[str, Dict[str, Any]] = json.load(f)["results"]
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmarks and compare them against the baseline"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--full", action="store_true", help="run the large sizes")
+    parser.add_argument("-k", dest="pattern", help="only run cases containing this")
+    parser.add_argument("--repeat", type=int, default=5, help="timing rounds")
+    parser.add_argument(
+        "--min-time", type=float, default=0.05, help="seconds per timing round"
+    )
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed slowdown relative to the baseline (0.25 = 25%%)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="write the results to the baseline file instead of comparing",
+    )
+    args = parser.parse_args(argv)
+
+    cases = [c for c in CASES if not args.pattern or args.pattern in c.name]
+    if not cases:
+        print(f"No benchmark cases match {args.pattern!r}")
+        return 1
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for case in cases:
+        results.update(run_case(case, args.full, args.repeat, args.min_time))
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+    target = args.baseline if args.save_baseline else args.output
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with target.open("w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"\nResults written to {target}")
+
+    if args.save_baseline:
+        return 0
+
+    baseline = load_results(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline first")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nPERFORMANCE REGRESSIONS (tolerance {args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+
+    print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Unit tests for approximate quantifiers.
+"""
+
+import unittest
+
+from predicate_logic.approximate import (
+    approx_count_where,
+    approx_exists,
+    approx_forall,
+)
+from predicate_logic.indexing import IndexedDomain
+from predicate_logic.logical_operators import logical_and
+from predicate_logic.predicates import greater_than, is_even
+
+
+def multiple_of(n):
+    return lambda x: x % n == 0
+
+
+class TestApproxCountWhere(unittest.TestCase):
+    def test_small_domains_are_counted_exactly(self):
+        estimate = approx_count_where(is_even, list(range(1000)), error=0.02)
+        self.assertTrue(estimate.exact)
+        self.assertEqual(estimate.count, 500)
+        self.assertEqual(estimate.count_interval, (500, 500))
+        self.assertEqual(estimate.samples, 1000)
+
+    def test_interval_covers_true_fraction(self):
+        domain = range(10**9)
+        misses = 0
+        for seed in range(40):
+            estimate = approx_count_where(multiple_of(3), domain, 0.02, seed=seed)
+            self.assertFalse(estimate.exact)
+            self.assertLessEqual(estimate.high - estimate.low, 0.04)
+            self.assertLess(estimate.samples, 10_000)
+            misses += not estimate.low <= 1 / 3 <= estimate.high
+        self.assertLessEqual(misses, 4)
+
+    def test_skewed_fractions_stop_early(self):
+        rare = approx_count_where(multiple_of(1000), range(10**9), seed=1)
+        common = approx_count_where(multiple_of(2), range(10**9), seed=1)
+        self.assertLess(rare.samples, common.samples)
+        self.assertLessEqual(rare.low, 0.001)
+        self.assertEqual(rare.population, 10**9)
+
+    def test_seed_is_reproducible(self):
+        first = approx_count_where(multiple_of(7), range(10**8), seed=5)
+        second = approx_count_where(multiple_of(7), range(10**8), seed=5)
+        self.assertEqual(first, second)
+
+    def test_iterables_use_a_reservoir(self):
+        estimate = approx_count_where(
+            multiple_of(4), (x for x in range(200_000)), error=0.02, seed=3
+        )
+        self.assertEqual(estimate.population, 200_000)
+        self.assertLessEqual(estimate.low, 0.25)
+        self.assertGreaterEqual(estimate.high, 0.25)
+        small = approx_count_where(is_even, iter(range(10)))
+        self.assertTrue(small.exact)
+        self.assertEqual(small.count, 5)
+
+    def test_indexed_domain(self):
+        domain = IndexedDomain(range(10**6))
+        estimate = approx_count_where(greater_than(750_000), domain)
+        self.assertTrue(estimate.exact)
+        self.assertEqual(estimate.samples, 0)
+        self.assertEqual(estimate.count, 249_999)
+        # Only the candidates left by the index are sampled
+        estimate = approx_count_where(
+            logical_and(greater_than(900_000), is_even), domain, seed=2
+        )
+        self.assertFalse(estimate.exact)
+        self.assertLess(estimate.samples, 1000)
+        self.assertLessEqual(estimate.low, 0.05)
+        self.assertGreaterEqual(estimate.high, 0.05)
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            approx_count_where(is_even, range(10), error=0)
+        with self.assertRaises(ValueError):
+            approx_forall(is_even, range(10), confidence=1)
+
+
+class TestApproxQuantifiers(unittest.TestCase):
+    def test_forall(self):
+        self.assertTrue(approx_forall(greater_than(-1), range(10**9), seed=0))
+        self.assertFalse(approx_forall(multiple_of(2), range(10**9), seed=0))
+        # A counterexample is always found in a domain smaller than the sample
+        self.assertFalse(approx_forall(lambda x: x != 99, range(100)))
+
+    def test_forall_false_accept_rate(self):
+        accepted = sum(
+            approx_forall(lambda x: x % 50 != 0, range(10**9), 0.02, seed=seed)
+            for seed in range(100)
+        )
+        self.assertLessEqual(accepted, 10)
+
+    def test_exists_stops_at_first_witness(self):
+        calls = []
+
+        def witness(x):
+            calls.append(x)
+            return True
+
+        self.assertTrue(approx_exists(witness, range(10**9), seed=0))
+        self.assertEqual(len(calls), 1)
+        self.assertFalse(approx_exists(greater_than(10**9), range(10**9), seed=0))
+        self.assertTrue(approx_exists(lambda x: x == 99, iter(range(100))))
+
+    def test_indexed_domain(self):
+        domain = IndexedDomain(range(10**6))
+        self.assertTrue(approx_forall(greater_than(-1), domain))
+        self.assertFalse(approx_forall(greater_than(0), domain))
+        self.assertFalse(approx_exists(greater_than(10**6), domain))
+        # Few candidates are scanned in full, like find_first
+        pred = logical_and(greater_than(999_990), multiple_of(7))
+        self.assertTrue(approx_exists(pred, domain))
+
+
+if __name__ == "__main__":
+    unittest.main()
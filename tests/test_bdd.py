@@ -0,0 +1,141 @@
+"""
+Unit tests for binary decision diagrams.
+"""
+
+import itertools
+import random
+import unittest
+
+from predicate_logic.bdd import BDDManager, from_bdd, to_bdd
+from predicate_logic.columnar import field
+from predicate_logic.logical_operators import (
+    logical_and,
+    logical_iff,
+    logical_not,
+    logical_or,
+    logical_xor,
+)
+from predicate_logic.predicates import (
+    compose_predicates,
+    greater_than,
+    is_even,
+    is_positive,
+)
+from predicate_logic.satisfiability import are_equivalent
+
+
+def flag(name):
+    def atom(record):
+        return record[name]
+
+    atom.__name__ = name
+    return atom
+
+
+FLAGS = [flag(name) for name in "abcde"]
+BINARY = [logical_and, logical_or, logical_iff, logical_xor]
+
+
+def random_predicate(rng, depth):
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice(FLAGS)
+    choice = rng.randrange(len(BINARY) + 2)
+    if choice == len(BINARY):
+        return logical_not(random_predicate(rng, depth - 1))
+    if choice > len(BINARY):
+        count = rng.randint(0, 3)
+        return compose_predicates(
+            *(random_predicate(rng, depth - 1) for _ in range(count))
+        )
+    op = BINARY[choice]
+    return op(random_predicate(rng, depth - 1), random_predicate(rng, depth - 1))
+
+
+def records():
+    for bits in itertools.product([False, True], repeat=len(FLAGS)):
+        yield dict(zip("abcde", bits))
+
+
+class TestBDD(unittest.TestCase):
+    def test_matches_predicates(self):
+        rng = random.Random(3)
+        manager = BDDManager()
+        for _ in range(200):
+            predicate = random_predicate(rng, rng.randint(1, 6))
+            bdd = to_bdd(predicate, manager)
+            back = from_bdd(bdd)
+            for record in records():
+                self.assertEqual(bdd(record), predicate(record))
+                self.assertEqual(back(record), predicate(record))
+
+    def test_equivalence_is_node_identity(self):
+        rng = random.Random(4)
+        manager = BDDManager()
+        for _ in range(200):
+            first = random_predicate(rng, rng.randint(1, 4))
+            second = random_predicate(rng, rng.randint(1, 4))
+            self.assertEqual(
+                to_bdd(first, manager).equivalent(to_bdd(second, manager)),
+                are_equivalent(first, second),
+            )
+
+    def test_canonical_form(self):
+        manager = BDDManager()
+        a, b, c = FLAGS[:3]
+        chained = to_bdd(logical_xor(a, logical_xor(b, c)), manager)
+        reordered = to_bdd(logical_xor(logical_xor(c, a), b), manager)
+        self.assertEqual(chained, reordered)
+        self.assertEqual(chained.size(), 2 * 3 - 1 + 2)
+        self.assertTrue(to_bdd(logical_or(a, logical_not(a)), manager).is_tautology())
+        self.assertFalse(
+            to_bdd(logical_and(a, logical_not(a)), manager).is_satisfiable()
+        )
+
+    def test_each_atom_tested_once(self):
+        calls = []
+
+        def counting(name):
+            def atom(record):
+                calls.append(name)
+                return record[name]
+
+            atom.__name__ = name
+            return atom
+
+        a, b, c = (counting(name) for name in "abc")
+        predicate = logical_iff(logical_xor(a, b), logical_iff(b, logical_xor(a, c)))
+        bdd = to_bdd(predicate)
+        for record in records():
+            expected = predicate(record)
+            calls.clear()
+            self.assertEqual(bdd(record), expected)
+            self.assertEqual(len(calls), len(set(calls)))
+
+    def test_computed_table(self):
+        manager = BDDManager()
+        predicate = logical_and(
+            logical_xor(is_even, is_positive), logical_xor(is_positive, is_even)
+        )
+        to_bdd(predicate, manager)
+        lookups = manager.cache_lookups
+        to_bdd(predicate, manager)
+        self.assertGreater(manager.cache_hits, 0)
+        self.assertGreater(manager.cache_lookups, lookups)
+
+    def test_fields(self):
+        manager = BDDManager()
+        nested = to_bdd(field("n", logical_and(greater_than(3), is_even)), manager)
+        flat = to_bdd(
+            logical_and(field("n", is_even), field("n", greater_than(3))), manager
+        )
+        self.assertTrue(nested.equivalent(flat))
+        self.assertTrue(nested({"n": 4}))
+        self.assertFalse(nested({"n": 2}))
+
+    def test_different_managers(self):
+        with self.assertRaises(ValueError):
+            to_bdd(is_even).equivalent(to_bdd(is_even))
+
+
+if __name__ == "__main__":
+    unittest.main()
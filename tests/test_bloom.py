@@ -0,0 +1,49 @@
+"""
+Unit tests for Bloom filters.
+"""
+
+import unittest
+
+from predicate_logic.bloom import BloomFilter
+from predicate_logic.knowledge_base import FilterStats
+
+
+class TestBloomFilter(unittest.TestCase):
+    def test_no_false_negatives(self):
+        items = [("n%d" % i, i) for i in range(5000)]
+        bloom = BloomFilter(5000, 0.01, items)
+        self.assertTrue(all(item in bloom for item in items))
+        self.assertEqual(len(bloom), 5000)
+        self.assertFalse(bloom.full)
+
+    def test_false_positive_rate(self):
+        for error_rate in (0.1, 0.01, 0.001):
+            with self.subTest(error_rate=error_rate):
+                bloom = BloomFilter(10_000, error_rate, range(10_000))
+                misses = range(10_000, 110_000)
+                rate = sum(1 for i in misses if i in bloom) / len(misses)
+                self.assertLess(rate, 2 * error_rate)
+                self.assertAlmostEqual(
+                    bloom.expected_false_positive_rate, error_rate, delta=error_rate
+                )
+
+    def test_sizing(self):
+        bloom = BloomFilter(1000, 0.01)
+        self.assertEqual(bloom.hashes, 7)
+        self.assertAlmostEqual(bloom.size / 1000, 9.6, delta=0.1)
+        self.assertNotIn("anything", bloom)
+        for i in range(1001):
+            bloom.add(i)
+        self.assertTrue(bloom.full)
+        with self.assertRaises(ValueError):
+            BloomFilter(10, 1.5)
+
+    def test_stats(self):
+        stats = FilterStats()
+        self.assertEqual(stats.false_positive_rate, 0.0)
+        stats.rejected, stats.false_positives = 99, 1
+        self.assertAlmostEqual(stats.false_positive_rate, 0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
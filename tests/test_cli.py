@@ -0,0 +1,116 @@
+"""
+Unit tests for the command-line filter tool.
+"""
+
+import io
+import os
+import tempfile
+import unittest
+
+from predicate_logic.cli import batches, main
+
+RECORDS = b"""{"price": 5, "name": "ab"}
+{"price": 150, "name": "abc"}
+
+{"price": 300, "name": "xyz"}
+{"price": 99.5, "name": "abcd"}
+"""
+
+
+def run_cli(*argv, stdin=b""):
+    out = io.BytesIO()
+    status = main(list(argv), stdin=io.BytesIO(stdin), stdout=out)
+    return status, out.getvalue()
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".ndjson")
+        with os.fdopen(handle, "wb") as f:
+            f.write(RECORDS)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_filter_file(self):
+        status, out = run_cli("filter", 'field("price", greater_than(100))', self.path)
+        self.assertEqual(status, 0)
+        self.assertEqual(
+            out, b'{"price": 150, "name": "abc"}\n{"price": 300, "name": "xyz"}\n'
+        )
+
+    def test_count_stdin(self):
+        expr = 'logical_and(field("price", less_than(200)), field("name", '
+        expr += "logical_not(length_predicate(2))))"
+        status, out = run_cli("count", expr, stdin=RECORDS)
+        self.assertEqual((status, out), (0, b"2\n"))
+
+    def test_exists(self):
+        self.assertEqual(
+            run_cli("exists", 'field("name", equals("xyz"))', self.path),
+            (0, b"true\n"),
+        )
+        self.assertEqual(
+            run_cli("exists", 'field("name", equals("nope"))', self.path),
+            (1, b"false\n"),
+        )
+
+    def test_number_and_text_formats(self):
+        numbers = b"".join(b"%d\n" % i for i in range(1, 101))
+        self.assertEqual(
+            run_cli(
+                "count",
+                "logical_and(is_even, range_predicate(10, 20))",
+                "--format",
+                "number",
+                "--batch-size",
+                "7",
+                stdin=numbers,
+            ),
+            (0, b"6\n"),
+        )
+        status, out = run_cli(
+            "filter", "length_predicate(3)", "--format", "text", stdin=b"ab\nabc\nxyz"
+        )
+        self.assertEqual(out, b"abc\nxyz\n")
+
+    def test_options_between_expression_and_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"ab\nabc\n")
+        status, out = run_cli(
+            "exists", "length_predicate(3)", "--format", "text", self.path, "-j", "1"
+        )
+        self.assertEqual((status, out), (0, b"true\n"))
+
+    def test_parallel_matches_serial(self):
+        expr = 'field("price", greater_than(50))'
+        serial = run_cli("filter", expr, self.path)
+        parallel = run_cli("filter", expr, self.path, "-j", "2", "--batch-size", "1")
+        self.assertEqual(parallel, serial)
+
+    def test_invalid_records(self):
+        data = b'{"price": 5}\nnot json\n{"price": 500}\n'
+        status, _ = run_cli("count", 'field("price", greater_than(1))', stdin=data)
+        self.assertEqual(status, 2)
+        self.assertEqual(
+            run_cli(
+                "count",
+                'field("price", greater_than(1))',
+                "--skip-invalid",
+                stdin=data,
+            ),
+            (0, b"2\n"),
+        )
+
+    def test_bad_expression(self):
+        with self.assertRaises(SystemExit):
+            run_cli("count", "__import__('os')")
+
+    def test_batches(self):
+        self.assertEqual(
+            list(batches([b"1", b"2", b"3"], 2)), [[b"1", b"2"], [b"3"]]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
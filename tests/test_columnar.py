@@ -0,0 +1,183 @@
+"""
+Unit tests for columnar table filtering.
+"""
+
+import unittest
+from array import array
+from unittest import mock
+
+from predicate_logic import columnar
+from predicate_logic.columnar import field, filter_table
+from predicate_logic.logical_operators import (
+    logical_and,
+    logical_iff,
+    logical_implies,
+    logical_not,
+    logical_or,
+    logical_xor,
+)
+from predicate_logic.patterns import length_predicate, range_predicate, type_predicate
+from predicate_logic.predicates import (
+    compose_predicates,
+    equals,
+    greater_than,
+    is_even,
+    less_than,
+)
+from predicate_logic.quantifiers import find_all
+from predicate_logic.serialization import from_json, to_json
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestFilterTable(unittest.TestCase):
+    def setUp(self):
+        self.table = {
+            "price": array("d", [5.0, 120.0, 99.5, 300.0, 150.0, 0.5]),
+            "qty": array("q", [1, 4, 7, 2, 0, 9]),
+            "name": ["ab", "abc", "xyz", "a", "abcd", "abc"],
+        }
+        self.rows = [
+            dict(zip(self.table, values)) for values in zip(*self.table.values())
+        ]
+        self.predicates = [
+            field("price", greater_than(100)),
+            logical_and(field("price", greater_than(10)), field("qty", less_than(5))),
+            logical_or(field("name", length_predicate(3)), field("qty", equals(0))),
+            logical_not(field("price", range_predicate(1, 150))),
+            field("price", logical_implies(greater_than(100), less_than(200))),
+            logical_xor(field("qty", is_even), field("name", equals("abc"))),
+            logical_iff(field("qty", is_even), field("price", greater_than(100))),
+            compose_predicates(
+                field("qty", type_predicate(int)),
+                field("name", type_predicate(str)),
+                field("price", greater_than(0)),
+            ),
+            field("price", type_predicate(str)),
+        ]
+
+    def test_matches_row_wise_evaluation(self):
+        for pred in self.predicates:
+            expected = [i for i, row in enumerate(self.rows) if pred(row)]
+            self.assertEqual(list(filter_table(pred, self.table)), expected, pred)
+
+    def test_field_is_a_row_predicate(self):
+        pred = field("price", greater_than(100))
+        self.assertEqual(len(find_all(pred, self.rows)), 3)
+        self.assertEqual(from_json(to_json(pred)), pred)
+
+    def test_index_array_type(self):
+        result = filter_table(field("qty", greater_than(3)), self.table)
+        self.assertEqual(list(result), [1, 2, 5])
+        if numpy is None:
+            self.assertIsInstance(result, array)
+
+    def test_view(self):
+        view = filter_table(field("qty", greater_than(3)), self.table, view=True)
+        self.assertEqual(len(view), 3)
+        self.assertEqual(list(view.column("name")), ["abc", "xyz", "abc"])
+        self.assertEqual(view[0], {"price": 120.0, "qty": 4, "name": "abc"})
+        self.assertEqual([row["qty"] for row in view], [4, 7, 9])
+
+    def test_memoryview_and_bytes_columns(self):
+        table = {"a": memoryview(array("i", [3, -1, 4])), "b": b"\x00\x01\x02"}
+        pred = logical_and(field("a", greater_than(0)), field("b", greater_than(0)))
+        self.assertEqual(list(filter_table(pred, table)), [2])
+
+    def test_errors(self):
+        with self.assertRaises(TypeError):
+            filter_table(greater_than(1), self.table)
+        with self.assertRaises(ValueError):
+            filter_table(field("a", is_even), {"a": [1, 2], "b": [1]})
+        with self.assertRaises(ValueError):
+            filter_table(field("a", is_even), {})
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestFilterTableNumpy(unittest.TestCase):
+    def setUp(self):
+        self.table = {
+            "x": numpy.arange(10, dtype=numpy.int64),
+            "y": numpy.linspace(0.0, 1.0, 10),
+            "s": numpy.array(["a", "bb", "cc", "d", "ee", "f", "gg", "h", "ii", "j"]),
+        }
+
+    def test_masks(self):
+        pred = logical_and(
+            field("x", range_predicate(2, 8)),
+            logical_or(field("s", length_predicate(2)), field("y", greater_than(0.7))),
+        )
+        result = filter_table(pred, self.table)
+        self.assertEqual(result.dtype.kind, "i")
+        self.assertEqual(list(result), [2, 4, 6, 7, 8])
+
+    def test_vectorized_plain_function(self):
+        result = filter_table(field("x", is_even), self.table)
+        self.assertEqual(list(result), [0, 2, 4, 6, 8])
+
+    def test_plain_functions_run_row_wise(self):
+        table = {"w": numpy.array(["aba", "xy", "cdc"])}
+        palindrome = field("w", lambda s: s == s[::-1])
+        self.assertEqual(list(filter_table(palindrome, table)), [0, 2])
+        starts = field("w", lambda s: s.startswith("a"))
+        self.assertEqual(list(filter_table(starts, table)), [0])
+
+    def test_registered_function(self):
+        calls = []
+
+        def small(x):
+            calls.append(x)
+            return x < 3
+
+        columnar.register_vectorized(small)
+        self.addCleanup(columnar._VECTORIZED.discard, small)
+        self.assertEqual(list(filter_table(field("x", small), self.table)), [0, 1, 2])
+        self.assertEqual(len(calls), 1)
+
+    def test_contiguous_view_is_zero_copy(self):
+        view = filter_table(field("x", range_predicate(3, 5)), self.table, view=True)
+        column = view.column("x")
+        self.assertTrue(numpy.shares_memory(column, self.table["x"]))
+
+    def test_buffer_columns(self):
+        table = {
+            "b": b"\x00\x01\x02",
+            "q": array("q", [5, -5, 6]),
+            "u": array("u", "abc"),
+        }
+        pred = logical_and(field("b", greater_than(0)), field("q", greater_than(0)))
+        self.assertEqual(list(filter_table(pred, table)), [2])
+        self.assertEqual(list(filter_table(field("u", equals("b")), table)), [1])
+
+    def test_type_predicate_matches_row_wise(self):
+        rows = [{name: col[i] for name, col in self.table.items()} for i in range(10)]
+        for name in self.table:
+            for expected_type in (int, float, str, numpy.integer):
+                pred = field(name, type_predicate(expected_type))
+                expected = [i for i, row in enumerate(rows) if pred(row)]
+                self.assertEqual(list(filter_table(pred, self.table)), expected, pred)
+
+    def test_type_predicate_on_other_columns(self):
+        table = {
+            "q": array("q", [1, 2]),
+            "d": array("d", [1.0, 2.0]),
+            "mixed": numpy.array([1, "a"], dtype=object),
+            "list": [1.5, 2],
+        }
+        expected = {"q": [0, 1], "d": [], "mixed": [0], "list": [1]}
+        for name, rows in expected.items():
+            pred = field(name, type_predicate(int))
+            self.assertEqual(list(filter_table(pred, table)), rows, name)
+
+    def test_matches_fallback(self):
+        pred = logical_not(field("x", less_than(5)))
+        with mock.patch.object(columnar, "_load_numpy", return_value=None):
+            fallback = list(filter_table(pred, self.table))
+        self.assertEqual(list(filter_table(pred, self.table)), fallback)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,204 @@
+"""
+Unit tests for the formula and rule text syntax.
+"""
+
+import unittest
+
+from predicate_logic.formulas import (
+    Connective,
+    Not,
+    Quantified,
+    Truth,
+    evaluate_formula,
+    formula_predicate,
+    parse_formula,
+    parse_program,
+    parse_rule,
+)
+from predicate_logic.indexing import IndexedDomain
+from predicate_logic.knowledge_base import PredicateLogic
+from predicate_logic.logical_operators import Conjunction, Implication
+from predicate_logic.predicates import greater_than, is_even, is_positive
+from predicate_logic.rules import Aggregate, Atom, Rule, Var
+
+x = Var("x")
+
+
+class TestParseFormula(unittest.TestCase):
+    def test_quantified_implication(self):
+        formula = parse_formula("forall x in D: even(x) -> positive(x)")
+        self.assertEqual(
+            formula,
+            Quantified(
+                "forall",
+                "x",
+                "D",
+                Connective(
+                    "logical_implies",
+                    Atom("even", (x,)),
+                    Atom("positive", (x,)),
+                ),
+            ),
+        )
+
+    def test_precedence(self):
+        formula = parse_formula("a(1) | ~b(1) & c(1) -> d(1) -> e(1)")
+        self.assertEqual(formula.op, "logical_implies")
+        self.assertEqual(formula.left.op, "logical_or")
+        self.assertEqual(formula.left.right.op, "logical_and")
+        self.assertIsInstance(formula.left.right.left, Not)
+        self.assertEqual(formula.right.op, "logical_implies")
+
+    def test_unicode_spellings(self):
+        self.assertEqual(
+            parse_formula("∀x in D: ¬even(x) ∨ positive(x)"),
+            parse_formula("forall x in D: not even(x) or positive(x)"),
+        )
+        self.assertEqual(parse_formula("∃!x in D: true").quantifier, "exists!")
+        self.assertEqual(parse_formula("exists! x in D: true").quantifier, "exists!")
+
+    def test_terms(self):
+        atom = parse_formula('loves(x, "Bob", bob, -2.5)', ("x",))
+        self.assertEqual(atom, Atom("loves", (x, "Bob", "bob", -2.5)))
+        self.assertEqual(parse_formula("false"), Truth(False))
+
+    def test_errors(self):
+        for source in [
+            "forall x in D even(x)",
+            "even(X)",
+            "even(x) &",
+            "even(1) even(2)",
+            "even($)",
+        ]:
+            with self.subTest(source=source):
+                with self.assertRaises(ValueError):
+                    parse_formula(source)
+
+    def test_cached(self):
+        source = "exists y in D: even(y) & positive(y)"
+        self.assertIs(parse_formula(source), parse_formula(source))
+
+    def test_cache_holds_large_rule_bases(self):
+        rules = [f"r{i}(X) :- p{i}(X), q(X)." for i in range(2000)]
+        program = "\n".join(rules)
+        rule_hits = parse_rule.cache_info().hits
+        program_hits = parse_program.cache_info().hits
+        for _ in range(3):
+            for rule in rules:
+                parse_rule(rule)
+            parse_program(program)
+        self.assertEqual(parse_rule.cache_info().hits - rule_hits, 4000)
+        self.assertEqual(parse_program.cache_info().hits - program_hits, 2)
+
+
+class TestEvaluateFormula(unittest.TestCase):
+    def setUp(self):
+        self.env = {
+            "D": [2, 4, 6],
+            "E": range(-3, 4),
+            "even": is_even,
+            "positive": is_positive,
+            "lt": lambda a, b: a < b,
+        }
+
+    def check(self, source, expected):
+        with self.subTest(source=source):
+            self.assertIs(evaluate_formula(source, self.env), expected)
+
+    def test_evaluate(self):
+        self.check("forall x in D: even(x) -> positive(x)", True)
+        self.check("forall x in E: even(x) -> positive(x)", False)
+        self.check("exists! x in E: even(x) & positive(x)", True)
+        self.check("even(4) <-> ~positive(-4)", True)
+
+    def test_nested_quantifiers(self):
+        self.check("forall x in E: exists y in E: lt(x, y)", False)
+        self.check("exists y in E: forall x in D: lt(y, x)", True)
+        # An inner quantifier may shadow an outer variable
+        self.assertTrue(
+            evaluate_formula(
+                "forall x in D: (exists x in E: lt(x, 0)) & positive(x)", self.env
+            )
+        )
+
+    def test_compiles_to_combinators(self):
+        pred = formula_predicate("even(x) & positive(x)", "x", self.env)
+        self.assertIsInstance(pred, Conjunction)
+        self.assertEqual(pred.args, (is_even, is_positive))
+        pred = formula_predicate("even(x) -> lt(x, 3)", "x", self.env)
+        self.assertIsInstance(pred, Implication)
+        self.assertEqual([v for v in range(6) if pred(v)], [0, 1, 2, 3, 5])
+
+    def test_indexed_domain(self):
+        domain = IndexedDomain(range(100))
+        env = {"D": domain, "big": greater_than(90)}
+        self.assertFalse(evaluate_formula("forall v in D: big(v)", env))
+        self.assertEqual(domain.stats[None].index_hits, 1)
+
+    def test_unknown_names(self):
+        with self.assertRaises(ValueError):
+            evaluate_formula("forall x in Nowhere: even(x)", self.env)
+        with self.assertRaises(ValueError):
+            evaluate_formula("forall x in D: odd(x)", self.env)
+
+    def test_knowledge_base_predicates(self):
+        kb = PredicateLogic()
+        kb.load("human(socrates). human(plato).")
+        env = {"people": ["socrates", "plato"]}
+        self.assertTrue(evaluate_formula("forall p in people: human(p)", env, kb))
+
+
+class TestParseRules(unittest.TestCase):
+    def test_rule(self):
+        rule = parse_rule("grandparent(X, Z) :- parent(X, Y), parent(Y, Z)")
+        X, Y, Z = Var("X"), Var("Y"), Var("Z")
+        self.assertEqual(
+            rule,
+            Rule(
+                Atom("grandparent", (X, Z)),
+                (Atom("parent", (X, Y)), Atom("parent", (Y, Z))),
+            ),
+        )
+
+    def test_anonymous_variables_are_distinct(self):
+        rule = parse_rule("linked(X) :- edge(X, _), edge(_, X).")
+        self.assertNotEqual(rule.body[0].args[1], rule.body[1].args[0])
+
+    def test_negation_and_aggregates(self):
+        rule = parse_rule("childless(X) :- person(X), not parent(X, _).")
+        self.assertTrue(rule.body[1].negated)
+        self.assertEqual(parse_rule(str(rule)), rule)
+        rule = parse_rule("children(X, count(Y)) :- parent(X, Y), ~adopted(Y).")
+        self.assertEqual(rule.head.args[1], Aggregate("count", Var("Y")))
+        self.assertTrue(rule.body[1].negated)
+        self.assertEqual(parse_rule(str(rule)), rule)
+
+    def test_program(self):
+        clauses = parse_program(
+            """
+            % family
+            parent(john, "Mary Ann").
+            parent("Mary Ann", sue).  # inline comment
+            ancestor(X, Y) :- parent(X, Y).
+            """
+        )
+        self.assertEqual(clauses[0], Atom("parent", ("john", "Mary Ann")))
+        self.assertIsInstance(clauses[2], Rule)
+
+    def test_errors(self):
+        for source in [
+            "ancestor(X, Y) :- parent(X, Z).",
+            "parent(X, mary).",
+            "ancestor(X, Y) :- parent(X, Y)",
+            "parent(john, mary)",
+            "p(count(X)) :- q(count(X)).",
+            "p(count(_)) :- q(X).",
+            "p(X) :- not q(X).",
+        ]:
+            with self.subTest(source=source):
+                with self.assertRaises(ValueError):
+                    parse_program(source)
+
+
+if __name__ == "__main__":
+    unittest.main()
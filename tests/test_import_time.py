@@ -0,0 +1,126 @@
+"""
+Import-time regression tests for the predicate_logic package.
+
+Importing the package must not import its submodules or optional backends;
+those load on first attribute access. The measured ``python -X importtime``
+cost is also held under a budget, which can be raised on slow machines with
+the PREDICATE_LOGIC_IMPORT_BUDGET_MS environment variable.
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+IMPORT_BUDGET_MS = float(os.environ.get("PREDICATE_LOGIC_IMPORT_BUDGET_MS", "25"))
+
+
+def run_python(code, *options):
+    """Run code in a fresh interpreter and return (stdout, stderr)"""
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT))
+    result = subprocess.run(
+        [sys.executable, *options, "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    return result.stdout, result.stderr
+
+
+def loaded_after(code):
+    """Names of predicate_logic submodules and backends loaded by code"""
+    stdout, _ = run_python(
+        code
+        + "\nimport sys\n"
+        + "print(' '.join(sorted(m for m in sys.modules"
+        + " if m.startswith('predicate_logic')"
+        + " or m in ('numpy', 'json', 'zlib', 'threading'))))"
+    )
+    return set(stdout.split())
+
+
+def import_time_ms(code, setup=""):
+    """Cumulative -X importtime cost of code, from the predicate_logic import on
+
+    Modules imported by setup are loaded beforehand and not counted.
+    """
+    _, stderr = run_python(f"{setup}\n{code}", "-X", "importtime")
+    total = None
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2]
+        if name.strip() == "predicate_logic":
+            total = 0
+        # Top-level entries only: nested ones are part of their cumulative
+        if total is not None and not name.startswith("  ", 1):
+            total += int(parts[1])
+    if total is None:
+        raise AssertionError("predicate_logic missing from -X importtime output")
+    return total / 1000
+
+
+class TestLazyImport(unittest.TestCase):
+    def test_package_import_loads_nothing_else(self):
+        self.assertEqual(loaded_after("import predicate_logic"), {"predicate_logic"})
+
+    def test_name_loads_only_its_submodule(self):
+        loaded = loaded_after("from predicate_logic import greater_than")
+        expected = {
+            "predicate_logic",
+            "predicate_logic.expressions",
+            "predicate_logic.predicates",
+        }
+        self.assertEqual(loaded, expected)
+
+    def test_optional_backends_stay_unloaded(self):
+        loaded = loaded_after(
+            "from predicate_logic import field, filter_table, find_all, forall"
+        )
+        self.assertNotIn("numpy", loaded)
+        self.assertNotIn("predicate_logic.serialization", loaded)
+        self.assertNotIn("json", loaded)
+
+    def test_knowledge_base_defers_persistence(self):
+        loaded = loaded_after("from predicate_logic import PredicateLogic")
+        for module in ("json", "zlib", "threading", "predicate_logic.wal"):
+            self.assertNotIn(module, loaded)
+        self.assertNotIn("predicate_logic.serialization", loaded)
+        self.assertNotIn("predicate_logic.formulas", loaded)
+
+    def test_all_names_resolve(self):
+        import predicate_logic
+
+        for name in predicate_logic.__all__:
+            self.assertTrue(callable(getattr(predicate_logic, name)), name)
+        self.assertIn("forall", dir(predicate_logic))
+        with self.assertRaises(AttributeError):
+            predicate_logic.no_such_name
+
+    def test_import_time_budget(self):
+        cumulative_ms = import_time_ms("import predicate_logic")
+        self.assertLess(
+            cumulative_ms,
+            IMPORT_BUDGET_MS,
+            f"import predicate_logic took {cumulative_ms:.1f}ms",
+        )
+
+    def test_knowledge_base_import_time_budget(self):
+        # Every submodule needs typing, which the package import avoids;
+        # the budget covers what the knowledge base loads beyond it
+        cumulative_ms = import_time_ms(
+            "from predicate_logic import PredicateLogic", setup="import typing"
+        )
+        self.assertLess(
+            cumulative_ms,
+            IMPORT_BUDGET_MS,
+            f"from predicate_logic import PredicateLogic took {cumulative_ms:.1f}ms",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
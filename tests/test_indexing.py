@@ -0,0 +1,131 @@
+"""
+Unit tests for indexed domains.
+"""
+
+import unittest
+
+from predicate_logic.columnar import field
+from predicate_logic.indexing import IndexedDomain
+from predicate_logic.logical_operators import logical_and, logical_not, logical_or
+from predicate_logic.patterns import range_predicate
+from predicate_logic.predicates import (
+    compose_predicates,
+    equals,
+    greater_than,
+    is_even,
+    less_than,
+)
+from predicate_logic.quantifiers import (
+    count_where,
+    exists,
+    exists_unique,
+    find_all,
+    find_first,
+    forall,
+)
+
+
+class TestIndexedDomain(unittest.TestCase):
+    def setUp(self):
+        self.values = [7, 3, 9, 3, -1, 12, 5, 0, 3, 8]
+        self.domain = IndexedDomain(self.values)
+        self.predicates = [
+            greater_than(4),
+            less_than(3),
+            range_predicate(3, 8),
+            equals(3),
+            equals(100),
+            logical_and(greater_than(2), is_even),
+            compose_predicates(greater_than(0), less_than(9), is_even),
+            logical_or(less_than(0), greater_than(8)),
+            logical_or(equals(3), is_even),
+            logical_not(equals(3)),
+        ]
+
+    def test_quantifiers_agree_with_list(self):
+        for pred in self.predicates:
+            for quantifier in (
+                forall,
+                exists,
+                exists_unique,
+                count_where,
+                find_all,
+                find_first,
+            ):
+                self.assertEqual(
+                    quantifier(pred, self.domain),
+                    quantifier(pred, self.values),
+                    (quantifier.__name__, pred),
+                )
+
+    def test_results_keep_domain_order(self):
+        self.assertEqual(find_all(greater_than(4), self.domain), [7, 9, 12, 5, 8])
+        self.assertEqual(find_first(less_than(4), self.domain), 3)
+
+    def test_index_is_used(self):
+        find_all(greater_than(4), self.domain)
+        find_all(equals(3), self.domain)
+        stats = self.domain.stats[None]
+        self.assertEqual(stats.index_hits, 2)
+        self.assertEqual(stats.scans, 0)
+        self.assertIn("indexed (sorted, hash)", self.domain.advice()[None])
+
+    def test_candidates(self):
+        positions, exact = self.domain.candidates(equals(3))
+        self.assertEqual((sorted(positions), exact), ([1, 3, 8], True))
+        positions, exact = self.domain.candidates(logical_and(greater_than(2), is_even))
+        self.assertFalse(exact)
+        self.assertEqual(sorted(positions), [0, 1, 2, 3, 5, 6, 8, 9])
+        self.assertIsNone(self.domain.candidates(is_even))
+
+    def test_mutation_invalidates(self):
+        self.assertEqual(count_where(greater_than(10), self.domain), 1)
+        self.domain.append(20)
+        self.assertEqual(count_where(greater_than(10), self.domain), 2)
+        self.domain[0] = 30
+        self.assertEqual(find_all(greater_than(10), self.domain), [30, 12, 20])
+        del self.domain[0]
+        self.domain.extend([11, 1])
+        self.assertEqual(find_all(greater_than(10), self.domain), [12, 20, 11])
+        self.domain.remove(12)
+        self.assertEqual(find_all(greater_than(10), self.domain), [20, 11])
+
+    def test_build_after(self):
+        domain = IndexedDomain(self.values, build_after=2)
+        find_all(greater_than(4), domain)
+        self.assertIn("index after 2 lookups", domain.advice()[None])
+        find_all(greater_than(4), domain)
+        self.assertIn("indexed (sorted)", domain.advice()[None])
+
+    def test_records_by_field(self):
+        records = IndexedDomain(
+            [{"name": n, "age": a} for n, a in [("a", 30), ("b", 17), ("c", 45)]]
+        )
+        adults = find_all(field("age", greater_than(17)), records)
+        self.assertEqual([r["name"] for r in adults], ["a", "c"])
+        pred = field("age", logical_and(greater_than(20), less_than(40)))
+        self.assertEqual(count_where(pred, records), 1)
+        self.assertEqual(records.stats["age"].index_hits, 3)
+
+    def test_unindexable_keys_fall_back(self):
+        domain = IndexedDomain([3, "a", 1.5, None])
+        self.assertEqual(find_all(equals("a"), domain), ["a"])
+        self.assertEqual(find_all(greater_than(2), IndexedDomain([3, 1, 5])), [3, 5])
+        mixed = IndexedDomain([3, "a"])
+        with self.assertRaises(TypeError):
+            find_all(greater_than(2), mixed)
+        self.assertIn("not indexable", mixed.advice()[None])
+
+    def test_nan_is_not_indexed(self):
+        nan = float("nan")
+        domain = IndexedDomain([1.0, nan, 3.0])
+        self.assertEqual(find_all(greater_than(0.5), domain), [1.0, 3.0])
+        # As on a list, NaN equals nothing, not even the NaN in the domain
+        self.assertEqual(find_all(equals(nan), domain), [])
+        self.assertEqual(count_where(equals(nan), domain), 0)
+        self.assertEqual(find_all(equals(3.0), domain), [3.0])
+        self.assertIn("indexed (hash)", domain.advice()[None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Unit tests for predicate and query instrumentation.
+"""
+
+import unittest
+
+from predicate_logic.instrumentation import Profiler
+from predicate_logic.knowledge_base import PredicateLogic
+from predicate_logic.logical_operators import logical_and, logical_or
+from predicate_logic.predicates import (
+    compose_predicates,
+    greater_than,
+    is_even,
+    is_positive,
+)
+from predicate_logic.quantifiers import find_all
+
+
+class TestProfiler(unittest.TestCase):
+    def test_instrumented_predicate_gives_same_results(self):
+        pred = logical_and(is_even, compose_predicates(is_positive, greater_than(4)))
+        instrumented = Profiler().instrument(pred)
+        domain = range(-10, 10)
+        self.assertEqual(find_all(instrumented, domain), find_all(pred, domain))
+
+    def test_counts_selectivity_and_skips(self):
+        profiler = Profiler()
+        instrumented = profiler.instrument(logical_and(is_even, is_positive))
+        find_all(instrumented, [1, 2, 3, 4, -2])
+
+        root = profiler.roots[0]
+        even, positive = root.children
+        self.assertEqual(root.calls, 5)
+        self.assertEqual(root.true_count, 2)
+        self.assertEqual(even.calls, 5)
+        self.assertEqual(even.true_count, 3)
+        # is_positive only runs when is_even passed
+        self.assertEqual(positive.calls, 3)
+        self.assertEqual(positive.skips, 2)
+        self.assertAlmostEqual(positive.selectivity, 2 / 3)
+
+    def test_short_circuit_or(self):
+        profiler = Profiler()
+        instrumented = profiler.instrument(logical_or(is_even, is_positive))
+        find_all(instrumented, [2, 4, 1])
+        _, positive = profiler.roots[0].children
+        self.assertEqual(positive.calls, 1)
+        self.assertEqual(positive.skips, 2)
+
+    def test_original_predicate_is_untouched(self):
+        pred = logical_and(is_even, is_positive)
+        Profiler().instrument(pred)
+        self.assertEqual(pred.children, (is_even, is_positive))
+
+    def test_call_hook(self):
+        calls = []
+        profiler = Profiler(on_call=lambda stats, result, _: calls.append(stats.name))
+        instrumented = profiler.instrument(is_even, name="even")
+        instrumented(2)
+        instrumented(3)
+        self.assertEqual(calls, ["even", "even"])
+
+    def test_report_and_export(self):
+        profiler = Profiler()
+        instrumented = profiler.instrument(logical_and(is_even, is_positive))
+        instrumented(2)
+        report = profiler.report()
+        self.assertIn("logical_and(is_even, is_positive)", report)
+        self.assertIn("  is_positive: calls=1", report)
+        exported = profiler.roots[0].as_dict()
+        self.assertEqual(exported["children"][0]["name"], "is_even")
+
+
+class TestQueryInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.kb = PredicateLogic()
+        self.kb.add_fact(("human", ("socrates",)))
+        self.kb.add_rule(lambda x: x == "plato", ("human", ("plato",)))
+
+    def test_query_stats(self):
+        traces = []
+        profiler = Profiler(on_query=traces.append)
+        profiler.watch(self.kb)
+
+        self.assertTrue(self.kb.query("human", "socrates"))
+        self.assertTrue(self.kb.query("human", "plato"))
+        self.assertFalse(self.kb.query("human", "zeus"))
+
+        stats = profiler.queries["human"]
+        self.assertEqual(stats.queries, 3)
+        self.assertEqual(stats.true_count, 2)
+        self.assertEqual(stats.fact_hits, 1)
+        self.assertEqual(stats.rules_tried, 1)
+        self.assertEqual(stats.max_depth, 1)
+        self.assertEqual([t.depth for t in traces], [0, 1, 0])
+
+    def test_unwatch(self):
+        profiler = Profiler()
+        profiler.watch(self.kb)
+        profiler.unwatch(self.kb)
+        self.kb.query("human", "socrates")
+        self.assertEqual(profiler.queries, {})
+
+    def test_unwatch_keeps_other_hooks(self):
+        traces = []
+        profiler = Profiler()
+        self.kb.set_query_hook(traces.append)
+        profiler.watch(self.kb)
+        profiler.unwatch(self.kb)
+        self.kb.query("human", "socrates")
+        self.assertEqual(len(traces), 1)
+
+        # A hook installed after watch() survives unwatch()
+        profiler.watch(self.kb)
+        self.kb.set_query_hook(traces.append)
+        profiler.unwatch(self.kb)
+        self.kb.query("human", "socrates")
+        self.assertEqual(len(traces), 2)
+        self.assertEqual(profiler.queries, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
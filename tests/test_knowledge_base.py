@@ -0,0 +1,286 @@
+"""
+Unit tests for the knowledge base.
+"""
+
+import unittest
+
+from predicate_logic.knowledge_base import PredicateLogic
+from predicate_logic.rules import Var
+
+
+class TestPredicateLogic(unittest.TestCase):
+    def setUp(self):
+        self.kb = PredicateLogic()
+        self.kb.add_fact(("human", ("socrates",)))
+        self.kb.add_fact(("human", ("plato",)))
+        self.kb.add_rule(lambda x: x == "aristotle", ("human", ("aristotle",)))
+        self.kb.add_rule(lambda x: False, ("human", ("zeus",)))
+
+    def test_query_facts(self):
+        self.assertTrue(self.kb.query("human", "socrates"))
+        self.assertFalse(self.kb.query("human", "hermes"))
+        self.assertFalse(self.kb.query("god", "socrates"))
+
+    def test_query_rules(self):
+        self.assertTrue(self.kb.query("human", "aristotle"))
+        self.assertFalse(self.kb.query("human", "zeus"))
+
+    def test_get_all(self):
+        self.assertEqual(len(self.kb.get_all_facts()), 2)
+        self.assertEqual(len(self.kb.get_all_rules()), 2)
+
+    def test_clear(self):
+        self.kb.clear()
+        self.assertFalse(self.kb.query("human", "socrates"))
+        self.assertFalse(self.kb.query("human", "aristotle"))
+        self.assertEqual(self.kb.get_all_rules(), [])
+
+
+class TestExplain(unittest.TestCase):
+    def setUp(self):
+        self.kb = PredicateLogic()
+        self.kb.add_fact(("human", ("socrates",)))
+        self.kb.add_rule(lambda x: x == "plato", ("human", ("plato",)))
+        self.kb.add_rule(lambda x: True, ("mortal", ("plato",)))
+
+    def test_fact_hit_skips_rules(self):
+        plan = self.kb.explain("human", "socrates")
+        self.assertTrue(plan.result)
+        lookup, scan = plan.steps
+        self.assertEqual(lookup.index, "fact hash index")
+        self.assertEqual(lookup.actual_rows, 1)
+        self.assertFalse(scan.executed)
+        self.assertIn("never executed", str(plan))
+
+    def test_rule_candidates(self):
+        plan = self.kb.explain("human", "plato")
+        self.assertTrue(plan.result)
+        lookup, scan = plan.steps
+        self.assertEqual(lookup.actual_rows, 0)
+        self.assertEqual(scan.estimated_rows, 1)
+        self.assertEqual(scan.actual_rows, 1)
+        self.assertEqual(len(scan.children), 1)
+        self.assertIn("1 of 2 rules", scan.detail)
+
+    def test_explain_matches_query(self):
+        for args in [("socrates",), ("plato",), ("zeus",)]:
+            self.assertEqual(
+                self.kb.explain("human", *args).result, self.kb.query("human", *args)
+            )
+
+    def test_as_dict(self):
+        data = self.kb.explain("human", "zeus").as_dict()
+        self.assertEqual(data["query"], ["human", ["zeus"]])
+        self.assertFalse(data["result"])
+        self.assertEqual(len(data["steps"]), 2)
+
+
+class TestHornRules(unittest.TestCase):
+    def setUp(self):
+        self.kb = PredicateLogic()
+        self.kb.load(
+            """
+            parent(john, mary).
+            parent(mary, sue).
+            parent(sue, ann).
+            ancestor(X, Y) :- parent(X, Y).
+            ancestor(X, Z) :- parent(X, Y), ancestor(Y, Z).
+            """
+        )
+
+    def test_query_derived(self):
+        self.assertTrue(self.kb.query("ancestor", "john", "ann"))
+        self.assertFalse(self.kb.query("ancestor", "ann", "john"))
+        self.assertEqual(len(self.kb.get_horn_rules()), 2)
+
+    def test_query_with_variables(self):
+        who = Var("Who")
+        self.assertEqual(
+            self.kb.solve("ancestor", who, "ann"),
+            {("john", "ann"), ("mary", "ann"), ("sue", "ann")},
+        )
+        self.assertTrue(self.kb.query("parent", "john", who))
+        self.assertFalse(self.kb.query("parent", who, "john"))
+
+    def test_new_facts_invalidate(self):
+        self.assertFalse(self.kb.query("ancestor", "ann", "bob"))
+        self.kb.add_fact(("parent", ("ann", "bob")))
+        self.assertTrue(self.kb.query("ancestor", "john", "bob"))
+
+    def test_callable_rule_conclusions_feed_horn_rules(self):
+        self.kb.add_rule(lambda a, b: True, ("parent", ("ann", "eve")))
+        self.kb.add_horn_rule("grandparent(X, Z) :- parent(X, Y), parent(Y, Z)")
+        self.assertTrue(self.kb.query("grandparent", "sue", "eve"))
+
+    def test_traced_query(self):
+        traces = []
+        self.kb.set_query_hook(traces.append)
+        self.assertTrue(self.kb.query("ancestor", "john", "ann"))
+        self.assertEqual(traces[0].rules_tried, 2)
+        self.assertGreaterEqual(traces[0].depth, 3)
+
+    def test_explain_join_order(self):
+        # Compute the full fixpoint first, as a query with no constants does
+        self.kb.solve("ancestor", Var("X"), Var("Y"))
+        plan = self.kb.explain("ancestor", "john", "ann")
+        self.assertTrue(plan.result)
+        derive = plan.steps[-1]
+        self.assertEqual(derive.operation, "Rule derivation")
+        self.assertEqual(len(derive.children), 2)
+        self.assertIn("join order: parent(X, Y)", derive.children[0].detail)
+        self.assertEqual(derive.actual_rows, 6)
+
+    def test_explain_leapfrog_triejoin(self):
+        self.kb.add_horn_rule(
+            "loop(X, Y, Z) :- parent(X, Y), parent(Y, Z), parent(Z, X)"
+        )
+        self.kb.add_fact(("parent", ("sue", "john")))
+        self.kb.solve("loop", Var("X"), Var("Y"), Var("Z"))
+        plan = self.kb.explain("loop", "john", "mary", "sue")
+        self.assertTrue(plan.result)
+        step = plan.steps[-1].children[0]
+        self.assertEqual(step.operation, "Leapfrog triejoin")
+        self.assertIn("variable order", step.detail)
+
+    def test_goal_directed_query(self):
+        self.kb.add_fact(("parent", ("bob", "cy")))
+        self.assertEqual(
+            self.kb.solve("ancestor", "mary", Var("D")),
+            {("mary", "sue"), ("mary", "ann")},
+        )
+        plan = self.kb.explain("ancestor", "sue", "ann")
+        self.assertTrue(plan.result)
+        derive = plan.steps[-1]
+        self.assertIn("magic-sets", derive.index)
+        self.assertIn("binding pattern bb", derive.detail)
+        # Only ancestors of ann through sue are derived, not bob's or john's
+        self.assertEqual(derive.actual_rows, 1)
+
+    def test_negation_and_aggregates(self):
+        self.kb.load(
+            """
+            leaf(X) :- parent(_, X), not parent(X, _).
+            descendants(X, count(Y)) :- ancestor(X, Y).
+            """
+        )
+        self.assertEqual(self.kb.solve("leaf", Var("X")), {("ann",)})
+        self.assertTrue(self.kb.query("descendants", "john", 3))
+        self.assertFalse(self.kb.query("descendants", "mary", 3))
+        plan = self.kb.explain("descendants", "sue", 1)
+        self.assertTrue(plan.result)
+        self.assertIn("semi-naive", plan.steps[-1].index)
+        self.kb.add_fact(("parent", ("ann", "bob")))
+        self.assertEqual(self.kb.solve("leaf", Var("X")), {("bob",)})
+        self.assertTrue(self.kb.query("descendants", "john", 4))
+        with self.assertRaises(ValueError):
+            self.kb.add_horn_rule("odd(X) :- parent(X, _), not odd(X).")
+        self.assertEqual(len(self.kb.get_horn_rules()), 4)
+        with self.assertRaises(ValueError):
+            self.kb.set_rule_hook(print)
+
+    def test_clear(self):
+        self.kb.clear()
+        self.assertFalse(self.kb.query("ancestor", "john", "mary"))
+        self.assertEqual(self.kb.get_horn_rules(), [])
+
+    def test_remove_fact(self):
+        self.assertTrue(self.kb.query("ancestor", "john", "ann"))
+        self.kb.remove_fact(("parent", ("mary", "sue")))
+        self.kb.remove_fact(("parent", ("nobody", "sue")))
+        self.assertFalse(self.kb.query("ancestor", "john", "ann"))
+        self.assertTrue(self.kb.query("ancestor", "sue", "ann"))
+        fired = []
+        self.kb.set_rule_hook(fired.append)
+        self.kb.remove_fact(("parent", ("sue", "ann")))
+        self.assertFalse(self.kb.query("ancestor", "sue", "ann"))
+        self.kb.add_fact(("parent", ("sue", "bob")))
+        self.assertEqual([a.fact for a in fired], [("ancestor", ("sue", "bob"))])
+        # The network retracts in place, keeping the hook and rederiving
+        # without firing what still follows
+        network = self.kb._rete
+        self.kb.add_fact(("parent", ("john", "sue")))
+        self.kb.add_rule(lambda x, y: True, ("parent", ("sue", "bob")))
+        fired.clear()
+        self.kb.remove_fact(("parent", ("sue", "bob")))
+        self.assertTrue(self.kb.query("ancestor", "john", "bob"))
+        self.kb.remove_fact(("parent", ("john", "mary")))
+        self.assertFalse(self.kb.query("ancestor", "john", "mary"))
+        self.assertTrue(self.kb.query("ancestor", "john", "sue"))
+        self.assertIs(self.kb._rete, network)
+        self.assertEqual(fired, [])
+
+    def test_fact_filter(self):
+        self.kb.add_rule(lambda x: x == "ann", ("person", ("ann",)))
+        for i in range(2000):
+            self.kb.add_fact(("age", (f"p{i}", i)))
+        self.kb.set_fact_filter(0.01)
+        self.assertTrue(self.kb.query("parent", "john", "mary"))
+        self.assertTrue(self.kb.query("person", "ann"))
+        self.assertTrue(self.kb.query("ancestor", "john", "ann"))
+        self.assertTrue(self.kb.query("parent", Var("P"), "sue"))
+        misses = [self.kb.query("age", f"p{i}", i + 1) for i in range(2000)]
+        self.assertFalse(any(misses))
+        stats = self.kb.filter_stats
+        self.assertEqual(stats.rejected + stats.false_positives, 2000)
+        self.assertLess(stats.false_positive_rate, 0.02)
+        self.assertFalse(self.kb.query("unknown", "x"))
+        self.kb.add_fact(("parent", ("ann", "bob")))
+        self.assertTrue(self.kb.query("parent", "ann", "bob"))
+        plan = self.kb.explain("parent", "bob", "ann")
+        self.assertFalse(plan.result)
+        self.assertEqual(len(plan.steps), 1)
+        self.assertEqual(plan.steps[0].operation, "Bloom filter")
+        self.kb.remove_fact(("parent", ("ann", "bob")))
+        self.assertFalse(self.kb.query("parent", "ann", "bob"))
+        self.kb.set_fact_filter(None)
+        self.assertTrue(self.kb.query("age", "p1", 1))
+
+    def test_fact_filter_rebuilt_after_removals(self):
+        for i in range(100):
+            self.kb.add_fact(("edge", (i, i + 1)))
+        self.kb.set_fact_filter(0.01)
+        for i in range(10):
+            self.kb.remove_fact(("edge", (i, i + 1)))
+        self.assertTrue((0, 1) in self.kb._fact_filters["edge"])
+        for i in range(10, 25):
+            self.kb.remove_fact(("edge", (i, i + 1)))
+        self.assertEqual(len(self.kb._fact_filters["edge"]), 100)
+        # Once removals pass a quarter of the filter's entries, without any log
+        self.kb.remove_fact(("edge", (25, 26)))
+        self.assertEqual(len(self.kb._fact_filters["edge"]), 74)
+        self.assertFalse((0, 1) in self.kb._fact_filters["edge"])
+        self.assertFalse(self.kb.query("edge", 0, 1))
+        self.assertEqual(self.kb.filter_stats.false_positives, 0)
+
+    def test_fact_filter_while_tracing(self):
+        for i in range(100):
+            self.kb.add_fact(("age", (f"p{i}", i)))
+        self.kb.set_fact_filter(0.01)
+        traces = []
+        self.kb.set_query_hook(traces.append)
+        self.assertTrue(self.kb.query("age", "p1", 1))
+        self.assertFalse(self.kb.query("age", "p1", 2))
+        stats = self.kb.filter_stats
+        self.assertEqual(stats.checks, 2)
+        self.assertEqual(stats.rejected + stats.false_positives, 1)
+        self.assertEqual([trace.result for trace in traces], [True, False])
+
+    def test_rule_hook(self):
+        fired = []
+        self.kb.set_rule_hook(fired.append)
+        self.assertEqual(fired, [])
+        self.kb.add_fact(("parent", ("ann", "bob")))
+        facts = {activation.fact for activation in fired}
+        self.assertIn(("ancestor", ("john", "bob")), facts)
+        self.assertTrue(self.kb.query("ancestor", "mary", "bob"))
+        self.kb.add_horn_rule("grandparent(X, Z) :- parent(X, Y), parent(Y, Z)")
+        self.assertIn(("grandparent", ("sue", "bob")), [a.fact for a in fired])
+        plan = self.kb.explain("ancestor", "sue", "bob")
+        self.assertEqual(plan.steps[-1].index, "Rete network")
+        self.kb.set_rule_hook(None)
+        self.kb.add_fact(("parent", ("bob", "cy")))
+        self.assertTrue(self.kb.query("ancestor", "john", "cy"))
+
+
+if __name__ == "__main__":
+    unittest.main()
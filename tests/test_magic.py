@@ -0,0 +1,93 @@
+"""
+Unit tests for magic-sets rewriting.
+"""
+
+import random
+import unittest
+
+from predicate_logic.formulas import parse_program
+from predicate_logic.magic import adornment, evaluate_goal, magic_rewrite
+from predicate_logic.rules import FactTable, RuleStats, Var, materialize
+
+RULES = list(
+    parse_program(
+        """
+        anc(X, Y) :- par(X, Y).
+        anc(X, Z) :- par(X, Y), anc(Y, Z).
+        sg(X, X) :- person(X).
+        sg(X, Y) :- par(XP, X), sg(XP, YP), par(YP, Y).
+        cycle(X) :- anc(X, Y), anc(Y, X).
+        below(Y) :- anc(c3, Y).
+        """
+    )
+)
+A, B = Var("A"), Var("B")
+
+
+class TestMagicSets(unittest.TestCase):
+    def test_adornment(self):
+        self.assertEqual(adornment(("john", A, 3, B)), "bfbf")
+
+    def test_rewrite(self):
+        program = magic_rewrite(RULES[:2], "anc", ("john", A))
+        self.assertEqual(program.answer, "anc[bf]")
+        self.assertEqual(program.seed, ("magic_anc[bf]", ("john",)))
+        self.assertEqual(
+            [str(rule) for rule in program.rules],
+            [
+                "anc[bf](X, Y) :- magic_anc[bf](X), par(X, Y).",
+                "magic_anc[bf](Y) :- magic_anc[bf](X), par(X, Y).",
+                "anc[bf](X, Z) :- magic_anc[bf](X), par(X, Y), anc[bf](Y, Z).",
+            ],
+        )
+
+    def test_rejects_negation(self):
+        rules = list(parse_program("orphan(X) :- par(_, X), not anc(X, _)."))
+        with self.assertRaises(ValueError):
+            magic_rewrite(RULES[:2] + rules, "orphan", ("sue",))
+
+    def test_matches_materialize(self):
+        rng = random.Random(1)
+        queries = [("anc", 2), ("sg", 2), ("cycle", 1), ("below", 1)]
+        terms = [A, B] + [f"c{i}" for i in range(10)]
+        for _ in range(20):
+            base = {
+                "par": FactTable(
+                    (f"c{rng.randrange(8)}", f"c{rng.randrange(8)}")
+                    for _ in range(12)
+                ),
+                "person": FactTable((f"c{i}",) for i in range(8)),
+                # Base facts of a derived predicate take part too
+                "anc": FactTable([("c1", "c9")]),
+            }
+            full = materialize(RULES, base)
+            for predicate, arity in queries:
+                for _ in range(5):
+                    pattern = tuple(rng.choice(terms) for _ in range(arity))
+                    table = evaluate_goal(RULES, base, predicate, pattern)
+                    self.assertEqual(
+                        set(table.match(pattern)),
+                        set(full[predicate].match(pattern)),
+                        (predicate, pattern),
+                    )
+
+    def test_derives_only_relevant_facts(self):
+        # Two separate chains: a query on one never touches the other
+        base = {
+            "par": FactTable(
+                [(f"a{i}", f"a{i + 1}") for i in range(50)]
+                + [(f"b{i}", f"b{i + 1}") for i in range(50)]
+            )
+        }
+        stats = []
+        table = evaluate_goal(RULES[:2], base, "anc", ("a45", A), stats)
+        self.assertEqual(len(table.match(("a45", A))), 5)
+        # Answers for the descendants of a45, asked for by recursion
+        self.assertEqual(len(table), 5 + 4 + 3 + 2 + 1)
+        self.assertTrue(all(isinstance(s, RuleStats) for s in stats))
+        self.assertLess(sum(s.derived for s in stats), 25)
+        self.assertEqual(len(materialize(RULES[:2], base)["anc"]), 2 * 1275)
+
+
+if __name__ == "__main__":
+    unittest.main()
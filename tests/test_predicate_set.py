@@ -0,0 +1,154 @@
+"""
+Unit tests for shared evaluation of many predicates.
+"""
+
+import random
+import unittest
+from collections import Counter
+
+from predicate_logic.columnar import field
+from predicate_logic.logical_operators import (
+    logical_and,
+    logical_iff,
+    logical_implies,
+    logical_not,
+    logical_or,
+    logical_xor,
+)
+from predicate_logic.patterns import range_predicate, type_predicate
+from predicate_logic.predicate_set import PredicateSet
+from predicate_logic.predicates import compose_predicates, greater_than, is_even
+
+
+class TestPredicateSet(unittest.TestCase):
+    def setUp(self):
+        self.calls = Counter()
+
+        def counted(name, test):
+            def atom(value):
+                self.calls[name] += 1
+                return test(value)
+
+            atom.__name__ = name
+            return atom
+
+        self.atoms = [
+            field("price", counted("price>100", greater_than(100))),
+            field("price", counted("price<=500", lambda v: v <= 500)),
+            field("sku", counted("sku:str", type_predicate(str))),
+            field("qty", counted("qty:1-9", range_predicate(1, 9))),
+            counted("even_id", lambda record: record["id"] % 2 == 0),
+        ]
+
+    def random_predicate(self, rng, depth):
+        if depth == 0 or rng.random() < 0.25:
+            return rng.choice(self.atoms)
+        op = rng.choice(
+            [
+                logical_and,
+                logical_or,
+                logical_not,
+                logical_implies,
+                logical_iff,
+                logical_xor,
+                compose_predicates,
+            ]
+        )
+        if op is logical_not:
+            return op(self.random_predicate(rng, depth - 1))
+        if op is compose_predicates:
+            return op(*(self.random_predicate(rng, depth - 1) for _ in range(3)))
+        return op(
+            self.random_predicate(rng, depth - 1),
+            self.random_predicate(rng, depth - 1),
+        )
+
+    def records(self, rng, count):
+        return [
+            {
+                "id": i,
+                "price": rng.randint(0, 1000),
+                "sku": rng.choice(["A-1", 42]),
+                "qty": rng.randint(0, 12),
+            }
+            for i in range(count)
+        ]
+
+    def test_matches_individual_evaluation(self):
+        rng = random.Random(2)
+        predicates = [
+            self.random_predicate(rng, rng.randint(1, 5)) for _ in range(200)
+        ]
+        filters = PredicateSet(predicates)
+        for record in self.records(rng, 50):
+            expected = [i for i, pred in enumerate(predicates) if pred(record)]
+            self.assertEqual(filters.match(record), expected)
+
+    def test_each_atom_runs_once_per_record(self):
+        rng = random.Random(3)
+        filters = PredicateSet(
+            self.random_predicate(rng, rng.randint(1, 5)) for _ in range(300)
+        )
+        for record in self.records(rng, 20):
+            self.calls.clear()
+            filters.match(record)
+            self.assertLessEqual(max(self.calls.values()), 1)
+        self.assertEqual(filters.atom_count, len(self.atoms))
+        self.assertGreater(filters.shared, 0)
+
+    def test_structurally_equal_atoms_are_shared(self):
+        filters = PredicateSet(
+            [
+                field("price", greater_than(100)),
+                logical_and(field("price", greater_than(100)), field("qty", is_even)),
+                field("price", logical_or(greater_than(100), is_even)),
+            ]
+        )
+        self.assertEqual(filters.match({"price": 150, "qty": 3}), [0, 2])
+        self.assertEqual(filters.atom_count, 3)
+
+    def test_ids(self):
+        filters = PredicateSet({"big": greater_than(10), "even": is_even})
+        self.assertEqual(filters.match(12), ["big", "even"])
+        new_id = filters.add(greater_than(0))
+        self.assertEqual(new_id, 0)
+        self.assertEqual(filters.match(3), [0])
+        filters.remove("big")
+        self.assertEqual(filters.match(12), ["even", 0])
+        self.assertNotIn("big", filters)
+        self.assertEqual(len(filters), 2)
+        with self.assertRaises(KeyError):
+            filters.add(is_even, "even")
+
+    def test_iff_and_xor_compare_raw_results(self):
+        def mod2(x):
+            return x % 2
+
+        def mod3(x):
+            return x % 3
+
+        iff = logical_iff(mod2, mod3)
+        xor = logical_xor(mod2, mod3)
+        predicates = [
+            iff,
+            xor,
+            logical_and(iff, greater_than(3)),
+            logical_or(xor, logical_not(iff)),
+            logical_iff(mod3, logical_xor(mod2, mod3)),
+        ]
+        filters = PredicateSet(predicates)
+        for x in range(12):
+            expected = [i for i, pred in enumerate(predicates) if pred(x)]
+            self.assertEqual(filters.match(x), expected, x)
+        # 1 and 2 are both truthy, but not equal
+        self.assertEqual(filters.match(5), [1, 3])
+        self.assertGreater(filters.shared, 0)
+
+    def test_match_all(self):
+        filters = PredicateSet([is_even, greater_than(2)])
+        matches = list(filters.match_all([1, 2, 3, 4]))
+        self.assertEqual(matches, [[], [0], [1], [0, 1]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,6 +13,11 @@ from predicate_logic.quantifiers import (
     find_first,
     forall,
 )
+from predicate_logic.relations import (
+    is_equivalence_relation,
+    is_symmetric,
+    is_transitive,
+)
 
 
 class TestQuantifiers(unittest.TestCase):
@@ -58,5 +63,19 @@ class TestQuantifiers(unittest.TestCase):
         self.assertIsNone(first_large)
 
 
+
+class TestRelationProperties(unittest.TestCase):
+    def test_relation_properties(self):
+        domain = range(6)
+        same_parity = lambda a, b: a % 2 == b % 2  # noqa: E731
+        self.assertTrue(is_equivalence_relation(same_parity, domain))
+        self.assertTrue(is_transitive(lambda a, b: a <= b, domain))
+        self.assertFalse(is_symmetric(lambda a, b: a <= b, domain))
+        # 0 -> 1 -> 2 without 0 -> 2
+        self.assertFalse(is_transitive(lambda a, b: b == a + 1, domain))
+        self.assertTrue(is_symmetric(lambda a, b: abs(a - b) == 1, domain))
+        self.assertFalse(is_transitive(lambda a, b: abs(a - b) == 1, domain))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,200 @@
+"""
+Unit tests for incremental rule matching.
+"""
+
+import random
+import unittest
+
+from predicate_logic.rete import ReteNetwork
+from predicate_logic.rules import Atom, FactTable, Rule, Var, materialize
+
+X, Y, Z = Var("X"), Var("Y"), Var("Z")
+
+PATH = [
+    Rule(Atom("path", (X, Y)), (Atom("edge", (X, Y)),)),
+    Rule(Atom("path", (X, Z)), (Atom("edge", (X, Y)), Atom("path", (Y, Z)))),
+]
+GRANDPARENT = Rule(
+    Atom("grandparent", (X, Z)), (Atom("parent", (X, Y)), Atom("parent", (Y, Z)))
+)
+
+
+class TestReteNetwork(unittest.TestCase):
+    def test_matches_materialize(self):
+        rng = random.Random(5)
+        rules = PATH + [
+            GRANDPARENT,
+            Rule(Atom("loop", (X,)), (Atom("path", (X, X)),)),
+            Rule(Atom("from_zero", (Y,)), (Atom("edge", (0, Y)),)),
+        ]
+        network = ReteNetwork(rules)
+        base = {"edge": FactTable(), "parent": FactTable()}
+        for _ in range(150):
+            predicate = rng.choice(["edge", "parent"])
+            row = (rng.randrange(12), rng.randrange(12))
+            network.insert(predicate, row)
+            base[predicate].add(row)
+        expected = materialize(rules, base)
+        for name in ("path", "grandparent", "loop", "from_zero"):
+            self.assertEqual(network.tables[name].rows, expected[name].rows, name)
+
+    def test_insert_returns_derived_facts(self):
+        network = ReteNetwork([GRANDPARENT])
+        self.assertEqual(network.insert("parent", ("john", "mary")), [])
+        self.assertEqual(
+            network.insert("parent", ("mary", "sue")),
+            [("grandparent", ("john", "sue"))],
+        )
+        self.assertEqual(network.insert("parent", ("mary", "sue")), [])
+        self.assertIn(("grandparent", ("john", "sue")), network)
+
+    def test_callbacks(self):
+        activations = []
+        network = ReteNetwork(PATH, on_fire=activations.append)
+        network.insert("edge", ("a", "b"))
+        network.insert("edge", ("b", "c"))
+        fired = {(a.rule, a.fact) for a in activations}
+        self.assertIn((PATH[1], ("path", ("a", "c"))), fired)
+        binding = next(a.binding for a in activations if a.rule == PATH[1])
+        self.assertEqual(binding, {X: "a", Y: "b", Z: "c"})
+        self.assertEqual(network.firings, len(activations))
+
+    def test_rule_added_after_facts(self):
+        network = ReteNetwork()
+        network.insert("parent", ("john", "mary"))
+        network.insert("parent", ("mary", "sue"))
+        derived = network.add_rule(GRANDPARENT)
+        self.assertEqual(derived, [("grandparent", ("john", "sue"))])
+
+    def test_rejects_negation(self):
+        rule = Rule(
+            Atom("root", (X,)),
+            (Atom("parent", (X, Y)), Atom("parent", (Z, X), negated=True)),
+        )
+        with self.assertRaises(ValueError):
+            ReteNetwork([rule])
+
+    def test_alpha_memories_shared(self):
+        network = ReteNetwork(
+            [
+                GRANDPARENT,
+                Rule(Atom("has_child", (X,)), (Atom("parent", (X, Y)),)),
+                Rule(Atom("self_parent", (X,)), (Atom("parent", (X, X)),)),
+            ]
+        )
+        self.assertEqual(network.alpha_count, 2)
+        network.insert("parent", ("a", "a"))
+        self.assertIn(("self_parent", ("a",)), network)
+
+    def test_insertion_cost_independent_of_size(self):
+        def tokens_for_one_insert(size):
+            network = ReteNetwork([GRANDPARENT])
+            for i in range(size):
+                network.insert("parent", (f"p{i}", f"c{i}"))
+            network.insert("other", ("x",))
+            before = network.tokens
+            network.insert("parent", ("c0", "g0"))
+            return network.tokens - before
+
+        self.assertEqual(tokens_for_one_insert(10), tokens_for_one_insert(10_000))
+
+    def test_retract_matches_materialize(self):
+        rng = random.Random(7)
+        rules = PATH + [
+            GRANDPARENT,
+            Rule(Atom("loop", (X,)), (Atom("path", (X, X)),)),
+            Rule(
+                Atom("sibling", (Y, Z)),
+                (Atom("parent", (X, Y)), Atom("parent", (X, Z))),
+            ),
+        ]
+        network = ReteNetwork(rules)
+        base = {"edge": FactTable(), "parent": FactTable()}
+        facts = []
+        for _ in range(120):
+            predicate = rng.choice(["edge", "parent"])
+            row = (rng.randrange(10), rng.randrange(10))
+            network.insert(predicate, row)
+            base[predicate].add(row)
+            facts.append((predicate, row))
+        rng.shuffle(facts)
+        for predicate, row in facts[:80]:
+            network.retract(predicate, row)
+            base[predicate].discard(row)
+        expected = materialize(rules, base)
+        for name in ("edge", "parent", "path", "grandparent", "loop", "sibling"):
+            self.assertEqual(network.tables[name].rows, expected[name].rows, name)
+
+    def test_retract_returns_lost_facts(self):
+        network = ReteNetwork([GRANDPARENT])
+        network.insert("parent", ("john", "mary"))
+        network.insert("parent", ("mary", "sue"))
+        network.insert("parent", ("mary", "ann"))
+        self.assertEqual(
+            network.retract("parent", ("mary", "sue")),
+            [("grandparent", ("john", "sue"))],
+        )
+        self.assertNotIn(("parent", ("mary", "sue")), network)
+        self.assertIn(("grandparent", ("john", "ann")), network)
+        self.assertEqual(network.retract("parent", ("mary", "sue")), [])
+        # Facts only derived cannot be retracted
+        self.assertEqual(network.retract("grandparent", ("john", "ann")), [])
+        self.assertIn(("grandparent", ("john", "ann")), network)
+
+    def test_retract_self_join(self):
+        network = ReteNetwork([GRANDPARENT])
+        network.insert("parent", ("a", "a"))
+        network.insert("parent", ("b", "a"))
+        self.assertEqual(
+            sorted(network.retract("parent", ("a", "a"))),
+            [("grandparent", ("a", "a")), ("grandparent", ("b", "a"))],
+        )
+        self.assertEqual(len(network.tables["grandparent"]), 0)
+        network.insert("parent", ("a", "b"))
+        self.assertIn(("grandparent", ("b", "b")), network)
+
+    def test_retract_cyclic_support(self):
+        rules = [
+            Rule(Atom("p", (X,)), (Atom("q", (X,)),)),
+            Rule(Atom("q", (X,)), (Atom("p", (X,)),)),
+            Rule(Atom("p", (X,)), (Atom("seed", (X,)),)),
+        ]
+        network = ReteNetwork(rules)
+        network.insert("seed", ("a",))
+        network.insert("q", ("b",))
+        # p(a) and q(a) only support each other once the seed is gone
+        self.assertEqual(
+            sorted(network.retract("seed", ("a",))), [("p", ("a",)), ("q", ("a",))]
+        )
+        # q(b) was inserted as well as derived from p(b), so it stays
+        self.assertEqual(network.retract("p", ("b",)), [])
+        self.assertIn(("p", ("b",)), network)
+        self.assertEqual(network.retract("q", ("b",)), [("p", ("b",))])
+        self.assertEqual(len(network.tables["p"]), 0)
+
+    def test_retract_rederives_without_callbacks(self):
+        activations = []
+        network = ReteNetwork(PATH, on_fire=activations.append)
+        for edge in [("a", "b"), ("b", "c"), ("a", "c")]:
+            network.insert("edge", edge)
+        fired = len(activations)
+        self.assertEqual(network.retract("edge", ("a", "c")), [])
+        self.assertIn(("path", ("a", "c")), network)
+        self.assertEqual(len(activations), fired)
+
+    def test_retraction_cost_independent_of_size(self):
+        def tokens_for_one_retract(size):
+            network = ReteNetwork([GRANDPARENT])
+            for i in range(size):
+                network.insert("parent", (f"p{i}", f"c{i}"))
+            network.insert("parent", ("c0", "g0"))
+            before = network.tokens
+            network.retract("parent", ("c0", "g0"))
+            network.insert("parent", ("c0", "g0"))
+            return network.tokens - before
+
+        self.assertEqual(tokens_for_one_retract(10), tokens_for_one_retract(10_000))
+
+
+if __name__ == "__main__":
+    unittest.main()
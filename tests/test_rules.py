@@ -0,0 +1,240 @@
+"""
+Unit tests for Horn rules and bottom-up evaluation.
+"""
+
+import random
+import unittest
+
+from predicate_logic.rules import (
+    HASH_JOIN,
+    LEAPFROG_TRIEJOIN,
+    Aggregate,
+    Atom,
+    FactTable,
+    Rule,
+    RuleStats,
+    Var,
+    is_cyclic,
+    join_body,
+    leapfrog_join,
+    materialize,
+    plan_body,
+    stratify,
+)
+
+X, Y, Z, W = Var("X"), Var("Y"), Var("Z"), Var("W")
+
+
+def chain(n):
+    """edge(0, 1), edge(1, 2), ..., edge(n - 1, n)"""
+    return {"edge": FactTable((i, i + 1) for i in range(n))}
+
+
+PATH = [
+    Rule(Atom("path", (X, Y)), (Atom("edge", (X, Y)),)),
+    Rule(Atom("path", (X, Z)), (Atom("edge", (X, Y)), Atom("path", (Y, Z)))),
+]
+
+
+class TestFactTable(unittest.TestCase):
+    def test_lookup_uses_and_maintains_indexes(self):
+        table = FactTable([("a", 1), ("b", 2), ("a", 3)])
+        self.assertEqual(sorted(table.lookup((0,), ("a",))), [("a", 1), ("a", 3)])
+        table.add(("a", 4))
+        table.discard(("a", 1))
+        self.assertEqual(sorted(table.lookup((0,), ("a",))), [("a", 3), ("a", 4)])
+        self.assertEqual(list(table.lookup((0, 1), ("b", 2))), [("b", 2)])
+
+    def test_match_repeated_variables(self):
+        table = FactTable([(1, 1), (1, 2), (2, 2)])
+        self.assertEqual(sorted(table.match((X, X))), [(1, 1), (2, 2)])
+        self.assertEqual(sorted(table.match((1, Y))), [(1, 1), (1, 2)])
+
+
+class TestRule(unittest.TestCase):
+    def test_unbound_head_variable(self):
+        with self.assertRaises(ValueError):
+            Rule(Atom("p", (X, Z)), (Atom("q", (X,)),)).validate()
+
+    def test_str(self):
+        self.assertEqual(str(PATH[1]), "path(X, Z) :- edge(X, Y), path(Y, Z).")
+
+
+class TestMaterialize(unittest.TestCase):
+    def test_transitive_closure(self):
+        tables = materialize(PATH, chain(10))
+        self.assertEqual(len(tables["path"]), 55)
+        self.assertIn((0, 10), tables["path"])
+        self.assertNotIn((10, 0), tables["path"])
+
+    def test_base_tables_untouched(self):
+        base = chain(3)
+        base["path"] = FactTable([(7, 8)])
+        tables = materialize(PATH, base)
+        self.assertEqual(len(base["path"]), 1)
+        self.assertIn((7, 8), tables["path"])
+        self.assertIs(tables["edge"], base["edge"])
+
+    def test_constants_and_stats(self):
+        rules = [Rule(Atom("from_zero", (Y,)), (Atom("edge", (0, Y)),))]
+        stats = []
+        tables = materialize(rules, chain(5), stats)
+        self.assertEqual(set(tables["from_zero"]), {(1,)})
+        self.assertIsInstance(stats[0], RuleStats)
+        self.assertEqual(stats[0].derived, 1)
+
+    def test_semi_naive_does_not_rederive(self):
+        stats = []
+        materialize(PATH, chain(30), stats)
+        derived = sum(s.derived for s in stats)
+        self.assertEqual(derived, 30 * 31 // 2)
+        # Each path is found at most once per way of splitting it
+        self.assertLess(stats[1].firings, 2 * derived)
+
+
+class TestStratifiedRules(unittest.TestCase):
+    def test_negation(self):
+        # Nodes of the chain that cannot reach node 10
+        rules = PATH + [
+            Rule(
+                Atom("stuck", (X,)),
+                (Atom("edge", (X, Y)), Atom("path", (X, 10), negated=True)),
+            )
+        ]
+        tables = materialize(rules, chain(15))
+        self.assertEqual(set(tables["stuck"]), {(i,) for i in range(10, 15)})
+
+    def test_negated_atom_variables_are_existential(self):
+        rules = [
+            Rule(
+                Atom("sink", (Y,)),
+                (Atom("edge", (X, Y)), Atom("edge", (Y, Z), negated=True)),
+            )
+        ]
+        self.assertEqual(set(materialize(rules, chain(4))["sink"]), {(4,)})
+
+    def test_aggregates(self):
+        rules = PATH + [
+            Rule(
+                Atom("reach", (X, Aggregate("count", Y), Aggregate("max", Y))),
+                (Atom("path", (X, Y)),),
+            ),
+            Rule(Atom("total", (Aggregate("sum", Y),)), (Atom("edge", (X, Y)),)),
+            Rule(Atom("first", (Aggregate("min", X),)), (Atom("edge", (X, Y)),)),
+        ]
+        stats = []
+        tables = materialize(rules, chain(4), stats)
+        self.assertEqual(
+            set(tables["reach"]), {(0, 4, 4), (1, 3, 4), (2, 2, 4), (3, 1, 4)}
+        )
+        self.assertEqual(set(tables["total"]), {(10,)})
+        self.assertEqual(set(tables["first"]), {(0,)})
+        self.assertEqual(stats[2].derived, 4)
+        self.assertEqual(stats[2].firings, 10)
+
+    def test_stratify(self):
+        stuck = Rule(
+            Atom("stuck", (X,)),
+            (Atom("edge", (X, Y)), Atom("path", (X, 10), negated=True)),
+        )
+        strata = stratify([stuck] + PATH)
+        self.assertEqual(strata, [PATH, [stuck]])
+
+    def test_unstratifiable(self):
+        win = Rule(
+            Atom("win", (X,)),
+            (Atom("move", (X, Y)), Atom("win", (Y,), negated=True)),
+        )
+        with self.assertRaises(ValueError):
+            stratify([win])
+        with self.assertRaises(ValueError):
+            materialize([win], {"move": FactTable([(1, 2)])})
+
+    def test_validate(self):
+        for rule in [
+            Rule(Atom("p", (X,)), (Atom("q", (X,), negated=True),)),
+            Rule(Atom("p", (X,), negated=True), (Atom("q", (X,)),)),
+            Rule(Atom("p", (Aggregate("avg", X),)), (Atom("q", (X,)),)),
+            Rule(Atom("p", (X,)), (Atom("q", (Aggregate("count", X),)),)),
+        ]:
+            with self.subTest(rule=str(rule)):
+                with self.assertRaises(ValueError):
+                    rule.validate()
+
+
+class TestPlanBody(unittest.TestCase):
+    def test_prefers_bound_atoms(self):
+        body = (Atom("big", (X,)), Atom("link", (X, Y)), Atom("small", (Y, 1)))
+        order = plan_body(body, {"big": 1000, "link": 100, "small": 10})
+        self.assertEqual(order[0], 2)
+        self.assertEqual(order[1], 1)
+
+    def test_first(self):
+        self.assertEqual(plan_body(PATH[1].body, {}, first=1), [1, 0])
+
+
+def bindings(results):
+    return sorted(sorted((v.name, value) for v, value in b.items()) for b in results)
+
+
+class TestLeapfrogJoin(unittest.TestCase):
+    BODIES = [
+        (Atom("e", (X, Y)), Atom("e", (Y, Z)), Atom("e", (Z, X))),
+        (Atom("e", (X, Y)), Atom("e", (Y, Z)), Atom("e", (Z, W)), Atom("e", (W, X))),
+        (Atom("e", (X, X)), Atom("e", (X, Y)), Atom("f", (Y,))),
+        (Atom("e", (1, Y)), Atom("e", (Y, Z)), Atom("e", (Z, 1))),
+        (Atom("e", (X, Y)), Atom("f", (Z,))),
+    ]
+
+    def test_matches_hash_join(self):
+        rng = random.Random(3)
+        for body in self.BODIES:
+            for _ in range(30):
+                tables = {
+                    "e": FactTable(
+                        (rng.randrange(6), rng.randrange(6)) for _ in range(15)
+                    ),
+                    "f": FactTable((rng.randrange(6),) for _ in range(3)),
+                }
+                sources = [tables[atom.predicate] for atom in body]
+                for given in ({}, {X: 2}):
+                    order = plan_body(body, {}, bound=given)
+                    self.assertEqual(
+                        bindings(leapfrog_join(body, sources, given)),
+                        bindings(join_body(body, order, sources, given)),
+                    )
+
+    def test_tries_follow_changes(self):
+        edges = FactTable([("a", "b"), ("b", "c")])
+        body = self.BODIES[0]
+        self.assertEqual(list(leapfrog_join(body, [edges] * 3)), [])
+        edges.add(("c", "a"))
+        self.assertEqual(len(list(leapfrog_join(body, [edges] * 3))), 3)
+
+    def test_unsortable_values(self):
+        edges = FactTable([(1, "a"), ("a", 1)])
+        with self.assertRaises(TypeError):
+            leapfrog_join(self.BODIES[0], [edges] * 3)
+        rule = Rule(Atom("triangle", (X, Y, Z)), self.BODIES[0])
+        self.assertEqual(len(materialize([rule], {"e": edges})["triangle"]), 0)
+
+    def test_is_cyclic(self):
+        self.assertEqual(
+            [is_cyclic(body) for body in self.BODIES],
+            [True, True, False, False, False],
+        )
+        self.assertFalse(is_cyclic(PATH[1].body))
+
+    def test_materialize_uses_leapfrog_for_cycles(self):
+        triangle = Rule(Atom("triangle", (X, Y, Z)), self.BODIES[0])
+        edges = FactTable([(0, 1), (1, 2), (2, 0), (2, 3)])
+        stats = []
+        tables = materialize([triangle, PATH[0]], {"e": edges, "edge": edges}, stats)
+        self.assertEqual(len(tables["triangle"]), 3)
+        self.assertEqual(
+            [s.strategy for s in stats], [LEAPFROG_TRIEJOIN, HASH_JOIN]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+"""
+Unit tests for satisfiability checking.
+"""
+
+import itertools
+import random
+import unittest
+
+from predicate_logic.columnar import field
+from predicate_logic.logical_operators import (
+    logical_and,
+    logical_iff,
+    logical_implies,
+    logical_not,
+    logical_or,
+    logical_xor,
+)
+from predicate_logic.patterns import range_predicate
+from predicate_logic.predicates import (
+    compose_predicates,
+    equals,
+    greater_than,
+    is_even,
+    is_positive,
+    less_than,
+)
+from predicate_logic.satisfiability import (
+    SatSolver,
+    are_equivalent,
+    dedupe_equivalent,
+    find_model,
+    implies,
+    is_satisfiable,
+    is_tautology,
+)
+
+
+def flag(name):
+    """An independent atom reading one key of a dict of booleans"""
+
+    def atom(record):
+        return record[name]
+
+    atom.__name__ = name
+    return atom
+
+
+FLAGS = [flag(name) for name in "abcde"]
+
+
+def random_predicate(rng, depth):
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice(FLAGS)
+    op = rng.choice(
+        [
+            logical_and,
+            logical_or,
+            logical_not,
+            logical_implies,
+            logical_iff,
+            logical_xor,
+            compose_predicates,
+        ]
+    )
+    if op is logical_not:
+        return op(random_predicate(rng, depth - 1))
+    if op is compose_predicates:
+        count = rng.randint(0, 3)
+        return op(*(random_predicate(rng, depth - 1) for _ in range(count)))
+    return op(random_predicate(rng, depth - 1), random_predicate(rng, depth - 1))
+
+
+class TestSatSolver(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        for _ in range(100):
+            n = 10
+            clauses = [
+                [rng.choice([1, -1]) * rng.randint(1, n) for _ in range(3)]
+                for _ in range(rng.randint(20, 60))
+            ]
+            solver = SatSolver()
+            for clause in clauses:
+                solver.add_clause(clause)
+            expected = any(
+                all(any((lit > 0) == bits[abs(lit) - 1] for lit in c) for c in clauses)
+                for bits in itertools.product([False, True], repeat=n)
+            )
+            self.assertEqual(solver.solve(), expected)
+            if expected:
+                for clause in clauses:
+                    self.assertTrue(
+                        any(solver.model[abs(lit)] == (lit > 0) for lit in clause)
+                    )
+
+    def test_pigeonhole_learns_clauses(self):
+        pigeons, holes = 6, 5
+        solver = SatSolver()
+
+        def var(p, h):
+            return p * holes + h + 1
+
+        for p in range(pigeons):
+            solver.add_clause([var(p, h) for h in range(holes)])
+        for h in range(holes):
+            for p, q in itertools.combinations(range(pigeons), 2):
+                solver.add_clause([-var(p, h), -var(q, h)])
+        self.assertFalse(solver.solve())
+        self.assertGreater(solver.conflicts, 0)
+
+    def test_empty_clause(self):
+        solver = SatSolver()
+        self.assertFalse(solver.add_clause([]))
+        self.assertFalse(solver.solve())
+
+
+class TestPredicates(unittest.TestCase):
+    def test_matches_truth_tables(self):
+        rng = random.Random(11)
+        for _ in range(300):
+            predicate = random_predicate(rng, rng.randint(1, 5))
+            values = [
+                predicate(dict(zip("abcde", bits)))
+                for bits in itertools.product([False, True], repeat=5)
+            ]
+            self.assertEqual(is_satisfiable(predicate), any(values), predicate)
+            self.assertEqual(is_tautology(predicate), all(values), predicate)
+
+    def test_model_satisfies_predicate(self):
+        a, b, c = FLAGS[:3]
+        predicate = logical_and(logical_xor(a, b), logical_implies(b, c))
+        model = find_model(predicate)
+        record = {atom.__name__: value for atom, value in model.items()}
+        self.assertTrue(predicate(record))
+        self.assertIsNone(find_model(logical_and(a, logical_not(a))))
+
+    def test_equivalence(self):
+        self.assertTrue(
+            are_equivalent(
+                logical_not(logical_and(is_even, is_positive)),
+                logical_or(logical_not(is_even), logical_not(is_positive)),
+            )
+        )
+        self.assertTrue(
+            are_equivalent(
+                logical_implies(is_even, is_positive),
+                logical_or(logical_not(is_even), is_positive),
+            )
+        )
+        self.assertFalse(are_equivalent(is_even, is_positive))
+
+    def test_shared_atoms(self):
+        excluded_middle = logical_or(greater_than(3), logical_not(greater_than(3)))
+        self.assertTrue(is_tautology(excluded_middle))
+        # x > 4 implies x > 3, so only the converse fails
+        implied = logical_or(greater_than(3), logical_not(greater_than(4)))
+        self.assertTrue(is_tautology(implied))
+        different = logical_or(greater_than(4), logical_not(greater_than(3)))
+        self.assertFalse(is_tautology(different))
+
+    def test_numeric_ranges(self):
+        self.assertFalse(is_satisfiable(logical_and(greater_than(5), less_than(3))))
+        self.assertFalse(is_satisfiable(logical_and(equals(1), equals(2))))
+        self.assertTrue(is_satisfiable(logical_and(greater_than(3), less_than(5))))
+        self.assertFalse(is_satisfiable(logical_and(greater_than(5), less_than(5))))
+        self.assertTrue(implies(equals(4), range_predicate(0, 10)))
+        self.assertTrue(implies(greater_than(10), greater_than(5)))
+        self.assertFalse(implies(greater_than(5), greater_than(10)))
+
+    def test_fields_scope_ranges(self):
+        dead = field("price", logical_and(greater_than(5), less_than(3)))
+        self.assertFalse(is_satisfiable(dead))
+        split = logical_and(field("price", greater_than(5)), field("qty", less_than(3)))
+        self.assertTrue(is_satisfiable(split))
+        self.assertTrue(
+            are_equivalent(
+                field("price", logical_and(greater_than(5), is_even)),
+                logical_and(field("price", is_even), field("price", greater_than(5))),
+            )
+        )
+
+    def test_dedupe(self):
+        first = logical_and(is_even, is_positive)
+        same = logical_and(is_positive, is_even)
+        dead = logical_and(is_even, logical_not(is_even))
+        other = logical_or(is_even, is_positive)
+        self.assertEqual(dedupe_equivalent([first, dead, same, other]), [first, other])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+"""
+Unit tests for structured expressions and their wire formats.
+"""
+
+import pickle
+import unittest
+
+from predicate_logic.expressions import Expression, compiled
+from predicate_logic.logical_operators import (
+    logical_and,
+    logical_iff,
+    logical_implies,
+    logical_not,
+    logical_or,
+    logical_xor,
+)
+from predicate_logic.patterns import (
+    length_predicate,
+    pattern_predicate,
+    range_predicate,
+    type_predicate,
+)
+from predicate_logic.predicates import (
+    compose_predicates,
+    equals,
+    greater_than,
+    is_even,
+    is_positive,
+    less_than,
+)
+from predicate_logic.quantifiers import find_all
+from predicate_logic.relations import bind_variable, cartesian_predicate, parent_of
+from predicate_logic.serialization import (
+    dedupe,
+    from_bytes,
+    from_json,
+    parse_expression,
+    register_function,
+    structural_hash,
+    to_bytes,
+    to_json,
+)
+
+
+def is_small(x):
+    return abs(x) < 3
+
+
+class TestExpressions(unittest.TestCase):
+    def setUp(self):
+        self.predicates = [
+            logical_and(is_even, greater_than(2)),
+            logical_or(less_than(-1.5), equals(7)),
+            logical_not(range_predicate(0, 10)),
+            logical_implies(type_predicate(int), is_positive),
+            logical_iff(is_even, length_predicate(2)),
+            logical_xor(pattern_predicate("x"), equals("")),
+            compose_predicates(type_predicate((int, float)), greater_than(-100)),
+            equals([1, (2, None), "three"]),
+        ]
+        self.values = [-3, -2, 0, 2, 7, 12, 2.5, "", "ab", [1, 2]]
+
+    def assertSameBehaviour(self, pred1, pred2):
+        for value in self.values:
+            try:
+                expected = pred1(value)
+            except TypeError:
+                self.assertRaises(TypeError, pred2, value)
+                continue
+            self.assertEqual(pred2(value), expected, value)
+
+    def test_pickle_roundtrip(self):
+        for pred in self.predicates:
+            copy = pickle.loads(pickle.dumps(pred))
+            self.assertEqual(copy, pred)
+            self.assertSameBehaviour(pred, copy)
+
+    def test_json_roundtrip(self):
+        for pred in self.predicates:
+            copy = from_json(to_json(pred))
+            self.assertEqual(copy, pred)
+            self.assertSameBehaviour(pred, copy)
+
+    def test_bytes_roundtrip(self):
+        for pred in self.predicates:
+            data = to_bytes(pred)
+            self.assertLess(len(data), len(to_json(pred)))
+            copy = from_bytes(data)
+            self.assertEqual(copy, pred)
+            self.assertSameBehaviour(pred, copy)
+
+    def test_relations_roundtrip(self):
+        cart = cartesian_predicate(is_even, greater_than(0))
+        self.assertTrue(from_json(to_json(cart))((2, 1)))
+        bound = bind_variable(parent_of, 0, "John")
+        copy = pickle.loads(pickle.dumps(bound))
+        self.assertTrue(from_bytes(to_bytes(copy))("Alice"))
+
+    def test_calls_the_compiled_closure(self):
+        pred = logical_and(is_even, greater_than(2))
+        self.assertIs(compiled(pred), pred.func)
+        self.assertEqual(pred.args, (is_even, greater_than(2)))
+        self.assertEqual(find_all(pred, range(8)), [4, 6])
+
+    def test_compile_is_abstract(self):
+        class Incomplete(Expression):
+            __slots__ = ()
+
+        with self.assertRaises(TypeError):
+            Incomplete(1)
+
+    def test_structural_equality(self):
+        self.assertEqual(greater_than(5), greater_than(5))
+        self.assertNotEqual(greater_than(5), greater_than(5.0))
+        self.assertNotEqual(greater_than(5), less_than(5))
+        self.assertEqual(
+            hash(logical_and(is_even, equals([1]))),
+            hash(logical_and(is_even, equals([1]))),
+        )
+
+    def test_structural_hash_and_dedupe(self):
+        built_twice = [logical_and(is_even, greater_than(2)) for _ in range(2)]
+        self.assertEqual(
+            structural_hash(built_twice[0]), structural_hash(built_twice[1])
+        )
+        unique = dedupe(built_twice + [logical_or(is_even, greater_than(2))])
+        self.assertEqual(len(unique), 2)
+
+    def test_unregistered_function_rejected(self):
+        with self.assertRaises(TypeError):
+            to_json(logical_and(is_even, lambda x: x > 1))
+        with self.assertRaises(TypeError):
+            to_bytes(is_small)
+        register_function(is_small)
+        self.assertTrue(from_bytes(to_bytes(logical_not(is_small)))(5))
+
+    def test_malformed_input_rejected(self):
+        with self.assertRaises(ValueError):
+            from_json('{"op": "os.system", "args": []}')
+        with self.assertRaises(ValueError):
+            from_json('{"fn": "os:system"}')
+        with self.assertRaises(ValueError):
+            from_bytes(b"not an expression")
+        with self.assertRaises(ValueError):
+            from_bytes(to_bytes(greater_than(1))[:-1])
+
+    def test_parse_expression_roundtrip(self):
+        for pred in self.predicates:
+            self.assertEqual(parse_expression(repr(pred)), pred)
+
+    def test_parse_expression_rejects_code(self):
+        for source in [
+            "__import__('os')",
+            "greater_than(1).args",
+            "greater_than(x=1)",
+            "logical_and(is_even)",
+            "(lambda x: x)(1)",
+            "open",
+        ]:
+            with self.assertRaises(ValueError, msg=source):
+                parse_expression(source)
+
+    def test_repr(self):
+        self.assertEqual(
+            repr(logical_and(is_even, type_predicate((int,)))),
+            "logical_and(is_even, type_predicate((int,)))",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
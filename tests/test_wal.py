@@ -0,0 +1,269 @@
+"""
+Unit tests for the write-ahead log and persistent knowledge bases.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from predicate_logic.knowledge_base import PredicateLogic
+from predicate_logic.predicates import greater_than
+from predicate_logic.rules import Aggregate, Atom, Rule, Var
+from predicate_logic.wal import LOG_FILE, WriteAheadLog
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def run_python(code):
+    """Run code in a fresh interpreter, which exits when it is done"""
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT))
+    subprocess.run([sys.executable, "-c", code], env=env, check=True)
+
+
+class TestWriteAheadLog(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_recover_records(self):
+        with WriteAheadLog(self.directory) as log:
+            log.append(("fact", "p", [1, "a"]))
+            log.append(("clear",))
+        with WriteAheadLog(self.directory) as log:
+            self.assertEqual(
+                list(log.recover()), [("fact", "p", [1, "a"]), ("clear",)]
+            )
+            self.assertEqual(log.append(("clear",)), 3)
+
+    def test_group_commit(self):
+        log = WriteAheadLog(self.directory, batch_size=10, batch_interval=60)
+        for i in range(25):
+            log.append(("fact", "p", [i]))
+        self.assertEqual((log.syncs, log.pending, log.synced_lsn), (2, 5, 20))
+        log.close()
+        self.assertEqual(log.syncs, 3)
+
+    def test_idle_batch_is_written_out(self):
+        log = WriteAheadLog(self.directory, batch_size=10, batch_interval=0.01)
+        for i in range(3):
+            log.append(("fact", "p", [i]))
+        deadline = time.monotonic() + 5
+        while log.synced_lsn < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual((log.synced_lsn, log.pending), (3, 0))
+        with WriteAheadLog(self.directory) as recovered:
+            self.assertEqual(len(list(recovered.recover())), 3)
+        log.close()
+
+    def test_pending_records_survive_exit_but_not_a_crash(self):
+        code = (
+            "import os\n"
+            "from predicate_logic.wal import WriteAheadLog\n"
+            f"log = WriteAheadLog({self.directory!r}, batch_size=10, "
+            "batch_interval=60)\n"
+            "for i in range(15):\n"
+            "    log.append(('fact', 'p', [i]))\n"
+        )
+        # A killed process never writes out the batch it was collecting
+        run_python(code + "os._exit(0)\n")
+        with WriteAheadLog(self.directory) as recovered:
+            self.assertEqual(len(list(recovered.recover())), 10)
+            self.assertEqual(recovered.lsn, 10)
+        shutil.rmtree(self.directory)
+        # An interpreter exiting normally writes it out, unclosed
+        run_python(code)
+        with WriteAheadLog(self.directory) as recovered:
+            self.assertEqual(len(list(recovered.recover())), 15)
+
+    def test_closed_log_refuses_appends(self):
+        log = WriteAheadLog(self.directory)
+        log.close()
+        with self.assertRaises(ValueError):
+            log.append(("clear",))
+
+    def test_torn_tail_is_dropped(self):
+        with WriteAheadLog(self.directory) as log:
+            log.append(("fact", "p", [1]))
+            log.append(("fact", "p", [2]))
+        path = os.path.join(self.directory, LOG_FILE)
+        size = os.path.getsize(path)
+        with open(path, "r+b") as file:
+            file.truncate(size - 3)
+        with WriteAheadLog(self.directory) as log:
+            self.assertEqual(list(log.recover()), [("fact", "p", [1])])
+            log.append(("fact", "p", [3]))
+        with WriteAheadLog(self.directory) as log:
+            self.assertEqual(
+                list(log.recover()), [("fact", "p", [1]), ("fact", "p", [3])]
+            )
+
+    def test_compaction_replays_only_the_tail(self):
+        with WriteAheadLog(self.directory) as log:
+            for i in range(5):
+                log.append(("fact", "p", [i]))
+            log.compact([("fact", "p", [9])])
+            self.assertEqual(os.path.getsize(os.path.join(self.directory, LOG_FILE)), 0)
+            log.append(("fact", "q", [1]))
+        with WriteAheadLog(self.directory) as log:
+            self.assertEqual(
+                list(log.recover()), [("fact", "p", [9]), ("fact", "q", [1])]
+            )
+            self.assertEqual((log.snapshot_lsn, log.lsn), (5, 6))
+
+    def test_log_left_by_interrupted_compaction_is_skipped(self):
+        path = os.path.join(self.directory, LOG_FILE)
+        with WriteAheadLog(self.directory) as log:
+            log.append(("fact", "p", [1]))
+            log.sync()
+            shutil.copy(path, path + ".old")
+            log.compact([("fact", "p", [1])])
+        # As if the crash came after the rename, before the log was emptied
+        os.replace(path + ".old", path)
+        with WriteAheadLog(self.directory) as log:
+            self.assertEqual(list(log.recover()), [("fact", "p", [1])])
+
+    def test_automatic_compaction(self):
+        state = []
+        log = WriteAheadLog(self.directory, compact_after=4, snapshot=lambda: state)
+        for i in range(10):
+            state.append(("fact", "p", [i]))
+            log.append(state[-1])
+        self.assertEqual((log.compactions, log.log_records), (2, 2))
+        log.close()
+        with WriteAheadLog(self.directory) as log:
+            self.assertEqual(list(log.recover()), state)
+
+    def test_unserializable_record(self):
+        with WriteAheadLog(self.directory) as log:
+            with self.assertRaises(TypeError):
+                log.append(("fact", "p", [object()]))
+            self.assertEqual(log.lsn, 0)
+
+
+class TestPersistentKnowledgeBase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def reopen(self, kb, **options):
+        kb.log.close()
+        return PredicateLogic.open(self.directory, **options)
+
+    def test_changes_survive_reopening(self):
+        kb = PredicateLogic.open(self.directory)
+        kb.load(
+            """
+            parent(john, mary).
+            parent(mary, sue).
+            ancestor(X, Y) :- parent(X, Y).
+            ancestor(X, Z) :- parent(X, Y), ancestor(Y, Z).
+            """
+        )
+        kb.add_rule(greater_than(10), ("big", (12,)))
+        kb.add_fact(("age", ("sue", 7)))
+        kb.remove_fact(("parent", ("john", "mary")))
+        kb = self.reopen(kb)
+        self.assertEqual(len(kb.get_horn_rules()), 2)
+        self.assertTrue(kb.query("big", 12))
+        self.assertTrue(kb.query("age", "sue", 7))
+        self.assertFalse(kb.query("ancestor", "john", "sue"))
+        self.assertTrue(kb.query("ancestor", "mary", "sue"))
+        kb.clear()
+        kb = self.reopen(kb)
+        self.assertEqual(kb.get_all_facts(), set())
+        kb.log.close()
+
+    def test_compaction(self):
+        kb = PredicateLogic.open(self.directory, compact_after=50)
+        kb.add_horn_rule("linked(X, Y) :- edge(X, Y).")
+        for i in range(120):
+            kb.add_fact(("edge", (i, i + 1)))
+        self.assertEqual(kb.log.compactions, 2)
+        kb = self.reopen(kb)
+        self.assertEqual(len(kb.get_all_facts()), 120)
+        self.assertEqual(len(kb.get_horn_rules()), 1)
+        self.assertTrue(kb.query("linked", 119, 120))
+        kb.log.close()
+
+    def test_compaction_rebuilds_fact_filters(self):
+        kb = PredicateLogic.open(self.directory, compact_after=None)
+        kb.set_fact_filter(0.01)
+        for i in range(100):
+            kb.add_fact(("edge", (i, i + 1)))
+        for i in range(10):
+            kb.remove_fact(("edge", (i, i + 1)))
+        self.assertTrue((0, 1) in kb._fact_filters["edge"])
+        kb.log.compact()
+        self.assertEqual(len(kb._fact_filters["edge"]), 90)
+        self.assertFalse(kb.query("edge", 0, 1))
+        kb.log.close()
+
+    def test_idle_changes_survive_exit(self):
+        program = """
+            parent(john, mary). parent(mary, sue). parent(sue, ann).
+            ancestor(X, Y) :- parent(X, Y).
+            ancestor(X, Z) :- parent(X, Y), ancestor(Y, Z).
+            root(X) :- parent(X, Y), not parent(Z, X).
+            children(X, count(Y)) :- parent(X, Y).
+        """
+        # The store is neither closed nor synced before the process exits
+        run_python(
+            "from predicate_logic.knowledge_base import PredicateLogic\n"
+            f"PredicateLogic.open({self.directory!r}).load({program!r})\n"
+        )
+        with PredicateLogic.open(self.directory) as kb:
+            self.assertEqual(len(kb.get_all_facts()), 3)
+            self.assertEqual(len(kb.get_horn_rules()), 4)
+            self.assertTrue(kb.query("ancestor", "john", "ann"))
+            self.assertTrue(kb.query("root", "john"))
+
+    def test_rules_with_non_identifier_constants(self):
+        X = Var("X")
+        rules = [
+            Rule(Atom("pair", (X, ("a", 1))), (Atom("item", (X,)),)),
+            Rule(Atom("empty", (X, None)), (Atom("item", (X,)),)),
+            Rule(
+                Atom("odd", (X, "Upper case", 2.5)),
+                (Atom("item", (X,)), Atom("blocked", (X, (1, 2)), negated=True)),
+            ),
+            Rule(Atom("total", (Aggregate("count", X),)), (Atom("item", (X,)),)),
+        ]
+        with PredicateLogic.open(self.directory) as kb:
+            kb.add_fact(("item", ("k",)))
+            for rule in rules:
+                kb.add_horn_rule(rule)
+        for _ in range(2):
+            with PredicateLogic.open(self.directory) as kb:
+                self.assertEqual(kb.get_horn_rules(), rules)
+                self.assertTrue(kb.query("pair", "k", ("a", 1)))
+                self.assertTrue(kb.query("empty", "k", None))
+                self.assertTrue(kb.query("odd", "k", "Upper case", 2.5))
+                self.assertTrue(kb.query("total", 1))
+                # The second round recovers from a snapshot
+                kb.log.compact()
+
+    def test_unserializable_horn_rule_changes_nothing(self):
+        X = Var("X")
+        rule = Rule(Atom("p", (X, object())), (Atom("q", (X,)),))
+        with PredicateLogic.open(self.directory) as kb:
+            with self.assertRaises(TypeError):
+                kb.add_horn_rule(rule)
+            self.assertEqual(kb.get_horn_rules(), [])
+            self.assertEqual(kb.log.lsn, 0)
+
+    def test_unserializable_rule_changes_nothing(self):
+        kb = PredicateLogic.open(self.directory)
+        with self.assertRaises(TypeError):
+            kb.add_rule(lambda x: True, ("anything", ("x",)))
+        self.assertEqual(kb.get_all_rules(), [])
+        self.assertEqual(kb.log.lsn, 0)
+        kb.log.close()
+
+
+if __name__ == "__main__":
+    unittest.main()